@@ -0,0 +1,92 @@
+"""
+Autômato Aho-Corasick para encontrar vários nomes do gazetteer em uma única
+passada sobre o texto.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher built once over a fixed set of patterns.
+
+    Each pattern carries an arbitrary payload. The same pattern may be added
+    several times with different payloads; every payload is reported on a hit.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        """
+        Build the automaton.
+
+        Args:
+            patterns (Iterable[Tuple[str, Any]]): (pattern, payload) pairs
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                node = next_node
+            self._outputs[node].append((len(pattern), payload))
+
+        # Calcula os links de falha em largura (BFS)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def __len__(self) -> int:
+        """Number of states in the automaton."""
+        return len(self._goto)
+
+    def find_all(self, text: str, word_boundary: bool = True) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Find every pattern occurrence in text.
+
+        Args:
+            text (str): Text to scan (already normalized by the caller)
+            word_boundary (bool): Only report hits not glued to other letters or digits
+
+        Yields:
+            Tuple[int, int, Any]: (start, end, payload) for each hit
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        text_length = len(text)
+        node = 0
+
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not outputs[node]:
+                continue
+
+            end = position + 1
+            if word_boundary and end < text_length and text[end].isalnum():
+                continue
+            for length, payload in outputs[node]:
+                start = end - length
+                if word_boundary and start > 0 and text[start - 1].isalnum():
+                    continue
+                yield start, end, payload
@@ -0,0 +1,42 @@
+"""
+Tabela de apelidos e abreviações de cidades ("BH", "Sampa", "Sto. André").
+
+Os apelidos são compilados uma vez, junto com os índices do gazetteer, num
+dicionário indexado pela forma canônica do nome: normalizado, com pontos
+trocados por espaço e cada palavra abreviada expandida ("s. j. dos campos" ->
+"sao j dos campos"). Uma consulta é a mesma transformação seguida de um acesso
+ao dicionário, sem spaCy nem busca aproximada.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class AliasIndex:
+    """Hash lookup of colloquial city names, with word-level abbreviation expansion."""
+
+    def __init__(self, aliases: Iterable[Tuple[str, str, str]], abbreviations: Optional[Dict[str, str]] = None):
+        """
+        Compile the table.
+
+        Args:
+            aliases (Iterable[Tuple[str, str, str]]): (alias, city, state) triples, the alias
+                already normalized; the city is what lookups return
+            abbreviations (Optional[Dict[str, str]]): Normalized abbreviation -> full word
+                (ex.: "sta" -> "santa"), expanded word by word in aliases and queries
+        """
+        self.abbreviations = dict(abbreviations or {})
+        self.aliases: Dict[str, Tuple[str, str]] = {}
+        for alias, city, state in aliases:
+            self.aliases[self.expand(alias)] = (city, state)
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def expand(self, normalized: str) -> str:
+        """Canonical form of a normalized name: no dots, single spaces, abbreviations expanded."""
+        abbreviations = self.abbreviations
+        return " ".join([abbreviations.get(word, word) for word in normalized.replace('.', ' ').split()])
+
+    def get(self, normalized: str) -> Optional[Tuple[str, str]]:
+        """(city, state) of a normalized alias, or None."""
+        return self.aliases.get(self.expand(normalized))
@@ -0,0 +1,147 @@
+"""
+API asyncio do CityExtractor, com micro-lotes.
+
+Chamadas concorrentes de ``await extract(text)`` entram numa fila limitada; uma
+tarefa junta o que chegou numa janela curta e resolve tudo de uma vez com
+``iter_resolve`` (um único ``nlp.pipe``) numa thread, fora do event loop.
+Quando a fila enche, ``extract`` espera por espaço (backpressure) em vez de
+acumular trabalho sem limite.
+"""
+
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from city_extractor import CityExtractor, extract_result
+
+
+class AsyncCityExtractor:
+    """Asyncio front end for CityExtractor that coalesces concurrent calls into batches."""
+
+    def __init__(self, extractor: Optional[CityExtractor] = None, max_batch_size: int = 64,
+                 max_wait: float = 0.002, max_queue: int = 1024, executor: Optional[Executor] = None):
+        """
+        Args:
+            extractor (Optional[CityExtractor]): Extractor used for every batch (default: a new one).
+                It is only called from one thread at a time.
+            max_batch_size (int): Maximum number of texts per batch
+            max_wait (float): Seconds to wait for more calls before running a batch that is not full
+            max_queue (int): Maximum number of queued texts; further calls wait for room
+            executor (Optional[Executor]): Where batches run (default: a dedicated thread)
+        """
+        if max_batch_size <= 0 or max_queue <= 0:
+            raise ValueError("max_batch_size and max_queue must be positive")
+        self.extractor = extractor or CityExtractor()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+        # Contadores para acompanhar o tamanho médio dos lotes
+        self.batches = 0
+        self.items = 0
+
+    async def __aenter__(self) -> 'AsyncCityExtractor':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _start(self):
+        if self._closed:
+            raise RuntimeError("AsyncCityExtractor is closed")
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="city-extractor")
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def resolve(self, text: str) -> Dict[str, Optional[str]]:
+        """
+        Resolve one text; same result as CityExtractor.resolve.
+
+        Args:
+            text (str): Input text
+
+        Returns:
+            Dict[str, Optional[str]]: Dictionary with 'city', 'state' and 'tier' keys
+        """
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def extract(self, text: str) -> Dict[str, Optional[str]]:
+        """
+        Extract city and state from one text; same result as CityExtractor.extract.
+
+        Args:
+            text (str): Input text
+
+        Returns:
+            Dict[str, Optional[str]]: Dictionary with 'city' and 'state' keys
+        """
+        result = await self.resolve(text)
+        return extract_result(result)
+
+    async def extract_many(self, texts: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+        """Extract every text concurrently; results come back in input order."""
+        return list(await asyncio.gather(*(self.extract(text) for text in texts)))
+
+    def _drain(self, batch: List[Tuple[str, asyncio.Future]]):
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    def _resolve_batch(self, texts: List[str]) -> List[Dict[str, Optional[str]]]:
+        return list(self.extractor.iter_resolve(texts, batch_size=len(texts)))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            # Espera um pouco por mais chamadas quando o lote ainda não encheu
+            if len(batch) < self.max_batch_size and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+
+            # Quem desistiu (future cancelado) não entra no lote
+            live = [(text, future) for text, future in batch if not future.done()]
+            try:
+                if live:
+                    results = await loop.run_in_executor(
+                        self._executor, self._resolve_batch, [text for text, _ in live]
+                    )
+                    for (_, future), result in zip(live, results):
+                        if not future.done():
+                            future.set_result(result)
+                    self.batches += 1
+                    self.items += len(live)
+            except Exception as error:
+                for _, future in live:
+                    if not future.done():
+                        future.set_exception(error)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def aclose(self):
+        """Finish the queued calls, then stop the worker and the default executor."""
+        self._closed = True
+        if self._worker is not None:
+            await self._queue.join()
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
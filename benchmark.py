@@ -0,0 +1,394 @@
+"""
+Benchmarks do CityExtractor.
+
+Todas as medidas usam o corpus sintético de synthetic_corpus.py (mesma semente,
+mesmas entradas) e saem em JSON com chaves estáveis, para que a diferença entre
+duas versões apareça num simples diff dos arquivos.
+
+Uso:
+    python benchmark.py all --output bench.json
+    python benchmark.py startup [--runs 5]
+    python benchmark.py latency [--size 2000] [--functions extract extract_state] [--budget 0.002]
+    python benchmark.py throughput [--batch-sizes 64 256 1024]
+    python benchmark.py memory
+    python benchmark.py pool [--processes 1 2 4 8] [--start-methods fork spawn]
+    python benchmark.py spatial [--points 1000000]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from synthetic_corpus import add_typo, generate_corpus
+
+# Roda em um processo novo: mede do import até o primeiro resultado
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from city_extractor import CityExtractor
+imported = time.perf_counter()
+extractor = CityExtractor(pipeline_profile=sys.argv[2])
+constructed = time.perf_counter()
+result = extractor.extract(sys.argv[1])
+finished = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'construct_s': constructed - imported,
+    'first_result_s': finished - constructed,
+    'total_s': finished - start,
+    'model_loaded': extractor._nlp is not None,
+}))
+"""
+
+# Roda em um processo novo: pico de memória Python (tracemalloc) e do processo (RSS)
+MEMORY_SCRIPT = """
+import json, resource, sys, tracemalloc
+tracemalloc.start()
+from city_extractor import CityExtractor
+from memory_report import component_sizes
+from synthetic_corpus import generate_corpus
+texts = [sample.text for sample in generate_corpus(int(sys.argv[1]), int(sys.argv[2]))]
+tracemalloc.reset_peak()
+extractor = CityExtractor(pipeline_profile=sys.argv[3])
+extractor.nlp
+construct_peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.reset_peak()
+extractor.extract_batch(texts)
+batch_peak = tracemalloc.get_traced_memory()[1]
+current = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+indexes = sum(component_sizes(extractor).values())
+# ru_maxrss é em KB no Linux e em bytes no macOS
+rss_unit = 1 if sys.platform == 'darwin' else 1024
+print(json.dumps({
+    'construct_peak_mb': construct_peak / 2**20,
+    'batch_peak_mb': batch_peak / 2**20,
+    'retained_mb': current / 2**20,
+    'extractor_objects_mb': indexes / 2**20,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit / 2**20,
+}))
+"""
+
+# Entradas para o primeiro resultado: uma resolvida sem spaCy e outra que precisa do modelo
+STARTUP_INPUTS = {
+    'fast_path': "Mogi das Cruzes - SP",
+    'nlp_path': "Apartamento em Belo Horizonte, Savassi",
+}
+
+LATENCY_FUNCTIONS = ('extract', 'extract_state', 'extract_city', 'find_matching_city')
+
+
+def _round(report: Dict[str, float], digits: int = 3) -> Dict[str, float]:
+    return {key: round(value, digits) if isinstance(value, float) else value for key, value in report.items()}
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles, in milliseconds, from per-call durations in seconds."""
+    milliseconds = sorted(sample * 1000 for sample in samples)
+    cuts = statistics.quantiles(milliseconds, n=100, method='inclusive') if len(milliseconds) > 1 else milliseconds * 99
+    return _round({
+        'calls': len(milliseconds),
+        'mean_ms': statistics.fmean(milliseconds),
+        'p50_ms': cuts[49],
+        'p90_ms': cuts[89],
+        'p99_ms': cuts[98],
+        'max_ms': milliseconds[-1],
+    })
+
+
+def measure_startup(text: str, profile: str, runs: int) -> Dict[str, object]:
+    """Run the startup script `runs` times in fresh processes and keep the medians."""
+    samples: List[Dict[str, float]] = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, text, profile],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1]}
+        samples.append(json.loads(completed.stdout))
+
+    report = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ('import_s', 'construct_s', 'first_result_s', 'total_s')
+    }
+    report['model_loaded'] = samples[0]['model_loaded']
+    return _round(report, 4)
+
+
+def run_startup(args) -> Dict[str, object]:
+    results = {}
+    for name, text in STARTUP_INPUTS.items():
+        for profile in args.profiles:
+            results[f"{name}/{profile}"] = measure_startup(text, profile, args.runs)
+    return results
+
+
+def _new_extractor(args):
+    from city_extractor import CityExtractor
+    return CityExtractor(pipeline_profile=args.profile, budget=getattr(args, 'budget', None))
+
+
+def _latency_calls(extractor, corpus, seed: int) -> Dict[str, List[Tuple[Callable, tuple]]]:
+    """Call list per benchmarked function, built from the corpus."""
+    rng = random.Random(seed)
+    partial_names = []
+    for sample in corpus:
+        # Metade com erro de digitação, metade só o começo do nome
+        name = add_typo(sample.city, rng) if rng.random() < 0.5 else sample.city[:max(4, len(sample.city) // 2)]
+        partial_names.append((name, sample.state if rng.random() < 0.5 else None))
+    return {
+        'extract': [(extractor.extract, (sample.text,)) for sample in corpus],
+        'extract_state': [(extractor.extract_state, (sample.text,)) for sample in corpus],
+        'extract_city': [(extractor.extract_city, (sample.text,)) for sample in corpus],
+        'find_matching_city': [(extractor.find_matching_city, call) for call in partial_names],
+    }
+
+
+def run_latency(args) -> Dict[str, object]:
+    corpus = generate_corpus(args.size, args.seed)
+    extractor = _new_extractor(args)
+    # Aquecimento: carrega o modelo antes de medir
+    for sample in corpus[:20]:
+        extractor.extract(sample.text)
+
+    calls = _latency_calls(extractor, corpus, args.seed)
+    results = {}
+    for name in args.functions:
+        durations = []
+        for function, call_args in calls[name]:
+            started = time.perf_counter()
+            function(*call_args)
+            durations.append(time.perf_counter() - started)
+        results[name] = summarize_latencies(durations)
+
+        if name == 'extract':
+            by_kind = defaultdict(list)
+            for sample, duration in zip(corpus, durations):
+                by_kind[sample.kind].append(duration)
+            results['extract_by_kind'] = {kind: summarize_latencies(by_kind[kind]) for kind in sorted(by_kind)}
+    if args.budget is not None:
+        results['partial_results'] = extractor.tier_counts['partial']
+    return results
+
+
+def run_throughput(args) -> Dict[str, object]:
+    corpus = generate_corpus(args.size, args.seed)
+    texts = [sample.text for sample in corpus]
+    extractor = _new_extractor(args)
+    extractor.extract_batch(texts[:20])
+
+    results = {}
+    started = time.perf_counter()
+    sequential = [extractor.extract(text) for text in texts]
+    results['extract_loop'] = _round({'rows_per_s': len(texts) / (time.perf_counter() - started)}, 1)
+    for batch_size in args.batch_sizes:
+        started = time.perf_counter()
+        extractor.extract_batch(texts, batch_size=batch_size)
+        results[f'extract_batch/{batch_size}'] = _round({'rows_per_s': len(texts) / (time.perf_counter() - started)}, 1)
+
+    # Acerto contra a cidade e o estado usados para gerar cada entrada
+    normalize = extractor.normalize_text
+    results['accuracy'] = _round({
+        'state': sum(result['state'] == sample.state for result, sample in zip(sequential, corpus)) / len(corpus),
+        'city': sum(
+            result['city'] is not None and normalize(result['city']) == normalize(sample.city)
+            for result, sample in zip(sequential, corpus)
+        ) / len(corpus),
+    }, 4)
+    return results
+
+
+def run_memory(args) -> Dict[str, object]:
+    completed = subprocess.run(
+        [sys.executable, "-c", MEMORY_SCRIPT, str(args.size), str(args.seed), args.profile],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1]}
+    return _round(json.loads(completed.stdout), 2)
+
+
+def _mean_memory(reports: List[Optional[Dict[str, float]]]) -> Optional[Dict[str, float]]:
+    reports = [report for report in reports if report is not None]
+    if not reports:
+        return None
+    return _round({key: statistics.fmean(report[key] for report in reports) for key in reports[0]}, 2)
+
+
+def default_pool_sizes() -> List[int]:
+    """1, 2, 4, ... up to the usable CPUs, always ending at the CPU count."""
+    from pool import default_processes
+    limit = default_processes()
+    sizes = [1]
+    while sizes[-1] * 2 < limit:
+        sizes.append(sizes[-1] * 2)
+    if sizes[-1] != limit:
+        sizes.append(limit)
+    return sizes
+
+
+def run_pool(args) -> Dict[str, object]:
+    from memory_report import process_memory
+    from pool import ExtractorPool
+    texts = [sample.text for sample in generate_corpus(args.size, args.seed)]
+    extractor = _new_extractor(args)
+    results = {}
+    for start_method in args.start_methods:
+        baseline = None
+        for processes in args.processes or default_pool_sizes():
+            started = time.perf_counter()
+            pool = ExtractorPool(extractor, processes=processes, chunk_size=args.chunk_size, start_method=start_method)
+            with pool:
+                pool.map(texts[:1])
+                first_result = time.perf_counter() - started
+                started = time.perf_counter()
+                pool.map(texts)
+                rows_per_s = len(texts) / (time.perf_counter() - started)
+                # Medido depois do trabalho: páginas que os workers sujaram já não são compartilhadas
+                workers = [process_memory(child.pid) for child in multiprocessing.active_children()]
+                parent = process_memory(os.getpid())
+            if baseline is None:
+                baseline = rows_per_s / processes
+            results[f"{start_method}/{processes}"] = {
+                'first_result_s': round(first_result, 3),
+                'rows_per_s': round(rows_per_s, 1),
+                # 1.0 é escala perfeita em relação ao primeiro tamanho medido
+                'scaling_efficiency': round(rows_per_s / (baseline * processes), 3),
+                'parent_memory': _mean_memory([parent]),
+                'worker_memory': _mean_memory(workers),
+            }
+    return results
+
+
+def run_spatial(args) -> Dict[str, object]:
+    import numpy as np
+    extractor = _new_extractor(args)
+    started = time.perf_counter()
+    extractor._spatial_index()
+    results = {'build_s': round(time.perf_counter() - started, 3)}
+
+    # Pontos perto de municípios (como endereços geocodificados) e espalhados pela caixa do país
+    rng = np.random.default_rng(args.seed)
+    coordinates = np.frombuffer(extractor.gazetteer.municipality_coordinates, dtype=np.float32).reshape(-1, 2)
+    coordinates = coordinates[~np.isnan(coordinates[:, 0])]
+    chosen = coordinates[rng.integers(0, len(coordinates), args.points)]
+    samples = {
+        'near_cities': (chosen[:, 0] + rng.normal(0, 0.05, args.points), chosen[:, 1] + rng.normal(0, 0.05, args.points)),
+        'uniform': (rng.uniform(-34, 6, args.points), rng.uniform(-74, -34, args.points)),
+    }
+    for name, (latitudes, longitudes) in samples.items():
+        started = time.perf_counter()
+        extractor.nearest_cities(latitudes, longitudes)
+        results[f'nearest_cities/{name}'] = _round({'points_per_s': args.points / (time.perf_counter() - started)}, 1)
+
+    corpus = generate_corpus(min(args.size, 500), args.seed)
+    durations = []
+    for sample in corpus:
+        started = time.perf_counter()
+        extractor.cities_within(sample.city, 50, sample.state)
+        durations.append(time.perf_counter() - started)
+    results['cities_within/50km'] = summarize_latencies(durations)
+    return results
+
+
+def environment(args) -> Dict[str, object]:
+    """Versions and settings that explain differences between two reports."""
+    try:
+        import spacy
+        spacy_version = spacy.__version__
+    except ImportError:
+        spacy_version = None
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'spacy': spacy_version,
+        'commit': commit.stdout.strip() or None,
+        'profile': args.profile,
+        'corpus': {'size': args.size, 'seed': args.seed},
+    }
+
+
+def run_all(args) -> Dict[str, object]:
+    return {
+        'environment': environment(args),
+        'startup': run_startup(args),
+        'latency': run_latency(args),
+        'throughput': run_throughput(args),
+        'memory': run_memory(args),
+        'pool': run_pool(args),
+        'spatial': run_spatial(args),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do CityExtractor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    corpus = argparse.ArgumentParser(add_help=False)
+    corpus.add_argument("--size", type=int, default=2000, help="Tamanho do corpus sintético")
+    corpus.add_argument("--seed", type=int, default=0, help="Semente do corpus sintético")
+    corpus.add_argument("--profile", default="fast", help="Perfil do pipeline spaCy")
+    startup_options = argparse.ArgumentParser(add_help=False)
+    startup_options.add_argument("--runs", type=int, default=5)
+    startup_options.add_argument("--profiles", nargs="+", default=["fast", "full"])
+    latency_options = argparse.ArgumentParser(add_help=False)
+    latency_options.add_argument("--functions", nargs="+", choices=LATENCY_FUNCTIONS, default=list(LATENCY_FUNCTIONS))
+    latency_options.add_argument("--budget", type=float, help="Orçamento de tempo por chamada (s), veja CityExtractor")
+    throughput_options = argparse.ArgumentParser(add_help=False)
+    throughput_options.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024])
+    pool_options = argparse.ArgumentParser(add_help=False)
+    pool_options.add_argument("--processes", type=int, nargs="+",
+                              help="Tamanhos do pool (padrão: 1, 2, 4, ... até o número de CPUs)")
+    pool_options.add_argument("--start-methods", nargs="+", choices=["fork", "spawn"], default=["fork"])
+    pool_options.add_argument("--chunk-size", type=int, default=250)
+    spatial_options = argparse.ArgumentParser(add_help=False)
+    spatial_options.add_argument("--points", type=int, default=1_000_000, help="Coordenadas por medida de nearest_cities")
+
+    startup = subparsers.add_parser("startup", parents=[common, startup_options],
+                                    help="Tempo do import até o primeiro resultado")
+    startup.set_defaults(func=run_startup)
+    latency = subparsers.add_parser("latency", parents=[common, corpus, latency_options],
+                                    help="Percentis de latência por chamada")
+    latency.set_defaults(func=run_latency)
+    throughput = subparsers.add_parser("throughput", parents=[common, corpus, throughput_options],
+                                       help="Linhas por segundo em lote e acerto no corpus")
+    throughput.set_defaults(func=run_throughput)
+    memory = subparsers.add_parser("memory", parents=[common, corpus], help="Pico de memória")
+    memory.set_defaults(func=run_memory)
+    pool = subparsers.add_parser("pool", parents=[common, corpus, pool_options],
+                                 help="Escala e memória por worker do ExtractorPool")
+    pool.set_defaults(func=run_pool)
+    spatial = subparsers.add_parser("spatial", parents=[common, corpus, spatial_options],
+                                    help="Cidade mais próxima em lote e busca por raio")
+    spatial.set_defaults(func=run_spatial)
+    everything = subparsers.add_parser(
+        "all", parents=[common, corpus, startup_options, latency_options, throughput_options, pool_options,
+                        spatial_options],
+        help="Todos os benchmarks em um único relatório"
+    )
+    everything.set_defaults(func=run_all)
+
+    args = parser.parse_args()
+    report = json.dumps(args.func(args), indent=2, ensure_ascii=False, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,97 @@
 """
 Dados de cidades e estados brasileiros para validação.
 Fonte: IBGE (https://www.ibge.gov.br/explica/codigos-dos-municipios.php)
+
+Os dados ficam em data/*.csv e são empacotados em data/gazetteer.bin (veja
+gazetteer.py). STATES, MAJOR_CITIES, CITY_TO_STATE, NEIGHBORHOODS e
+NEIGHBORHOOD_TO_CITY são visões somente leitura sobre o arquivo mapeado em
+memória, com a mesma interface dos antigos dicionários.
 """
 
+from gazetteer import load_gazetteer
+
+GAZETTEER = load_gazetteer()
+
 # Estados brasileiros (sigla -> nome)
-STATES = {
-    'AC': 'Acre',
-    'AL': 'Alagoas',
-    'AP': 'Amapá',
-    'AM': 'Amazonas',
-    'BA': 'Bahia',
-    'CE': 'Ceará',
-    'DF': 'Distrito Federal',
-    'ES': 'Espírito Santo',
-    'GO': 'Goiás',
-    'MA': 'Maranhão',
-    'MT': 'Mato Grosso',
-    'MS': 'Mato Grosso do Sul',
-    'MG': 'Minas Gerais',
-    'PA': 'Pará',
-    'PB': 'Paraíba',
-    'PR': 'Paraná',
-    'PE': 'Pernambuco',
-    'PI': 'Piauí',
-    'RJ': 'Rio de Janeiro',
-    'RN': 'Rio Grande do Norte',
-    'RS': 'Rio Grande do Sul',
-    'RO': 'Rondônia',
-    'RR': 'Roraima',
-    'SC': 'Santa Catarina',
-    'SP': 'São Paulo',
-    'SE': 'Sergipe',
-    'TO': 'Tocantins'
-}
+STATES = GAZETTEER.states
 
 # Cidades principais por estado (estado -> lista de cidades)
-MAJOR_CITIES = {
-    'SP': [
-        'São Paulo', 'Guarulhos', 'Campinas', 'São Bernardo do Campo', 'Santo André',
-        'Osasco', 'São José dos Campos', 'Ribeirão Preto', 'Sorocaba', 'Santos',
-        'São José do Rio Preto', 'Mogi das Cruzes', 'São Vicente', 'Jundiaí',
-        'Limeira', 'Carapicuíba', 'Piracicaba', 'Bauru', 'Itaquaquecetuba',
-        'São Caetano do Sul', 'Franca', 'Praia Grande', 'Guarujá', 'Taubaté'
-    ],
-    'RJ': [
-        'Rio de Janeiro', 'São Gonçalo', 'Duque de Caxias', 'Nova Iguaçu', 'Niterói',
-        'Belford Roxo', 'São João de Meriti', 'Petrópolis', 'Volta Redonda', 'Macaé',
-        'Magé', 'Itaboraí', 'Nova Friburgo', 'Barra Mansa', 'Angra dos Reis',
-        'Cabo Frio', 'Teresópolis', 'Mesquita', 'Maricá', 'Nilópolis'
-    ],
-    'MG': [
-        'Belo Horizonte', 'Uberlândia', 'Contagem', 'Juiz de Fora', 'Betim',
-        'Montes Claros', 'Ribeirão das Neves', 'Uberaba', 'Governador Valadares',
-        'Ipatinga', 'Sete Lagoas', 'Divinópolis', 'Santa Luzia', 'Ibirité',
-        'Poços de Caldas', 'Pouso Alegre', 'Patos de Minas', 'Pampulha', 'Barbacena'
-    ],
-    'RS': [
-        'Porto Alegre', 'Caxias do Sul', 'Pelotas', 'Canoas', 'Santa Maria',
-        'Gravataí', 'Viamão', 'Novo Hamburgo', 'São Leopoldo', 'Rio Grande',
-        'Alvorada', 'Passo Fundo', 'Sapucaia do Sul', 'Uruguaiana', 'Santa Cruz do Sul',
-        'Cachoeirinha', 'Guaíba', 'Bento Gonçalves', 'Bagé', 'Erechim'
-    ],
-    'PR': [
-        'Curitiba', 'Londrina', 'Maringá', 'Ponta Grossa', 'Cascavel',
-        'São José dos Pinhais', 'Foz do Iguaçu', 'Colombo', 'Guarapuava', 'Paranaguá',
-        'Araucária', 'Toledo', 'Apucarana', 'Pinhais', 'Campo Largo',
-        'Arapongas', 'Almirante Tamandaré', 'Umuarama', 'Cambé', 'Piraquara'
-    ],
-    'BA': [
-        'Salvador', 'Feira de Santana', 'Vitória da Conquista', 'Camaçari', 'Itabuna',
-        'Juazeiro', 'Lauro de Freitas', 'Ilhéus', 'Jequié', 'Teixeira de Freitas',
-        'Barreiras', 'Alagoinhas', 'Porto Seguro', 'Simões Filho', 'Paulo Afonso',
-        'Eunápolis', 'Santo Antônio de Jesus', 'Candeias', 'Itapetinga', 'Lucas do Rio Verde'
-    ],
-    'SC': [
-        'Florianópolis', 'Joinville', 'Blumenau', 'São José', 'Criciúma',
-        'Itajaí', 'Lages', 'Jaraguá do Sul', 'Palhoça', 'Balneário Camboriú',
-        'Brusque', 'Tubarão', 'São Bento do Sul', 'Biguaçu', 'Itapema',
-        'Camboriú', 'Chapecó', 'Navegantes', 'São Francisco do Sul', 'Imbituba'
-    ],
-    'PE': [
-        'Recife', 'Jaboatão dos Guararapes', 'Olinda', 'Caruaru', 'Petrolina',
-        'Paulista', 'Cabo de Santo Agostinho', 'Camaragibe', 'Garanhuns', 'Vitória de Santo Antão',
-        'Santa Cruz do Capibaribe', 'São Lourenço da Mata', 'Igarassu', 'Abreu e Lima', 'Carpina',
-        'Gravatá', 'Santa Maria da Boa Vista', 'Ipojuca', 'Goiana', 'Araripina'
-    ],
-    'CE': [
-        'Fortaleza', 'Caucaia', 'Juazeiro do Norte', 'Maracanaú', 'Sobral',
-        'Crato', 'Itapipoca', 'Maranguape', 'Iguatu', 'Quixadá',
-        'Pacatuba', 'Quixeramobim', 'Aracati', 'Crateús', 'Acaraú',
-        'Russas', 'Tianguá', 'Cascavel', 'Horizonte', 'Icó'
-    ],
-    'PA': [
-        'Belém', 'Ananindeua', 'Santarém', 'Castanhal', 'Marituba',
-        'Marabá', 'Bragança', 'Parauapebas', 'Abaetetuba', 'Cametá',
-        'Altamira', 'Tucuruí', 'Paragominas', 'Itaituba', 'Tailândia',
-        'Barcarena', 'Marapanim', 'Breves', 'Capanema', 'Moju'
-    ]
+MAJOR_CITIES = GAZETTEER.major_cities
+
+# Nome da cidade, do estado ou do bairro em minúsculas -> estado.
+# Em nomes repetidos, estados vencem cidades principais, que vencem as demais
+# cidades, que vencem bairros.
+CITY_TO_STATE = GAZETTEER.city_to_state
+
+# Apelidos e siglas populares de cidades (apelido -> nome oficial, ou "Nome - UF"
+# quando o nome existe em mais de um estado). Os apelidos passam pela mesma
+# normalização e expansão de abreviações das consultas, então "s. j. dos campos"
+# também vale para "S.J. dos Campos" e "São J. dos Campos".
+CITY_ALIASES = {
+    'sampa': 'São Paulo',
+    'sp capital': 'São Paulo',
+    'rio': 'Rio de Janeiro',
+    'bh': 'Belo Horizonte',
+    'beaga': 'Belo Horizonte',
+    'poa': 'Porto Alegre',
+    'floripa': 'Florianópolis',
+    'sjc': 'São José dos Campos',
+    'sbc': 'São Bernardo do Campo',
+    'bsb': 'Brasília',
+    'cwb': 'Curitiba',
+    'ssa': 'Salvador',
+    'fortal': 'Fortaleza',
+    'jampa': 'João Pessoa',
+    'bc': 'Balneário Camboriú',
+    'sanca': 'São Carlos - SP',
+    'sjrp': 'São José do Rio Preto',
+    'sjp': 'São José dos Pinhais',
+    'sjdr': 'São João del Rei',
+    's. j. dos campos': 'São José dos Campos',
+    's. j. do rio preto': 'São José do Rio Preto',
+    's. j. dos pinhais': 'São José dos Pinhais',
+    's. b. do campo': 'São Bernardo do Campo',
+    'cidade maravilhosa': 'Rio de Janeiro',
+    'capital paulista': 'São Paulo',
+    'capital mineira': 'Belo Horizonte',
+    'capital gaucha': 'Porto Alegre',
 }
 
-# Criar dicionário reverso (nome da cidade -> estado)
-CITY_TO_STATE = {}
-for state, cities in MAJOR_CITIES.items():
-    for city in cities:
-        CITY_TO_STATE[city.lower()] = state
+# Abreviações de palavras em nomes de cidades (abreviação -> palavra completa),
+# com ou sem ponto: "Sto. André", "Rib. Preto", "Gov. Valadares"
+NAME_ABBREVIATIONS = {
+    's': 'são',
+    'sta': 'santa',
+    'sto': 'santo',
+    'rib': 'ribeirão',
+    'gov': 'governador',
+    'pres': 'presidente',
+    'mal': 'marechal',
+    'cel': 'coronel',
+    'dr': 'doutor',
+    'eng': 'engenheiro',
+    'cons': 'conselheiro',
+    'sen': 'senador',
+    'prof': 'professor',
+}
 
-# Adicionar estados como cidades também (para casos como "São Paulo capital")
-for state, state_name in STATES.items():
-    CITY_TO_STATE[state_name.lower()] = state
+# Nomes de lugares que, sem acento, também são palavras comuns do português
+# ("Pará" x "para", "Sobrado", "Jardim", "Feliz Natal"). Não são procurados como
+# substrings em texto livre, só quando aparecem sozinhos, no formato "Cidade - UF"
+# ou junto do estado.
+AMBIGUOUS_NAMES = {
+    'para',
+    # Municípios cujo nome é uma palavra comum em anúncios de imóveis
+    'alianca', 'alegria', 'amparo', 'bandeirantes', 'barra', 'bonito', 'casa branca',
+    'casa grande', 'casa nova', 'central', 'centenario', 'chacara', 'concordia',
+    'esperanca', 'estrela', 'fatima', 'feliz', 'feliz natal', 'fortuna', 'gloria', 'harmonia',
+    'independencia', 'jardim', 'lagoa', 'liberdade', 'luz', 'mata', 'mirante',
+    'modelo', 'montanha', 'olaria', 'ouro', 'painel', 'palmeira', 'panorama',
+    'paraiso', 'passagem', 'pedra', 'pedreira', 'placas', 'planalto', 'portao',
+    'porto', 'prata', 'primavera', 'progresso', 'quadra', 'recreio', 'reserva',
+    'registro', 'riqueza', 'saude', 'sobrado', 'socorro', 'sossego', 'telha',
+    'tesouro', 'triunfo', 'uniao', 'vertentes', 'vista alegre'
+}
 
 # Palavras que podem indicar localização
 LOCATION_INDICATORS = {
@@ -118,46 +102,10 @@ LOCATION_INDICATORS = {
 }
 
 # Bairros importantes por cidade (cidade -> lista de bairros)
-NEIGHBORHOODS = {
-    'rio de janeiro': [
-        'copacabana', 'ipanema', 'leblon', 'botafogo', 'flamengo',
-        'laranjeiras', 'catete', 'glória', 'centro', 'santa teresa',
-        'lapa', 'tijuca', 'jardim botânico', 'gávea', 'barra da tijuca',
-        'recreio dos bandeirantes', 'jacarepaguá', 'campo grande', 'madureira',
-        'méier', 'vila isabel', 'maracanã', 'são cristóvão', 'benfica'
-    ],
-    'são paulo': [
-        'vila mariana', 'mooca', 'pinheiros', 'vila madalena', 'jardins',
-        'itaim bibi', 'morumbi', 'campo belo', 'santo amaro', 'brooklin',
-        'vila leopoldina', 'lapa', 'perdizes', 'jardim paulista', 'jardim europa',
-        'vila olimpia', 'berrini', 'chácara klabin', 'santa cecília', 'bela vista',
-        'centro', 'consolação', 'vila buarque', 'liberdade', 'bom retiro'
-    ],
-    'belo horizonte': [
-        'savassi', 'lourdes', 'funcionários', 'centro', 'santa efigênia',
-        'santo antônio', 'cidade nova', 'santa tereza', 'floresta', 'carlos prates',
-        'prado', 'gutierrez', 'serra', 'anchieta', 'cidade jardim',
-        'buritis', 'nova lima', 'estrela dalva', 'belvedere', 'mangabeiras'
-    ],
-    'porto alegre': [
-        'moinhos de vento', 'bela vista', 'petrópolis', 'auxiliadora', 'bom fim',
-        'rio branco', 'centro histórico', 'cidade baixa', 'menino deus', 'três figueiras',
-        'jardim botânico', 'jardim carvalho', 'jardim do salso', 'jardim lindóia',
-        'jardim sabará', 'jardim são pedro', 'jardim são salvador', 'jardim são sebastião',
-        'jardim são valentim', 'jardim são vicente'
-    ]
-}
-
-# Criar dicionário reverso (nome do bairro -> cidade)
-NEIGHBORHOOD_TO_CITY = {}
-for city, neighborhoods in NEIGHBORHOODS.items():
-    for neighborhood in neighborhoods:
-        NEIGHBORHOOD_TO_CITY[neighborhood.lower()] = city
+NEIGHBORHOODS = GAZETTEER.neighborhoods
 
-# Atualizar CITY_TO_STATE para incluir bairros
-for neighborhood, city in NEIGHBORHOOD_TO_CITY.items():
-    if city in CITY_TO_STATE:
-        CITY_TO_STATE[neighborhood] = CITY_TO_STATE[city]
+# Nome do bairro -> cidade
+NEIGHBORHOOD_TO_CITY = GAZETTEER.neighborhood_to_city
 
 # Atualizar IGNORE_WORDS para remover 'bairro' já que agora tratamos bairros
 IGNORE_WORDS = {
@@ -1,24 +1,203 @@
+import hashlib
+import math
 import re
-import spacy
-from unidecode import unidecode
-from typing import Dict, Optional, Tuple, List, Set
-from difflib import get_close_matches
+import threading
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import Future
+from importlib import metadata
+from itertools import chain
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, List, Set, Union
+from aho_corasick import AhoCorasick
+from alias_index import AliasIndex
+from fuzzy_index import FuzzyIndex
+from prefix_index import PrefixIndex
+from lru_cache import LRUCache
+from instrumentation import NULL_TIMER, Stats
+from prepared_text import PreparedText, normalize
+from gazetteer import COORDINATE_DIGITS, Municipality
+from gazetteer_snapshot import GazetteerSnapshot, open_gazetteer, snapshot_attribute
+from index_cache import DEFAULT_PATH as INDEX_CACHE_PATH, cache_key, load_indexes, save_indexes
+from result_store import ResultStore
 from brazil_locations import (
-    STATES, MAJOR_CITIES, CITY_TO_STATE, LOCATION_INDICATORS, IGNORE_WORDS,
-    NEIGHBORHOODS, NEIGHBORHOOD_TO_CITY
+    LOCATION_INDICATORS, IGNORE_WORDS, AMBIGUOUS_NAMES, CITY_ALIASES, GAZETTEER, NAME_ABBREVIATIONS
 )
 
+# Modelo spaCy usado por padrão
+DEFAULT_MODEL = "pt_core_news_sm"
+
+# Perfis de pipeline: componentes do modelo que não são carregados.
+# O extrator só lê token.pos_ (morphologizer/attribute_ruler) e token.ent_type_ (ner),
+# então o perfil "fast" deixa de fora o parser e o lemmatizer.
+PIPELINE_PROFILES = {
+    'full': (),
+    'fast': ('parser', 'lemmatizer'),
+}
+
+# Modelos já carregados neste processo, compartilhados entre extratores
+_loaded_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(model: str = DEFAULT_MODEL, profile: str = 'fast'):
+    """
+    Load a spaCy model once per process and pipeline profile.
+    
+    spaCy itself is only imported here, so importing this module stays cheap.
+    
+    Args:
+        model (str): Name or path of the spaCy model
+        profile (str): One of PIPELINE_PROFILES
+        
+    Returns:
+        Language: The loaded spaCy pipeline
+    """
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile: {profile!r}")
+    
+    key = (model, profile)
+    with _models_lock:
+        if key not in _loaded_models:
+            import spacy
+            _loaded_models[key] = spacy.load(model, exclude=list(PIPELINE_PROFILES[profile]))
+        return _loaded_models[key]
+
+# Camadas do autômato do gazetteer, na ordem de prioridade de extract_state
+STATE_NAME_TIER = 0
+LOCATION_TIER = 1
+CAPITAL_TIER = 2
+
+# Camadas de resolução, da mais barata para a mais cara. Cada resultado de
+# resolve() informa em 'tier' qual delas respondeu.
+RESOLUTION_TIERS = ('capital', 'format', 'gazetteer', 'alias', 'rules', 'nlp')
+# Resultado cortado pelo orçamento de tempo da chamada; 'stage' diz qual etapa ficou de fora
+PARTIAL_TIER = 'partial'
+
+# Ordem dos tipos de sugestão no autocompletar
+SUGGESTION_RANKS = {'major_city': 0, 'city': 1, 'neighborhood': 2}
+
+# Similaridade mínima da busca aproximada de cidades
+FUZZY_CUTOFF = 0.6
+
+# Pares (cidade, UF) distintos cujos códigos extract_columns guarda durante um lote
+COLUMN_CODES_CACHE_SIZE = 100_000
+
+# Em lote (iter_resolve), resultados baratos seguidos depois dos quais um texto
+# vazio vai ao nlp.pipe para fechar o lote: a entrada é lida no máximo cerca de
+# batch_size * PIPE_FLUSH_INTERVAL textos à frente dos resultados (por processo)
+PIPE_FLUSH_INTERVAL = 16
+
+# Separadores entre cidade e estado, trocados por espaço antes do spaCy
+SEPARATOR_PATTERN = re.compile(r'\s*[-\/]\s*')
+# Sigla de estado em qualquer lugar do texto (em maiúsculas)
+STATE_SIGLA_PATTERN = re.compile(r'\b([A-Z]{2})\b')
+# Entre uma cidade e o seu estado ("Campinas, São Paulo", "Mogi / São Paulo")
+MENTION_SEPARATOR = re.compile(r'\s*[-/,]\s*')
+# Formato estruturado "Cidade - UF", "Cidade / Estado"
+CITY_STATE_FORMAT = re.compile(r'^\s*(?P<city>.+?)\s*[-/]\s*(?P<state>[^-/]+?)\s*$')
+
+# Índices montados por _build_indexes, os mesmos guardados no cache de índices
+DERIVED_INDEXES = (
+    'all_cities', 'cities_by_state', 'fuzzy_index', 'municipality_names', 'prefix_index',
+    'cities_by_prefix', 'state_strip_patterns', 'normalized_state_names', 'normalized_city_to_state',
+    'homonym_states', 'alias_index', 'gazetteer_matcher', 'municipality_ids',
+)
+
+
+class ExtractionColumns(NamedTuple):
+    """
+    Columnar batch results: one entry per input text, in input order.
+
+    Both arrays hold IBGE codes, with 0 where nothing was found. They can be
+    wrapped without copying, e.g. ``numpy.frombuffer(columns.city_code, dtype=numpy.int32)``.
+    """
+    city_code: array  # int32, código do município (ex.: 3550308 para São Paulo)
+    state_code: array  # uint8, código da UF (ex.: 35 para SP)
+
+
+class _OutOfBudget(Exception):
+    """The call's deadline passed before stage could start."""
+
+    def __init__(self, stage: str):
+        super().__init__(stage)
+        self.stage = stage
+
+
+def extract_result(resolved: Dict[str, Optional[str]]) -> Dict[str, object]:
+    """
+    The 'city' and 'state' of a resolve result, as returned by extract.
+    
+    A result cut short by the time budget also carries 'partial' (True) and
+    'stage', the first stage that did not run.
+    """
+    result = {'city': resolved['city'], 'state': resolved['state']}
+    if resolved['tier'] == PARTIAL_TIER:
+        result['partial'] = True
+        result['stage'] = resolved['stage']
+    return result
+
 class CityExtractor:
-    def __init__(self):
-        """Initialize the CityExtractor with spaCy model and state mappings."""
-        self.nlp = spacy.load("pt_core_news_sm")
-        self.state_mapping = STATES
-        self.reverse_state_mapping = {v.lower(): k for k, v in STATES.items()}
-        self.city_to_state = CITY_TO_STATE
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    # Dados do gazetteer, lidos do snapshot atual (veja gazetteer_snapshot.py).
+    # Os mapeamentos de origem podem ser trocados antes de refresh_gazetteer().
+    state_mapping = snapshot_attribute('state_mapping', settable=True)
+    reverse_state_mapping = snapshot_attribute('reverse_state_mapping', settable=True)
+    city_to_state = snapshot_attribute('city_to_state', settable=True)
+    neighborhoods = snapshot_attribute('neighborhoods', settable=True)
+    neighborhood_to_city = snapshot_attribute('neighborhood_to_city', settable=True)
+    gazetteer = snapshot_attribute('gazetteer')
+    gazetteer_version = snapshot_attribute('version')
+    all_cities = snapshot_attribute('all_cities')
+    cities_by_state = snapshot_attribute('cities_by_state')
+    fuzzy_index = snapshot_attribute('fuzzy_index')
+    municipality_names = snapshot_attribute('municipality_names')
+    prefix_index = snapshot_attribute('prefix_index')
+    cities_by_prefix = snapshot_attribute('cities_by_prefix')
+    state_strip_patterns = snapshot_attribute('state_strip_patterns')
+    normalized_state_names = snapshot_attribute('normalized_state_names')
+    normalized_city_to_state = snapshot_attribute('normalized_city_to_state')
+    homonym_states = snapshot_attribute('homonym_states')
+    alias_index = snapshot_attribute('alias_index')
+    gazetteer_matcher = snapshot_attribute('gazetteer_matcher')
+    municipality_ids = snapshot_attribute('municipality_ids')
+    ignore_words = snapshot_attribute('ignore_words', settable=True)
+
+    def __init__(self, model: str = DEFAULT_MODEL, pipeline_profile: str = 'fast',
+                 cache_size: int = 0, instrument: bool = False,
+                 index_cache: Optional[str] = INDEX_CACHE_PATH,
+                 result_store: Optional[Union[str, ResultStore]] = None,
+                 budget: Optional[float] = None, aliases: Optional[Dict[str, str]] = None):
+        """
+        Initialize the CityExtractor with state mappings.
+        
+        The spaCy model is only loaded the first time it is needed (see the ``nlp``
+        property), so inputs answered by the cheap tiers never pay for it.
+        
+        Args:
+            model (str): Name or path of the spaCy model
+            pipeline_profile (str): Which pipeline components to load, see PIPELINE_PROFILES
+            cache_size (int): Maximum number of cached results; 0 disables the cache
+            instrument (bool): Collect per-stage timings and answer-branch counters (see stats_snapshot)
+            index_cache (Optional[str]): File with the precomputed gazetteer indexes (see index_cache.py);
+                None always builds them in memory
+            result_store (Optional[Union[str, ResultStore]]): SQLite file (or store) keeping the
+                results that needed spaCy across processes and runs; None disables it
+            budget (Optional[float]): Default time budget per call, in seconds (see resolve);
+                None never cuts a call short
+            aliases (Optional[Dict[str, str]]): More city aliases, in the format of CITY_ALIASES;
+                they take precedence over the bundled ones
+        """
+        if pipeline_profile not in PIPELINE_PROFILES:
+            raise ValueError(f"Unknown pipeline profile: {pipeline_profile!r}")
+        self.model = model
+        self.pipeline_profile = pipeline_profile
+        self._nlp = None
+        self.index_cache = index_cache
+        self.aliases = dict(aliases or {})
         self.location_indicators = LOCATION_INDICATORS
-        self.ignore_words = IGNORE_WORDS
-        self.neighborhoods = NEIGHBORHOODS
-        self.neighborhood_to_city = NEIGHBORHOOD_TO_CITY
         
         # Cidades que são capitais de estado
         self.state_capitals = {
@@ -42,29 +221,32 @@ class CityExtractor:
             'campinas': 'SP',   # Segunda maior cidade do estado de SP
         }
         
-        # Cria um índice de cidades por estado para busca rápida
-        self.cities_by_state = {}
-        for city, state in self.city_to_state.items():
-            if state not in self.cities_by_state:
-                self.cities_by_state[state] = []
-            self.cities_by_state[state].append(city)
-        
-        # Cria um índice de cidades por prefixo para busca rápida
-        self.cities_by_prefix = {}
-        for city in self.city_to_state.keys():
-            # Adiciona a cidade completa
-            self.cities_by_prefix[city] = city
-            # Adiciona o primeiro nome da cidade
-            first_word = city.split()[0]
-            if first_word not in self.cities_by_prefix:
-                self.cities_by_prefix[first_word] = city
-            # Adiciona variações comuns
-            if first_word.startswith('sao '):
-                self.cities_by_prefix['s.'] = city
-                self.cities_by_prefix['s.'] = city
-            elif first_word.startswith('santa '):
-                self.cities_by_prefix['sta.'] = city
-                self.cities_by_prefix['sta'] = city
+        # Quantas resoluções cada camada respondeu
+        self.tier_counts = Counter()
+        
+        # Tempos por etapa e caminhos de resposta, só quando pedido
+        self.stats = Stats() if instrument else None
+        
+        # Cache LRU opcional de resultados, invalidado quando o gazetteer muda
+        self._cache = LRUCache(cache_size) if cache_size > 0 else None
+        self._cache_version = 0
+        
+        # Resultados do spaCy guardados em disco, pela impressão digital do gazetteer e do modelo
+        self.result_store = ResultStore(result_store) if isinstance(result_store, str) else result_store
+        self._fingerprint = (None, None)
+        
+        # Orçamento de tempo padrão por chamada (e por item de lote)
+        self.budget = budget
+        
+        # Índice espacial dos municípios, montado na primeira consulta por coordenadas
+        self._spatial = (None, None)
+        
+        # Gazetteer e índices derivados; a versão muda a cada refresh_gazetteer()
+        # ou reload_gazetteer(), que trocam o snapshot inteiro de uma vez
+        self._reload_lock = threading.Lock()
+        snapshot = GazetteerSnapshot(GAZETTEER, ignore_words=frozenset(IGNORE_WORDS))
+        self._load_indexes(snapshot)
+        self._snapshot = snapshot
         
         # Palavras que indicam que o próximo termo pode ser um bairro
         self.neighborhood_indicators = {
@@ -81,55 +263,466 @@ class CityExtractor:
             'conjunto', 'residencial', 'residencial', 'setor', 'quadra'
         }
 
+    def _build_indexes(self, snapshot: GazetteerSnapshot):
+        """Build every lookup structure derived from the snapshot's gazetteer mappings."""
+        # Cria um índice de cidades por estado para busca rápida
+        snapshot.all_cities = list(snapshot.city_to_state.keys())
+        snapshot.cities_by_state = {}
+        for city, state in snapshot.city_to_state.items():
+            if state not in snapshot.cities_by_state:
+                snapshot.cities_by_state[state] = []
+            snapshot.cities_by_state[state].append(city)
+        # Índice de bigramas para a busca por similaridade
+        snapshot.fuzzy_index = FuzzyIndex(snapshot.city_to_state.items(), normalize=self.normalize_text)
+        # Nome oficial (maiúsculas e acentos) de cada município, pela chave em minúsculas
+        snapshot.municipality_names = {}
+        for municipality in snapshot.gazetteer.municipalities:
+            snapshot.municipality_names.setdefault(municipality.name.lower(), municipality.name)
+        # Índice de prefixos para autocompletar e para a busca por prefixo
+        snapshot.prefix_index = self._build_prefix_index(snapshot)
+        
+        # Cria um índice de cidades por prefixo para busca rápida. As chaves do
+        # gazetteer trazem as cidades principais antes dos municípios pequenos,
+        # então a primeira palavra ("rio", "santa") leva a uma cidade principal
+        snapshot.cities_by_prefix = {}
+        for city in snapshot.city_to_state.keys():
+            normalized_city = self.normalize_text(city)
+            # Adiciona a cidade completa
+            snapshot.cities_by_prefix[normalized_city] = city
+            # Adiciona o primeiro nome da cidade
+            first_word = normalized_city.split()[0]
+            if first_word not in snapshot.cities_by_prefix:
+                snapshot.cities_by_prefix[first_word] = city
+            # Adiciona variações abreviadas (ex.: "s. jose", "sta maria")
+            for abbreviation, full_word in snapshot.prefix_index.abbreviations.items():
+                if normalized_city.startswith(full_word + ' '):
+                    rest = normalized_city[len(full_word) + 1:]
+                    snapshot.cities_by_prefix.setdefault(f"{abbreviation}. {rest}", city)
+                    snapshot.cities_by_prefix.setdefault(f"{abbreviation} {rest}", city)
+        
+        # Padrões que removem " - UF" e " - Nome do Estado", compilados uma vez por estado
+        snapshot.state_strip_patterns = {
+            sigla: (re.compile(rf'\s*[-\/]\s*{sigla}\b', re.IGNORECASE),
+                    re.compile(rf'\s*[-\/]\s*{re.escape(name)}\b', re.IGNORECASE))
+            for sigla, name in snapshot.state_mapping.items()
+        }
+        
+        # Índices normalizados (sem acento) para as camadas rápidas de resolve()
+        snapshot.normalized_state_names = {self.normalize_text(v): k for k, v in snapshot.state_mapping.items()}
+        # Municípios com o mesmo nome em vários estados (ex.: "Bom Jesus") e a
+        # posição de cada município no gazetteer, pelo nome normalizado e a UF
+        snapshot.homonym_states = {}
+        snapshot.municipality_ids = {}
+        for index, municipality in enumerate(snapshot.gazetteer.municipalities):
+            normalized_name = self.normalize_text(municipality.name)
+            snapshot.homonym_states.setdefault(normalized_name, set()).add(municipality.state)
+            snapshot.municipality_ids.setdefault((normalized_name, municipality.state), index)
+        # Nomes de estado também são chaves de city_to_state ("bahia" -> BA); só
+        # entram aqui os que são um município desse estado ("Goiás") ou um bairro
+        snapshot.normalized_city_to_state = {}
+        for city, state in snapshot.city_to_state.items():
+            normalized_city = self.normalize_text(city)
+            if (normalized_city in snapshot.normalized_state_names
+                    and state not in snapshot.homonym_states.get(normalized_city, ())
+                    and city not in snapshot.neighborhood_to_city):
+                continue
+            snapshot.normalized_city_to_state[normalized_city] = state
+        snapshot.alias_index = self._build_alias_index(snapshot)
+        
+        # Autômato único com todos os nomes do gazetteer, para varrer o texto uma vez só
+        snapshot.gazetteer_matcher = self._build_gazetteer_matcher(snapshot)
+
+    def _index_cache_key(self, snapshot: GazetteerSnapshot) -> bytes:
+        """Key of the cached indexes: the gazetteer sources plus the code tables the indexes use."""
+        return cache_key(
+            snapshot.gazetteer.source_hash,
+            sorted(AMBIGUOUS_NAMES), sorted(CITY_ALIASES.items()), sorted(NAME_ABBREVIATIONS.items()),
+            sorted(self.aliases.items()),
+            sorted(self.state_capitals.items()), sorted(SUGGESTION_RANKS.items()),
+        )
+
+    def _load_indexes(self, snapshot: GazetteerSnapshot, write_cache: bool = True):
+        """
+        Fill the snapshot's derived indexes from the index cache, or build them
+        (and rewrite the cache, if write_cache) when it is missing or was made
+        from other sources.
+        """
+        # Subclasses com outra normalização montam índices diferentes
+        if self.index_cache is None or type(self).normalize_text is not CityExtractor.normalize_text:
+            self._build_indexes(snapshot)
+            return
+        
+        key = self._index_cache_key(snapshot)
+        indexes = load_indexes(self.index_cache, key)
+        if indexes is not None and set(indexes) == set(DERIVED_INDEXES):
+            for name, index in indexes.items():
+                setattr(snapshot, name, index)
+            snapshot.fuzzy_index.normalize = self.normalize_text
+            snapshot.prefix_index.normalize = self.normalize_text
+            return
+        
+        self._build_indexes(snapshot)
+        if not write_cache:
+            return
+        try:
+            save_indexes(self.index_cache, key, {name: getattr(snapshot, name) for name in DERIVED_INDEXES})
+        except OSError:
+            # Instalação somente leitura: segue com os índices em memória
+            pass
+
+    def refresh_gazetteer(self):
+        """
+        Rebuild the derived indexes after the gazetteer dicts were changed
+        (e.g. new entries in city_to_state) and invalidate cached results.
+        """
+        with self._reload_lock:
+            snapshot = self._snapshot.replace(version=self._snapshot.version + 1)
+            self._build_indexes(snapshot)
+            self._snapshot = snapshot
+
+    def reload_gazetteer(self, path: str) -> Future:
+        """
+        Load a new gazetteer in a background thread and swap it in when it is ready.
+        
+        Extractions keep running on the current snapshot while the new one is built;
+        the swap replaces a single reference and the spaCy model is not reloaded.
+        Results cached under the previous version are dropped.
+        
+        Args:
+            path (str): A file written by ``python gazetteer.py build``, or a directory with the source CSVs
+            
+        Returns:
+            Future: Resolves to the new gazetteer_version, or to the error that stopped the reload
+            (the current snapshot stays in place)
+        """
+        future = Future()
+        
+        def build():
+            try:
+                gazetteer = open_gazetteer(path)
+                # Uma recarga por vez, para as versões subirem em ordem
+                with self._reload_lock:
+                    snapshot = GazetteerSnapshot(gazetteer, self._snapshot.version + 1,
+                                                 ignore_words=self._snapshot.ignore_words)
+                    # O cache em disco é o do gazetteer instalado; recargas só o leem
+                    self._load_indexes(snapshot, write_cache=False)
+                    self._snapshot = snapshot
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(snapshot.version)
+        
+        threading.Thread(target=build, name="gazetteer-reload", daemon=True).start()
+        return future
+
+    def _cached(self, key: Tuple, version: int) -> Optional[object]:
+        """
+        Look up a result cached for gazetteer `version`, dropping the whole cache
+        if the gazetteer changed.
+        """
+        if self._cache is None:
+            return None
+        if self._cache_version != self.gazetteer_version:
+            self._cache.clear()
+            self._cache_version = self.gazetteer_version
+            return None
+        return self._cache.get(key) if version == self._cache_version else None
+
+    def _store(self, key: Tuple, value: object, version: int):
+        """Cache a result computed with gazetteer `version`, unless the gazetteer changed since."""
+        if self._cache is not None and self._cache_version == version == self.gazetteer_version:
+            self._cache.put(key, value)
+
+    def _result_fingerprint(self, snapshot: GazetteerSnapshot) -> Optional[str]:
+        """
+        Identify the gazetteer, code tables and spaCy model behind results computed
+        with snapshot, for the result store. None when the gazetteer was edited in
+        memory, as its results can't be told apart from the files'.
+        """
+        if snapshot.edited:
+            return None
+        version, fingerprint = self._fingerprint
+        if version == snapshot.version:
+            return fingerprint
+        
+        # Versões instaladas, sem importar o spaCy nem carregar o modelo
+        versions = []
+        for package in ('spacy', self.model):
+            try:
+                versions.append(metadata.version(package))
+            except (metadata.PackageNotFoundError, ValueError):
+                versions.append(None)
+        digest = hashlib.sha1(self._index_cache_key(snapshot))
+        digest.update(repr((
+            self.model, versions, self.pipeline_profile, f"{type(self).__module__}.{type(self).__qualname__}"
+        )).encode('utf-8'))
+        fingerprint = digest.hexdigest()
+        self._fingerprint = (snapshot.version, fingerprint)
+        return fingerprint
+
+    @staticmethod
+    def _store_key(pending: Tuple[str, str, Optional[str], int, str]) -> str:
+        """
+        Result store key of a text waiting for spaCy: everything _finish_nlp reads.
+        The text sent to spaCy keeps its case, which the city in the result keeps too.
+        """
+        cleaned_text, normalized_text, state = pending[:3]
+        return f"{cleaned_text}\x1f{state or ''}\x1f{normalized_text}"
+
+    def _stored_results(self, snapshot: GazetteerSnapshot,
+                        pendings: List[Tuple[str, str, Optional[str], int, str]]) -> Dict[str, Dict[str, Optional[str]]]:
+        """Results of texts waiting for spaCy that the result store already has, by store key."""
+        if self.result_store is None or not pendings:
+            return {}
+        fingerprint = self._result_fingerprint(snapshot)
+        if fingerprint is None:
+            return {}
+        with self._timed('result_store'):
+            found = self.result_store.get_many(fingerprint, [self._store_key(pending) for pending in pendings])
+        for pending in pendings:
+            key = self._store_key(pending)
+            if key in found and pending[3] == snapshot.version:
+                self._store(('resolve', pending[4]), found[key], pending[3])
+        return found
+
+    def _persist(self, snapshot: GazetteerSnapshot,
+                 finished: List[Tuple[Tuple[str, str, Optional[str], int, str], Dict[str, Optional[str]]]]):
+        """Write spaCy results computed with snapshot to the result store."""
+        if self.result_store is None or not finished:
+            return
+        fingerprint = self._result_fingerprint(snapshot)
+        if fingerprint is None:
+            return
+        with self._timed('result_store'):
+            self.result_store.put_many(fingerprint, [(self._store_key(pending), result) for pending, result in finished])
+
+    def cache_info(self) -> Optional[Dict[str, int]]:
+        """Hit, miss and eviction counters of the result cache, or None when disabled."""
+        return self._cache.info() if self._cache is not None else None
+
+    def clear_cache(self):
+        """Drop every cached result."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _timed(self, stage: str):
+        """Timer for one stage, or a no-op when instrumentation is off."""
+        return self.stats.timer(stage) if self.stats is not None else NULL_TIMER
+
+    def _branch(self, branch: str, value):
+        """Count which branch produced an answer and pass the answer through."""
+        if self.stats is not None:
+            self.stats.count(branch)
+        return value
+
+    def _check_deadline(self, deadline: Optional[float], stage: str):
+        """Stop the call before stage when its deadline (time.monotonic) has passed."""
+        if deadline is not None and time.monotonic() >= deadline:
+            raise _OutOfBudget(stage)
+
+    def _deadline(self, budget: Optional[float]) -> Optional[float]:
+        """Deadline for a call starting now, from its budget or the extractor's default."""
+        budget = self.budget if budget is None else budget
+        return time.monotonic() + budget if budget is not None else None
+
+    def stats_snapshot(self) -> Optional[Dict[str, Dict]]:
+        """Per-stage timings and answer-branch counters, or None when instrumentation is off."""
+        return self.stats.snapshot() if self.stats is not None else None
+
+    @classmethod
+    def shared(cls) -> 'CityExtractor':
+        """Return a process-wide CityExtractor, created on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def nlp(self):
+        """The spaCy pipeline, loaded on first access."""
+        if self._nlp is None:
+            self._nlp = load_model(self.model, self.pipeline_profile)
+        return self._nlp
+
+    @nlp.setter
+    def nlp(self, nlp):
+        self._nlp = nlp
+
     def normalize_text(self, text: str) -> str:
         """Normalize text by removing accents and converting to lowercase."""
-        return unidecode(text.lower().strip())
+        return normalize(text)
+
+    def prepare(self, text: str) -> PreparedText:
+        """Normalize text once, for every stage of one extraction."""
+        return PreparedText(text, self.normalize_text(text))
+
+    def _build_gazetteer_matcher(self, snapshot: GazetteerSnapshot) -> AhoCorasick:
+        """
+        Build one automaton over the normalized names of states, cities, neighborhoods
+        and capitals. Each payload is (tier, order, name, state), so the lowest payload
+        among the hits is the one the old sequential loops would have returned.
+        AMBIGUOUS_NAMES get a None payload: they are never hits, but they still hide
+        the names nested in them ("natal" in "feliz natal").
+        """
+        sources = (
+            (STATE_NAME_TIER, snapshot.reverse_state_mapping.items()),
+            (LOCATION_TIER, snapshot.city_to_state.items()),
+            (CAPITAL_TIER, self.state_capitals.items()),
+        )
+        patterns = []
+        for tier, entries in sources:
+            for order, (name, state) in enumerate(entries):
+                normalized_name = self.normalize_text(name)
+                if normalized_name in AMBIGUOUS_NAMES:
+                    patterns.append((normalized_name, None))
+                    continue
+                patterns.append((normalized_name, (tier, order, name, state)))
+        return AhoCorasick(patterns)
+
+    def _build_alias_index(self, snapshot: GazetteerSnapshot) -> AliasIndex:
+        """
+        Compile CITY_ALIASES and the extractor's own aliases against the gazetteer.
+        
+        Raises:
+            ValueError: when an alias points to a name that is not a municipality
+        """
+        entries = []
+        for alias, target in chain(CITY_ALIASES.items(), self.aliases.items()):
+            city, state = target, None
+            match = CITY_STATE_FORMAT.match(target)
+            if match and match.group('state').upper() in snapshot.state_mapping:
+                city, state = match.group('city'), match.group('state').upper()
+            
+            normalized_city = " ".join(self.normalize_text(city).split())
+            states = snapshot.homonym_states.get(normalized_city, ())
+            if state is None:
+                state = self._municipality_state(snapshot, normalized_city)
+            if state not in states:
+                raise ValueError(f"Alias {alias!r} points to an unknown municipality: {target!r}")
+            municipality = snapshot.gazetteer.municipalities[snapshot.municipality_ids[(normalized_city, state)]]
+            entries.append((self.normalize_text(alias), municipality.name, state))
+        
+        abbreviations = {
+            self.normalize_text(abbreviation): self.normalize_text(word)
+            for abbreviation, word in NAME_ABBREVIATIONS.items()
+        }
+        return AliasIndex(entries, abbreviations)
+
+    @staticmethod
+    def _municipality_state(snapshot: GazetteerSnapshot, normalized_name: str) -> Optional[str]:
+        """
+        State of the municipality a bare name means: the gazetteer's preferred state
+        when that is a municipality of the name (not a homonymous neighborhood),
+        otherwise the first municipality of the name in the gazetteer.
+        """
+        states = snapshot.homonym_states.get(normalized_name)
+        if not states:
+            return None
+        preferred = snapshot.normalized_city_to_state.get(normalized_name)
+        if preferred in states:
+            return preferred
+        return min(states, key=lambda state: snapshot.municipality_ids[(normalized_name, state)])
+
+    def _build_prefix_index(self, snapshot: GazetteerSnapshot) -> PrefixIndex:
+        """Build the autocomplete index over every municipality and neighborhood."""
+        entries = []
+        for municipality in snapshot.gazetteer.municipalities:
+            kind = 'major_city' if municipality.major else 'city'
+            payload = {'name': municipality.name, 'type': 'city',
+                       'city': municipality.name, 'state': municipality.state}
+            rank = (SUGGESTION_RANKS[kind], len(municipality.name), self.normalize_text(municipality.name))
+            entries.append((municipality.name, municipality.state, payload, rank))
+        
+        for city, neighborhoods in snapshot.neighborhoods.items():
+            state = snapshot.city_to_state.get(city)
+            city_name = snapshot.municipality_names.get(city, city.title())
+            for neighborhood in neighborhoods:
+                payload = {'name': neighborhood.title(), 'type': 'neighborhood',
+                           'city': city_name, 'state': state}
+                rank = (SUGGESTION_RANKS['neighborhood'], len(neighborhood), self.normalize_text(neighborhood))
+                entries.append((neighborhood, state, payload, rank))
+        
+        return PrefixIndex(entries, normalize=self.normalize_text, abbreviations=NAME_ABBREVIATIONS)
+
+    def find_gazetteer_hits(self, normalized_text: str) -> List[Tuple[int, int, str, str]]:
+        """
+        Find every state, city, neighborhood or capital name in normalized text.
+        Names nested inside a longer hit ("horizonte" in "belo horizonte") are dropped.
+        
+        Returns:
+            List[Tuple[int, int, str, str]]: (tier, order, name, state) for each hit,
+            sorted by priority
+        """
+        return self._gazetteer_hits(self._snapshot, normalized_text)
+
+    def _gazetteer_hits(self, snapshot: GazetteerSnapshot, normalized_text: str) -> List[Tuple[int, int, str, str]]:
+        """find_gazetteer_hits over snapshot."""
+        payloads = []
+        for _, _, span_payloads in self._gazetteer_spans(snapshot, normalized_text):
+            payloads.extend(span_payloads)
+        return sorted(payloads)
+
+    def _gazetteer_spans(self, snapshot: GazetteerSnapshot,
+                         normalized_text: str) -> List[Tuple[int, int, List[Tuple[int, int, str, str]]]]:
+        """Gazetteer hits as (start, end, payloads) in text order, without nested names."""
+        hits = {}
+        for start, end, payload in snapshot.gazetteer_matcher.find_all(normalized_text):
+            hits.setdefault((start, end), []).append(payload)
+        
+        spans = []
+        covered_until = -1
+        for start, end in sorted(hits, key=lambda span: (span[0], -span[1])):
+            if end <= covered_until:
+                continue
+            covered_until = end
+            payloads = [payload for payload in hits[(start, end)] if payload is not None]
+            if payloads:
+                spans.append((start, end, payloads))
+        return spans
 
     def extract_state(self, text: str) -> Optional[str]:
         """Extract state information from text."""
-        # Normalize the text
-        normalized_text = self.normalize_text(text)
-        
-        # Try to find state by sigla (2 letters)
-        state_sigla_match = re.search(r'\b([A-Z]{2})\b', text.upper())
-        if state_sigla_match:
-            state_sigla = state_sigla_match.group(1)
-            if state_sigla in self.state_mapping:
-                return state_sigla
-
-        # Try to find state by full name
-        for state_name, sigla in self.reverse_state_mapping.items():
-            if state_name in normalized_text:
-                return sigla
-
-        # Try to find state from city name or neighborhood
-        for location, state in self.city_to_state.items():
-            if location in normalized_text:
-                return state
-
-        # Try to find state from state capitals
-        for city, state in self.state_capitals.items():
-            if city in normalized_text:
-                return state
+        return self._extract_state(self._snapshot, self.prepare(text))
 
-        return None
+    def _extract_state(self, snapshot: GazetteerSnapshot, prepared: PreparedText) -> Optional[str]:
+        """extract_state over an already prepared text."""
+        with self._timed('extract_state'):
+            # Try to find state by sigla (2 letters)
+            state_sigla_match = STATE_SIGLA_PATTERN.search(prepared.upper)
+            if state_sigla_match:
+                state_sigla = state_sigla_match.group(1)
+                if state_sigla in snapshot.state_mapping:
+                    return state_sigla
+
+            # Try to find state by full name, then by city or neighborhood name,
+            # then by state capital, all in one pass over the text
+            hits = self._gazetteer_hits(snapshot, prepared.normalized)
+            if hits:
+                return hits[0][3]
 
-    def is_likely_neighborhood(self, text: str, context: List[str]) -> bool:
+            return None
+
+    def is_likely_neighborhood(self, text: str, context: List[str], normalized: Optional[str] = None) -> bool:
         """
         Determina se um texto provavelmente é um bairro baseado em várias heurísticas.
         
         Args:
             text (str): O texto a ser analisado
             context (List[str]): Palavras ao redor do texto que podem dar contexto
+            normalized (Optional[str]): O texto já normalizado, quando o chamador já o tem
             
         Returns:
             bool: True se o texto provavelmente é um bairro
         """
-        text = self.normalize_text(text)
+        text = self.normalize_text(text) if normalized is None else normalized
+        return self._is_likely_neighborhood(self._snapshot, text, context)
+
+    def _is_likely_neighborhood(self, snapshot: GazetteerSnapshot, text: str, context: List[str]) -> bool:
+        """is_likely_neighborhood over snapshot, for an already normalized text."""
         words = text.split()
         
         # Se já está na nossa lista de bairros conhecidos
-        if text in self.neighborhood_to_city:
+        if text in snapshot.neighborhood_to_city:
             return True
             
         # Se começa com um indicador de bairro
@@ -145,9 +738,9 @@ class CityExtractor:
             return True
             
         # Se é um substantivo próprio (PROPN) e não é uma cidade/estado conhecida
-        if (text not in self.city_to_state and 
-            text not in self.reverse_state_mapping and
-            text not in self.ignore_words):
+        if (text not in snapshot.city_to_state and 
+            text not in snapshot.reverse_state_mapping and
+            text not in snapshot.ignore_words):
             # Verifica se tem características de nome de bairro
             # 1. Geralmente tem 2-4 palavras
             # 2. Geralmente contém palavras como "vila", "jardim", etc.
@@ -163,6 +756,13 @@ class CityExtractor:
         Returns a list of tuples (entity, confidence_score, entity_type).
         entity_type can be: 'city', 'neighborhood', 'state', or 'unknown'
         """
+        return [location[:3] for location in self._find_location_entities(self._snapshot, doc)]
+
+    def _find_location_entities(self, snapshot: GazetteerSnapshot, doc) -> List[Tuple[str, float, str, str, int, int]]:
+        """
+        find_location_entities, also returning each entity already normalized and
+        its character span in doc.text: (entity, confidence, type, normalized, start, end).
+        """
         locations = []
         current_entity = []
         words = []
@@ -171,9 +771,9 @@ class CityExtractor:
         # Primeiro, vamos coletar todas as palavras relevantes e seu contexto
         for token in doc:
             word = token.text.lower()
-            if word in self.ignore_words:
+            if word in snapshot.ignore_words:
                 continue
-            words.append((token.text, token.pos_, token.ent_type_))
+            words.append((token.text, token.pos_, token.ent_type_, token.idx))
             context.append(word)
             if len(context) > 7:  # 3 antes + atual + 3 depois
                 context.pop(0)
@@ -181,7 +781,7 @@ class CityExtractor:
         # Agora vamos processar as palavras para encontrar entidades
         i = 0
         while i < len(words):
-            word, pos, ent_type = words[i]
+            word, pos, ent_type, start = words[i]
             
             if word in self.location_indicators:
                 if current_entity:
@@ -190,15 +790,19 @@ class CityExtractor:
                 continue
             
             if pos == "PROPN" or ent_type == "LOC":
+                if not current_entity:
+                    entity_start = start
                 current_entity.append(word)
+                end = start + len(word)
                 i += 1
                 
                 while i < len(words):
-                    next_word, next_pos, next_ent = words[i]
+                    next_word, next_pos, next_ent, next_start = words[i]
                     if (next_word in self.location_indicators or 
                         next_pos == "PROPN" or 
                         next_ent == "LOC"):
                         current_entity.append(next_word)
+                        end = next_start + len(next_word)
                         i += 1
                     else:
                         break
@@ -211,16 +815,16 @@ class CityExtractor:
                     entity_type = 'unknown'
                     confidence = 0.0
                     
-                    if normalized_entity in self.city_to_state:
+                    if normalized_entity in snapshot.city_to_state:
                         entity_type = 'city'
                         confidence = 1.0
-                    elif normalized_entity in self.reverse_state_mapping:
+                    elif normalized_entity in snapshot.reverse_state_mapping:
                         entity_type = 'state'
                         confidence = 1.0
-                    elif normalized_entity in self.neighborhood_to_city:
+                    elif normalized_entity in snapshot.neighborhood_to_city:
                         entity_type = 'neighborhood'
                         confidence = 0.9
-                    elif self.is_likely_neighborhood(entity, context):
+                    elif self._is_likely_neighborhood(snapshot, normalized_entity, context):
                         entity_type = 'neighborhood'
                         confidence = 0.7
                     elif ent_type == "LOC":
@@ -229,165 +833,485 @@ class CityExtractor:
                         confidence = 0.3
                     
                     if confidence > 0:
-                        locations.append((entity, confidence, entity_type))
+                        locations.append((entity, confidence, entity_type, normalized_entity, entity_start, end))
                     current_entity = []
             else:
                 i += 1
         
         return locations
 
-    def find_matching_city(self, partial_name: str, state: Optional[str] = None) -> Optional[str]:
+    def find_matching_city(self, partial_name: str, state: Optional[str] = None,
+                           cutoff: float = FUZZY_CUTOFF) -> Optional[str]:
         """
         Tenta encontrar uma cidade que corresponda ao nome parcial fornecido.
         
         Args:
             partial_name (str): Nome parcial ou abreviado da cidade
             state (Optional[str]): Estado para ajudar na busca
+            cutoff (float): Similaridade mínima aceita na busca aproximada
             
         Returns:
             Optional[str]: Nome completo da cidade se encontrado, None caso contrário
         """
+        return self._find_matching_city(self._snapshot, partial_name, state, cutoff)
+
+    def _find_matching_city(self, snapshot: GazetteerSnapshot, partial_name: str, state: Optional[str] = None,
+                            cutoff: float = FUZZY_CUTOFF) -> Optional[str]:
+        """find_matching_city over snapshot."""
         partial_name = self.normalize_text(partial_name)
         
         # Se temos o estado, procura apenas nas cidades daquele estado
-        if state and state in self.cities_by_state:
-            cities_to_search = self.cities_by_state[state]
-        else:
-            cities_to_search = list(self.city_to_state.keys())
+        if not (state and state in snapshot.cities_by_state):
+            state = None
         
-        # 1. Procura por correspondência exata
-        if partial_name in self.cities_by_prefix:
-            return self.cities_by_prefix[partial_name]
+        def in_state(city: str) -> bool:
+            return (state is None or snapshot.city_to_state[city] == state
+                    or state in snapshot.homonym_states.get(self.normalize_text(city), ()))
         
-        # 2. Procura por prefixo
-        for city in cities_to_search:
-            city_lower = self.normalize_text(city)
-            if city_lower.startswith(partial_name):
-                return city
+        # 1. Procura por correspondência exata ou por um apelido ("rio")
+        alias = snapshot.alias_index.get(partial_name)
+        if alias and (state is None or alias[1] == state) and partial_name not in snapshot.normalized_city_to_state:
+            return alias[0].lower()
+        city = snapshot.cities_by_prefix.get(partial_name)
+        if city and in_state(city):
+            return city
+        
+        # 2. Procura por prefixo (um bairro leva à sua cidade)
+        suggestions = snapshot.prefix_index.search(partial_name, state, limit=1)
+        if suggestions:
+            return suggestions[0]['city'].lower()
         
         # 3. Procura por similaridade
-        matches = get_close_matches(partial_name, cities_to_search, n=1, cutoff=0.6)
+        with self._timed('fuzzy_search'):
+            matches = snapshot.fuzzy_index.search(partial_name, state, limit=1, cutoff=cutoff)
         if matches:
-            return matches[0]
+            return matches[0][0]
         
         # 4. Procura por primeiro nome
-        first_word = partial_name.split()[0]
-        if first_word in self.cities_by_prefix:
-            return self.cities_by_prefix[first_word]
+        city = snapshot.cities_by_prefix.get(partial_name.split()[0])
+        if city and in_state(city):
+            return city
         
         return None
 
-    def extract_city(self, text: str, state: Optional[str] = None) -> Optional[str]:
-        """Extract city name from text."""
-        # Normalize the text first
-        normalized_text = self.normalize_text(text)
+    def find_similar_cities(self, name: str, state: Optional[str] = None, limit: int = 5,
+                            cutoff: float = FUZZY_CUTOFF) -> List[Tuple[str, float]]:
+        """
+        Lista as cidades mais parecidas com o nome, da mais para a menos parecida.
+        
+        Args:
+            name (str): Nome possivelmente com erro de digitação
+            state (Optional[str]): Sigla do estado para restringir a busca
+            limit (int): Número máximo de cidades retornadas
+            cutoff (float): Similaridade mínima, entre 0 e 1
+            
+        Returns:
+            List[Tuple[str, float]]: Pares (cidade, similaridade)
+        """
+        return self.fuzzy_index.search(name, state, limit=limit, cutoff=cutoff)
+
+    def autocomplete(self, prefix: str, state: Optional[str] = None, limit: int = 10) -> List[Dict[str, Optional[str]]]:
+        """
+        Sugere cidades e bairros que começam com o texto digitado.
+        
+        Ignora acentos e maiúsculas e expande abreviações como "S." e "Sta.".
+        Correspondências exatas vêm primeiro, depois cidades principais, demais
+        cidades e bairros, dos nomes mais curtos para os mais longos.
+        
+        Args:
+            prefix (str): Texto digitado até agora
+            state (Optional[str]): Sigla do estado para restringir as sugestões
+            limit (int): Número máximo de sugestões
+            
+        Returns:
+            List[Dict[str, Optional[str]]]: Sugestões com 'name', 'type' ('city' ou
+            'neighborhood'), 'city' e 'state'
+        """
+        return [dict(suggestion) for suggestion in self.prefix_index.search(prefix, state, limit)]
+
+    def find_municipality(self, city: str, state: Optional[str] = None) -> Optional[Municipality]:
+        """
+        Find the gazetteer municipality a city name refers to.
+        
+        Args:
+            city (str): City name in any casing or accentuation, e.g. the 'city' of a result
+            state (Optional[str]): State sigla; without it the name must belong to a single state
+            
+        Returns:
+            Optional[Municipality]: IBGE code, official name, state and major flag, or None when
+            the name is not a municipality of the state (or is ambiguous without one)
+        """
+        return self._find_municipality(self._snapshot, city, state)
+
+    def _find_municipality(self, snapshot: GazetteerSnapshot, city: str,
+                           state: Optional[str] = None) -> Optional[Municipality]:
+        """find_municipality over snapshot."""
+        normalized_name = self.normalize_text(city)
+        if state is None:
+            states = snapshot.homonym_states.get(normalized_name)
+            if not states or len(states) > 1:
+                return None
+            state = next(iter(states))
+        index = snapshot.municipality_ids.get((normalized_name, state))
+        return snapshot.gazetteer.municipalities[index] if index is not None else None
+
+    def _codes(self, snapshot: GazetteerSnapshot, city: Optional[str],
+               state: Optional[str]) -> Tuple[Optional[Municipality], Optional[int]]:
+        """Municipality and IBGE state code of a result's city and state."""
+        municipality = self._find_municipality(snapshot, city, state) if city else None
+        if municipality is None and city:
+            # Um bairro devolvido como cidade identifica o município dele
+            parent = snapshot.neighborhood_to_city.get(city.strip().lower())
+            if parent is not None:
+                municipality = self._find_municipality(snapshot, parent, state)
+        if municipality is not None:
+            state = municipality.state
+        return municipality, snapshot.gazetteer.state_code(state) if state else None
+
+    def _spatial_index(self, snapshot: GazetteerSnapshot):
+        """Spatial index of snapshot's municipalities and their IBGE codes (0 last)."""
+        version, spatial = self._spatial
+        if version == snapshot.version:
+            return spatial
+        
+        # NumPy só é carregado por quem faz consultas espaciais
+        import numpy as np
+        from spatial_index import SpatialIndex
+        coordinates = np.frombuffer(snapshot.gazetteer.municipality_coordinates, dtype=np.float32).reshape(-1, 2)
+        # Mesmo arredondamento de Gazetteer.municipality: a cidade fica a 0 km de si mesma
+        coordinates = coordinates.astype(np.float64).round(COORDINATE_DIGITS)
+        # A posição -1 (sem resposta) cai no 0 do fim
+        codes = np.array([municipality.code for municipality in snapshot.gazetteer.municipalities] + [0],
+                         dtype=np.int32)
+        spatial = (SpatialIndex(coordinates[:, 0], coordinates[:, 1]), codes)
+        self._spatial = (snapshot.version, spatial)
+        return spatial
+    
+    def coordinates(self, name: str, state: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """
+        Latitude and longitude of a municipality or neighborhood.
+        
+        Args:
+            name (str): Municipality or neighborhood name, e.g. the 'city' of a result
+            state (Optional[str]): State sigla, needed for municipality names shared by several states
+            
+        Returns:
+            Optional[Tuple[float, float]]: Coordinates in degrees; a neighborhood without its own
+            falls back to its municipality's. None when unknown
+        """
+        return self._coordinates(self._snapshot, name, state)
+
+    def _coordinates(self, snapshot: GazetteerSnapshot, name: str,
+                     state: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """coordinates over snapshot."""
+        municipality = self._find_municipality(snapshot, name, state)
+        if municipality is None:
+            key = name.strip().lower()
+            found = snapshot.gazetteer.neighborhood_coordinates(key)
+            if found is not None:
+                return found
+            parent = snapshot.neighborhood_to_city.get(key)
+            municipality = self._find_municipality(snapshot, parent, state) if parent is not None else None
+        if municipality is None or math.isnan(municipality.latitude):
+            return None
+        return municipality.latitude, municipality.longitude
+    
+    def nearest_city(self, latitude: float, longitude: float) -> Optional[Dict[str, object]]:
+        """
+        Find the municipality closest to a coordinate.
+        
+        Args:
+            latitude (float): Latitude in degrees
+            longitude (float): Longitude in degrees
+            
+        Returns:
+            Optional[Dict[str, object]]: 'city', 'state', 'city_code' and 'state_code' as in
+            extract_canonical, plus 'distance_km' to the municipality's coordinates; None for NaN input
+        """
+        snapshot = self._snapshot
+        spatial, _ = self._spatial_index(snapshot)
+        positions, distances = spatial.nearest(latitude, longitude)
+        if positions < 0:
+            return None
+        municipality = snapshot.gazetteer.municipalities[int(positions)]
+        return {
+            'city': municipality.name,
+            'state': municipality.state,
+            'city_code': municipality.code,
+            'state_code': snapshot.gazetteer.state_code(municipality.state),
+            'distance_km': float(distances),
+        }
+    
+    def nearest_cities(self, latitudes, longitudes):
+        """
+        Find the municipality closest to each of many coordinates, vectorized.
+        
+        Args:
+            latitudes: Array-like of latitudes in degrees
+            longitudes: Array-like of longitudes in degrees, same shape
+            
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: IBGE codes (int32, 0 for NaN input) and
+            distances in km (NaN for NaN input)
+        """
+        spatial, codes = self._spatial_index(self._snapshot)
+        positions, distances = spatial.nearest(latitudes, longitudes)
+        return codes[positions], distances
+    
+    def cities_within(self, city: str, km: float, state: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Dict[str, object]]:
+        """
+        List the municipalities within a radius of a city or neighborhood, nearest first.
+        
+        Args:
+            city (str): Municipality or neighborhood name (see coordinates)
+            km (float): Radius in km
+            state (Optional[str]): State sigla of the city
+            limit (Optional[int]): Maximum number of municipalities returned
+            
+        Returns:
+            List[Dict[str, object]]: Same keys as nearest_city, with distances from the city's
+            coordinates (a municipality comes first itself, at 0 km). Empty when they are unknown
+        """
+        snapshot = self._snapshot
+        center = self._coordinates(snapshot, city, state)
+        if center is None:
+            return []
+        spatial, _ = self._spatial_index(snapshot)
+        positions, distances = spatial.within(*center, km, limit)
+        municipalities = snapshot.gazetteer.municipalities
+        results = []
+        for position, distance in zip(positions.tolist(), distances.tolist()):
+            municipality = municipalities[position]
+            results.append({
+                'city': municipality.name,
+                'state': municipality.state,
+                'city_code': municipality.code,
+                'state_code': snapshot.gazetteer.state_code(municipality.state),
+                'distance_km': distance,
+            })
+        return results
+    
+    def _prepare_city_text(self, snapshot: GazetteerSnapshot, prepared: PreparedText,
+                           state: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Run the cheap steps of extract_city that come before spaCy.
+
+        Returns:
+            Tuple[bool, Optional[str]]: (True, city) when the answer is already known,
+            or (False, cleaned_text) when the cleaned text still needs the NLP pipeline.
+        """
+        text = prepared.text
+        normalized_text = prepared.normalized
         
         # Check if the text itself is a state capital or major city
         if normalized_text in self.state_capitals:
-            return text.strip()
+            return True, text.strip()
             
         # If the text is only a state (either abbreviation or full name), return None
-        if state and (text.upper() == state or normalized_text == self.state_mapping[state].lower()):
-            return None
+        if state and (prepared.upper == state or normalized_text == snapshot.state_mapping[state].lower()):
+            return True, None
             
         # Remove state information if present
         if state:
-            text = re.sub(rf'\s*[-\/]\s*{state}\b', '', text, flags=re.IGNORECASE)
-            text = re.sub(rf'\s*[-\/]\s*{self.state_mapping[state]}\b', '', text, flags=re.IGNORECASE)
+            sigla_pattern, name_pattern = snapshot.state_strip_patterns[state]
+            text = sigla_pattern.sub('', text)
+            text = name_pattern.sub('', text)
         
         # Remove common separators
-        text = re.sub(r'\s*[-\/]\s*', ' ', text)
+        text = SEPARATOR_PATTERN.sub(' ', text)
         
         if not text.strip():
-            return None
+            return True, None
             
-        # Process with spaCy
-        doc = self.nlp(text)
+        return False, text
+
+    def _resolve_city(self, snapshot: GazetteerSnapshot, doc, text: str, normalized_text: str,
+                      state: Optional[str] = None, deadline: Optional[float] = None) -> Optional[str]:
+        """
+        Pick the city from a processed spaCy doc of the cleaned text.
         
+        Raises _OutOfBudget before a fallback stage when deadline has passed.
+        """
         # Find all potential location entities with confidence scores and types
-        locations = self.find_location_entities(doc)
+        with self._timed('find_location_entities'):
+            locations = self._find_location_entities(snapshot, doc)
+        
+        # Sem estado que as confirme, expressões comuns ("Feliz Natal") não são
+        # cidades, nem as palavras delas servem para a busca por nome parcial
+        ambiguous = [] if state else [(start, end) for _, _, _, norm, start, end in locations
+                                      if norm in AMBIGUOUS_NAMES]
         
         if locations:
             # Ordena por confiança (maior primeiro)
             locations.sort(key=lambda x: x[1], reverse=True)
             
             # Primeiro procura por cidades
-            cities = [(loc, conf) for loc, conf, type_ in locations if type_ == 'city']
+            cities = [(loc, conf, norm) for loc, conf, type_, norm, _, _ in locations if type_ == 'city']
             if cities:
-                for city, confidence in cities:
-                    city_lower = self.normalize_text(city)
+                for city, confidence, city_lower in cities:
                     # Se é uma capital de estado ou cidade importante
                     if city_lower in self.state_capitals:
-                        return city.strip()
+                        return self._branch('city_entity', city.strip())
                     # Se é uma cidade normal
-                    elif state is None or self.city_to_state[city_lower] == state:
-                        return city.strip()
+                    elif state is None and city_lower not in AMBIGUOUS_NAMES:
+                        return self._branch('city_entity', city.strip())
+                    elif state and (snapshot.city_to_state[city_lower] == state
+                                    or state in snapshot.homonym_states.get(city_lower, ())):
+                        return self._branch('city_entity', city.strip())
             
             # Se não encontrou cidade, procura por bairros
-            neighborhoods = [(loc, conf) for loc, conf, type_ in locations if type_ == 'neighborhood']
+            neighborhoods = [(loc, conf, norm) for loc, conf, type_, norm, _, _ in locations if type_ == 'neighborhood']
             if neighborhoods:
-                for neighborhood, confidence in neighborhoods:
-                    neighborhood_lower = self.normalize_text(neighborhood)
-                    
-                    # Se é um bairro conhecido
-                    if neighborhood_lower in self.neighborhood_to_city:
-                        city = self.neighborhood_to_city[neighborhood_lower]
-                        if state is None or self.city_to_state.get(city) == state:
-                            return city.strip()
-                    
-                    # Se parece ser um bairro e temos confiança suficiente
-                    elif confidence >= 0.7:
-                        if state:
+                self._check_deadline(deadline, 'neighborhood_fallback')
+                with self._timed('neighborhood_fallback'):
+                    normalized_cleaned = None
+                    for neighborhood, confidence, neighborhood_lower in neighborhoods:
+                        
+                        # Se é um bairro conhecido
+                        if neighborhood_lower in snapshot.neighborhood_to_city:
+                            city = snapshot.neighborhood_to_city[neighborhood_lower]
+                            if state is None or snapshot.city_to_state.get(city) == state:
+                                return self._branch('known_neighborhood', city.strip())
+                        
+                        # Se parece ser um bairro e temos confiança suficiente
+                        elif confidence >= 0.7:
                             # Tenta inferir a cidade do bairro pelo contexto
-                            for city, city_state in self.city_to_state.items():
-                                if city_state == state and city in text.lower():
-                                    return city.strip()
-                        else:
-                            # Se não temos estado, procura a cidade no contexto
-                            for city in self.city_to_state:
-                                if city in text.lower():
-                                    return city.strip()
+                            if normalized_cleaned is None:
+                                normalized_cleaned = self.normalize_text(text)
+                            for tier, _, city, city_state in self._gazetteer_hits(snapshot, normalized_cleaned):
+                                if tier == LOCATION_TIER and (state is None or city_state == state):
+                                    return self._branch('inferred_neighborhood', city.strip())
         
         # Se não encontrou nada pelos métodos anteriores, tenta encontrar por nome parcial
         # Pega a primeira palavra que parece um nome próprio
         for token in doc:
-            if token.pos_ == "PROPN" and token.text.lower() not in self.ignore_words:
-                possible_city = self.find_matching_city(token.text, state)
+            if any(start <= token.idx < end for start, end in ambiguous):
+                continue
+            if token.pos_ == "PROPN" and token.text.lower() not in snapshot.ignore_words:
+                self._check_deadline(deadline, 'find_matching_city')
+                with self._timed('find_matching_city'):
+                    possible_city = self._find_matching_city(snapshot, token.text, state)
                 if possible_city:
-                    return possible_city
+                    return self._branch('fuzzy_partial', possible_city)
         
         # Última tentativa: verifica se o texto inteiro é uma cidade
         if normalized_text in self.state_capitals:
-            return text.strip()
+            return self._branch('whole_text_capital', text.strip())
             
-        return None
+        return self._branch('none', None)
+
+    def extract_city(self, text: str, state: Optional[str] = None) -> Optional[str]:
+        """Extract city name from text."""
+        snapshot = self._snapshot
+        key = ('city', text, state)
+        cached = self._cached(key, snapshot.version)
+        if cached is not None:
+            return cached[0]
+        
+        prepared = self.prepare(text)
+        normalized_text = prepared.normalized
+        done, value = self._prepare_city_text(snapshot, prepared, state)
+        if not done:
+            # Process with spaCy
+            with self._timed('spacy'):
+                doc = self.nlp(value)
+            value = self._resolve_city(snapshot, doc, value, normalized_text, state)
+        
+        self._store(key, (value,), snapshot.version)
+        return value
 
-    def extract(self, text: str) -> Dict[str, Optional[str]]:
+    def _lookup_state(self, snapshot: GazetteerSnapshot, text: str, normalized_text: Optional[str] = None,
+                      structured: bool = False) -> Optional[str]:
         """
-        Extract city and state information from text.
+        Resolve text that is exactly a state sigla or state name.
         
         Args:
-            text (str): Input text containing city and state information
+            text (str): Candidate state
+            normalized_text (Optional[str]): text already normalized with whitespace collapsed
+            structured (bool): text comes after the separator of "City - UF"; only there a
+                lowercase sigla counts, elsewhere "se", "to" or "pa" are ordinary words
             
         Returns:
-            Dict[str, Optional[str]]: Dictionary with 'city' and 'state' keys
+            Optional[str]: State sigla or None
         """
-        # Normalize the text first
-        normalized_text = self.normalize_text(text)
+        if normalized_text is None:
+            normalized_text = " ".join(self.normalize_text(text).split())
+        if len(normalized_text) == 2 and normalized_text.upper() in snapshot.state_mapping:
+            return normalized_text.upper() if structured or text.strip().isupper() else None
+        return snapshot.normalized_state_names.get(normalized_text)
+
+    def _lookup_city(self, snapshot: GazetteerSnapshot, text: str, state: Optional[str] = None,
+                     normalized_text: Optional[str] = None) -> Optional[Tuple[str, str, bool]]:
+        """
+        Resolve text that is exactly a known city (or neighborhood), a city alias or
+        an abbreviated municipality name ("Sto. André").
         
-        # Se o texto é uma capital de estado, já sabemos a cidade e o estado
-        if normalized_text in self.state_capitals:
-            return {
-                'city': text.strip(),
-                'state': self.state_capitals[normalized_text]
-            }
+        Args:
+            text (str): Candidate city name
+            state (Optional[str]): Preferred state, for names shared by several municipalities
+            normalized_text (Optional[str]): text already normalized with whitespace collapsed
+            
+        Returns:
+            Optional[Tuple[str, str, bool]]: (city, state, came_from_alias) or None; aliases
+            and abbreviations give the official municipality name
+        """
+        if normalized_text is None:
+            normalized_text = " ".join(self.normalize_text(text).split())
+        if state and state in snapshot.homonym_states.get(normalized_text, ()):
+            return " ".join(text.split()), state, False
         
-        # First try to extract state
-        state = self.extract_state(text)
+        # Um apelido vence um município de mesmo nome escrito sem acento ("POA" x "Poá")
+        alias = snapshot.alias_index.get(normalized_text)
+        if alias and (state is None or alias[1] == state):
+            if normalized_text not in snapshot.normalized_city_to_state or normalized_text == " ".join(text.lower().split()):
+                return alias[0], alias[1], True
         
-        # Then extract city
-        city = self.extract_city(text, state)
+        city_state = snapshot.normalized_city_to_state.get(normalized_text)
+        if city_state:
+            return " ".join(text.split()), city_state, False
+        
+        # Abreviações expandidas ("rib. preto" -> "ribeirao preto")
+        expanded = snapshot.alias_index.expand(normalized_text)
+        states = snapshot.homonym_states.get(expanded) if expanded != normalized_text else None
+        if states:
+            if state not in states:
+                state = self._municipality_state(snapshot, expanded)
+            index = snapshot.municipality_ids[(expanded, state)]
+            return snapshot.gazetteer.municipalities[index].name, state, True
+        return alias + (True,) if alias else None
+
+    def _resolve_structured(self, snapshot: GazetteerSnapshot, prepared: PreparedText) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Try the cheap tiers: "City <sep> UF/State" format, exact gazetteer and alias lookups.
+        Returns None when only the NLP path can decide.
+        """
+        text = prepared.text
+        # 1. Formato "Cidade - UF" / "Cidade / Estado"
+        match = CITY_STATE_FORMAT.match(text)
+        if match:
+            state = self._lookup_state(snapshot, match.group('state'), structured=True)
+            city = self._lookup_city(snapshot, match.group('city'), state) if state else None
+            if city and city[1] == state:
+                return {'city': city[0], 'state': state, 'tier': 'format'}
+            # "Bahia - BA": o nome antes do separador é o próprio estado, sem cidade
+            if state and self._lookup_state(snapshot, match.group('city')) == state:
+                return {'city': None, 'state': state, 'tier': 'format'}
+        
+        # 2. O texto inteiro é um estado
+        state = self._lookup_state(snapshot, text, prepared.collapsed)
+        if state:
+            return {'city': None, 'state': state, 'tier': 'gazetteer'}
+        
+        # 3. O texto inteiro é uma cidade conhecida ou um apelido
+        city = self._lookup_city(snapshot, text, normalized_text=prepared.collapsed)
+        if city:
+            return {'city': city[0], 'state': city[1], 'tier': 'alias' if city[2] else 'gazetteer'}
         
+        return None
+
+    def _build_result(self, city: Optional[str], state: Optional[str], tier: str) -> Dict[str, Optional[str]]:
+        """Assemble the final result, making sure capitals carry their own state."""
         # Se encontrou uma cidade que é capital de estado, garante que o estado está correto
         if city:
             city_lower = self.normalize_text(city)
@@ -396,5 +1320,470 @@ class CityExtractor:
         
         return {
             'city': city,
-            'state': state
-        } 
\ No newline at end of file
+            'state': state,
+            'tier': tier
+        }
+
+    def _plan(self, snapshot: GazetteerSnapshot,
+              text: str) -> Tuple[Optional[Dict[str, Optional[str]]], Optional[Tuple[str, str, Optional[str], int, str]]]:
+        """
+        Run every tier that does not need spaCy, over snapshot.
+        
+        Returns:
+            Either (result, None) when a cheap tier answered, or
+            (None, (cleaned_text, normalized_text, state, gazetteer_version, text)) when the
+            text must go through spaCy.
+        """
+        version = snapshot.version
+        # O cache usa o texto exato: a cidade devolvida mantém a grafia da entrada
+        cached = self._cached(('resolve', text), version)
+        if cached is not None:
+            return self._branch('cache', dict(cached)), None
+        
+        # Normalize the text first, once for every stage
+        with self._timed('normalize'):
+            prepared = self.prepare(text)
+        
+        with self._timed('cheap_tiers'):
+            result, pending = self._plan_uncached(snapshot, prepared)
+        if result is not None:
+            self._branch(result['tier'], None)
+            self._store(('resolve', text), result, version)
+            result = dict(result)
+        elif pending is not None:
+            pending = pending + (version, text)
+        return result, pending
+
+    def _plan_uncached(self, snapshot: GazetteerSnapshot, prepared: PreparedText):
+        """Same as _plan, without looking at the result cache."""
+        text = prepared.text
+        normalized_text = prepared.normalized
+        # Se o texto é uma capital de estado, já sabemos a cidade e o estado
+        if normalized_text in self.state_capitals:
+            return {
+                'city': text.strip(),
+                'state': self.state_capitals[normalized_text],
+                'tier': 'capital'
+            }, None
+        
+        result = self._resolve_structured(snapshot, prepared)
+        if result:
+            return result, None
+        
+        # First try to extract state
+        state = self._extract_state(snapshot, prepared)
+        
+        # Then the cheap steps of extract_city
+        done, value = self._prepare_city_text(snapshot, prepared, state)
+        if done:
+            return self._build_result(value, state, 'rules'), None
+        
+        return None, (value, normalized_text, state)
+
+    def _finish_nlp(self, snapshot: GazetteerSnapshot, doc, pending: Tuple[str, str, Optional[str], int, str],
+                    deadline: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Resolve a text that needed spaCy and cache the result (raises _OutOfBudget past deadline)."""
+        cleaned_text, normalized_text, state, version, text = pending
+        city = self._resolve_city(snapshot, doc, cleaned_text, normalized_text, state, deadline)
+        result = self._build_result(city, state, 'nlp')
+        self._store(('resolve', text), result, version)
+        return dict(result)
+
+    def _partial_result(self, pending: Tuple[str, str, Optional[str], int, str], stage: str) -> Dict[str, Optional[str]]:
+        """Best answer known when the budget ran out before stage: the state of the cheap tiers."""
+        # Nunca vai para o cache nem para o armazenamento: outra chamada pode ter mais tempo
+        return self._branch(PARTIAL_TIER, {'city': None, 'state': pending[2], 'tier': PARTIAL_TIER, 'stage': stage})
+
+    def resolve(self, text: str, budget: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """
+        Extract city and state information from text, recording which tier answered.
+        
+        The tiers are tried from cheapest to most expensive (see RESOLUTION_TIERS):
+        state capitals, the "City - UF" format parser, exact gazetteer lookup,
+        alias lookup, the regex rules and finally the spaCy pipeline.
+        
+        With a budget, the deadline is checked before spaCy and before each of its
+        fallbacks (the neighborhood search and every find_matching_city call). Once
+        it has passed, the call returns what the cheap tiers found (the state, if
+        any) with tier 'partial' and 'stage' set to the first stage skipped.
+        
+        Args:
+            text (str): Input text containing city and state information
+            budget (Optional[float]): Seconds this call may take (default: the extractor's budget)
+            
+        Returns:
+            Dict[str, Optional[str]]: Dictionary with 'city', 'state' and 'tier' keys,
+            plus 'stage' for partial results
+        """
+        return self._resolve(self._snapshot, text, budget)
+
+    def _resolve(self, snapshot: GazetteerSnapshot, text: str, budget: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """resolve over snapshot."""
+        deadline = self._deadline(budget)
+        with self._timed('resolve'):
+            result, pending = self._plan(snapshot, text)
+            if result is None:
+                stored = self._stored_results(snapshot, [pending]).get(self._store_key(pending))
+                if stored is not None:
+                    result = self._branch('store', dict(stored))
+                else:
+                    try:
+                        self._check_deadline(deadline, 'spacy')
+                        with self._timed('spacy'):
+                            doc = self.nlp(pending[0])
+                        result = self._finish_nlp(snapshot, doc, pending, deadline)
+                    except _OutOfBudget as stop:
+                        result = self._partial_result(pending, stop.stage)
+                    else:
+                        self._persist(snapshot, [(pending, result)])
+        
+        self.tier_counts[result['tier']] += 1
+        return result
+
+    def extract(self, text: str, budget: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """
+        Extract city and state information from text.
+        
+        Args:
+            text (str): Input text containing city and state information
+            budget (Optional[float]): Seconds this call may take (see resolve)
+            
+        Returns:
+            Dict[str, Optional[str]]: Dictionary with 'city' and 'state' keys; when the
+            budget ran out, also 'partial' (True) and 'stage'
+        """
+        return extract_result(self.resolve(text, budget))
+
+    def extract_canonical(self, text: str) -> Dict[str, Optional[object]]:
+        """
+        Extract city and state, identified by their IBGE codes.
+        
+        Unlike extract, the city is always the official municipality name, whatever
+        the casing or accents of the input; a neighborhood is replaced by its municipality.
+        
+        Args:
+            text (str): Input text containing city and state information
+            
+        Returns:
+            Dict[str, Optional[object]]: 'city' (official name) and 'city_code' (IBGE code),
+            both None when no municipality was found, plus 'state' and 'state_code'
+        """
+        snapshot = self._snapshot
+        result = self._resolve(snapshot, text)
+        municipality, state_code = self._codes(snapshot, result['city'], result['state'])
+        return {
+            'city': municipality.name if municipality else None,
+            'state': municipality.state if municipality else result['state'],
+            'city_code': municipality.code if municipality else None,
+            'state_code': state_code,
+        }
+
+    def extract_all(self, text: str) -> List[Dict[str, object]]:
+        """
+        Find every city, neighborhood and state mentioned in text, with one spaCy pass.
+        
+        Names from the gazetteer are found by the same scan extract_state uses, state
+        siglas when written in uppercase, and the remaining entities come from
+        find_location_entities (e.g. neighborhoods that are not in the gazetteer).
+        
+        Args:
+            text (str): Input text
+            
+        Returns:
+            List[Dict[str, object]]: One dict per mention, in text order, with 'text',
+            'type' ('city', 'neighborhood' or 'state'), 'confidence', 'start' and 'end'
+            (character span in text), and the resolved 'city' and 'state'
+        """
+        snapshot = self._snapshot
+        prepared = self.prepare(text)
+        if not prepared.normalized:
+            return []
+        mentions = []
+        spans = self._gazetteer_spans(snapshot, prepared.normalized)
+        siglas = [match for match in STATE_SIGLA_PATTERN.finditer(text) if match.group(1) in snapshot.state_mapping]
+        # Estados citados por sigla ou por nome, para escolher entre um bairro e
+        # um município pequeno de mesmo nome ("Ipanema, Rio de Janeiro - RJ")
+        text_states = {match.group(1) for match in siglas} | {
+            payload[3] for _, _, payloads in spans for payload in payloads if payload[0] == STATE_NAME_TIER
+        }
+        
+        # 1. Nomes do gazetteer, numa varredura só do texto normalizado
+        for start, end, payloads in spans:
+            start, end = prepared.original_span(start, end)
+            city_payloads = [payload for payload in payloads if payload[0] != STATE_NAME_TIER]
+            # "São Paulo" e "Rio de Janeiro" são cidade e estado: são o estado
+            # só logo depois de outro lugar ("Campinas, São Paulo")
+            previous = mentions[-1] if mentions else None
+            follows_place = previous is not None and previous['type'] == 'city' and \
+                MENTION_SEPARATOR.fullmatch(text, previous['end'], start) is not None
+            tier, _, name, state = min(payloads if follows_place or not city_payloads else city_payloads)
+            if tier == STATE_NAME_TIER:
+                mention = {'type': 'state', 'confidence': 1.0, 'city': None, 'state': state}
+            elif name in snapshot.neighborhood_to_city and self._reads_as_neighborhood(snapshot, name, state, text_states):
+                city = snapshot.neighborhood_to_city[name]
+                mention = {'type': 'neighborhood', 'confidence': 0.9,
+                           'city': snapshot.municipality_names.get(city, city.title()), 'state': state}
+            else:
+                mention = {'type': 'city', 'confidence': 1.0,
+                           'city': snapshot.municipality_names.get(name, text[start:end]), 'state': state}
+            mentions.append(dict(mention, text=text[start:end], start=start, end=end))
+        
+        # 2. Siglas de estado escritas em maiúsculas ("SP", "RJ")
+        for match in siglas:
+            mentions.append({'type': 'state', 'confidence': 1.0, 'city': None, 'state': match.group(1),
+                             'text': match.group(1), 'start': match.start(), 'end': match.end()})
+        
+        # 3. Entidades do spaCy que o gazetteer não cobriu
+        with self._timed('spacy'):
+            doc = self.nlp(text)
+        taken = [(mention['start'], mention['end']) for mention in mentions]
+        for entity, confidence, entity_type, _, start, end in self._find_location_entities(snapshot, doc):
+            if entity_type == 'unknown' or any(start < taken_end and taken_start < end for taken_start, taken_end in taken):
+                continue
+            taken.append((start, end))
+            mentions.append({'type': entity_type, 'confidence': confidence, 'city': None, 'state': None,
+                             'text': text[start:end], 'start': start, 'end': end})
+        
+        mentions.sort(key=lambda mention: mention['start'])
+        
+        # Resolve homônimos pelo estado citado no texto e liga bairros sem cidade
+        # conhecida à cidade citada mais perto deles
+        mentioned_states = {mention['state'] for mention in mentions if mention['type'] == 'state'}
+        cities = [mention for mention in mentions if mention['type'] == 'city' and mention['state']]
+        for mention in mentions:
+            if mention['type'] == 'city' and mention['city']:
+                states = snapshot.homonym_states.get(self.normalize_text(mention['city']), set()) & mentioned_states
+                if mention['state'] not in states and len(states) == 1:
+                    mention['state'] = states.pop()
+            elif mention['type'] == 'neighborhood' and mention['city'] is None and cities:
+                nearest = min(cities, key=lambda city: abs(city['start'] - mention['start']))
+                mention['city'], mention['state'] = nearest['city'], nearest['state']
+        
+        return [
+            {key: mention[key] for key in ('text', 'type', 'confidence', 'start', 'end', 'city', 'state')}
+            for mention in mentions
+        ]
+
+    def _reads_as_neighborhood(self, snapshot: GazetteerSnapshot, name: str, state: str, text_states: Set[str]) -> bool:
+        """
+        Whether a known neighborhood name found in free text means the neighborhood
+        rather than a municipality of the same name.
+        
+        Args:
+            name (str): Lowercase name, a key of neighborhood_to_city
+            state (str): State the gazetteer prefers for the name
+            text_states (Set[str]): States mentioned anywhere in the text
+        """
+        normalized_name = self.normalize_text(name)
+        municipality_states = snapshot.homonym_states.get(normalized_name, set())
+        index = snapshot.municipality_ids.get((normalized_name, state))
+        if index is not None and snapshot.gazetteer.municipalities[index].major:
+            return False
+        if not municipality_states:
+            return True
+        # O município só vence quando o texto cita o estado dele e não o do bairro
+        neighborhood_state = snapshot.city_to_state.get(snapshot.neighborhood_to_city[name])
+        return not (municipality_states & text_states) or neighborhood_state in text_states
+
+    def iter_resolve(self, texts: Iterable[str], batch_size: int = 256,
+                     n_process: int = 1, budget: Optional[float] = None) -> Iterator[Dict[str, Optional[str]]]:
+        """
+        Resolve a stream of texts, like ``resolve`` but batched.
+        
+        Texts that no cheap tier can answer are looked up in the result store
+        (if any) and the rest are sent through ``nlp.pipe``, both in batches;
+        results are yielded in input order and are identical to calling
+        ``resolve`` on each text. The model is only loaded if some text needs it.
+        
+        The budget applies to each item separately. spaCy runs once for the whole
+        batch, so an item's budget starts when its processed doc comes out of
+        ``nlp.pipe`` and bounds its fallback stages.
+        
+        Args:
+            texts (Iterable[str]): Input texts, consumed lazily (see PIPE_FLUSH_INTERVAL)
+            batch_size (int): Number of texts per spaCy batch
+            n_process (int): Number of processes used by spaCy
+            budget (Optional[float]): Seconds per item (default: the extractor's budget)
+            
+        Yields:
+            Dict[str, Optional[str]]: Dictionary with 'city', 'state' and 'tier' keys
+        """
+        return self._iter_resolve(self._snapshot, texts, batch_size, n_process, budget)
+
+    def _iter_resolve(self, snapshot: GazetteerSnapshot, texts: Iterable[str], batch_size: int,
+                      n_process: int, budget: Optional[float]) -> Iterator[Dict[str, Optional[str]]]:
+        """iter_resolve over snapshot."""
+        planned = self._planned(snapshot, texts, batch_size)
+        # Até o primeiro texto que precisa do spaCy os resultados saem direto, sem modelo
+        for result, first in planned:
+            if first is not None:
+                break
+            self.tier_counts[result['tier']] += 1
+            yield result
+        else:
+            return
+        
+        pending = {0: first}
+        results = {}
+        finished = []
+        planning = 0.0
+        
+        def feed():
+            # Alimenta um único nlp.pipe com os textos difíceis, planejando a entrada
+            # sob demanda; um texto vazio depois de PIPE_FLUSH_INTERVAL resultados
+            # baratos seguidos faz o pipe fechar o lote, o que limita a leitura antecipada
+            nonlocal planning
+            yield first[0], 0
+            index = cheap_run = 0
+            while True:
+                started = time.perf_counter()
+                item = next(planned, None)
+                planning += time.perf_counter() - started
+                if item is None:
+                    return
+                index += 1
+                result, pending_text = item
+                if pending_text is not None:
+                    cheap_run = 0
+                    pending[index] = pending_text
+                    yield pending_text[0], index
+                    continue
+                results[index] = result
+                cheap_run += 1
+                if cheap_run >= PIPE_FLUSH_INTERVAL:
+                    cheap_run = 0
+                    yield "", None
+        
+        def ready():
+            nonlocal next_index
+            while next_index in results:
+                result = results.pop(next_index)
+                self.tier_counts[result['tier']] += 1
+                yield result
+                next_index += 1
+        
+        next_index = 0
+        docs = self._pipe(feed(), batch_size=batch_size, n_process=n_process)
+        while True:
+            started, planned_before = time.perf_counter(), planning
+            item = next(docs, None)
+            if self.stats is not None:
+                # O planejamento feito dentro do pipe tem as suas próprias etapas
+                self.stats.record('spacy', time.perf_counter() - started - (planning - planned_before))
+            if item is None:
+                break
+            doc, index = item
+            if index is not None:
+                pending_text = pending.pop(index)
+                try:
+                    results[index] = self._finish_nlp(snapshot, doc, pending_text, self._deadline(budget))
+                except _OutOfBudget as stop:
+                    results[index] = self._partial_result(pending_text, stop.stage)
+                else:
+                    if self.result_store is not None:
+                        finished.append((pending_text, results[index]))
+                        if len(finished) >= batch_size:
+                            self._persist(snapshot, finished)
+                            finished = []
+            yield from ready()
+        
+        self._persist(snapshot, finished)
+        yield from ready()
+
+    def _planned(self, snapshot: GazetteerSnapshot, texts: Iterable[str], batch_size: int) -> Iterator[Tuple[Optional[Dict[str, Optional[str]]], Optional[Tuple[str, str, Optional[str], int, str]]]]:
+        """
+        _plan over a stream of texts, lazily and in input order. With a result store,
+        texts are planned batch_size at a time and those it already has come out as
+        results.
+        """
+        if self.result_store is None:
+            for text in texts:
+                yield self._plan(snapshot, text)
+            return
+        
+        waiting = []
+        for text in chain(texts, [None]):
+            if text is not None:
+                waiting.append(self._plan(snapshot, text))
+                if len(waiting) < batch_size:
+                    continue
+            stored = self._stored_results(snapshot, [pending_text for _, pending_text in waiting if pending_text is not None])
+            for result, pending_text in waiting:
+                found = stored.get(self._store_key(pending_text)) if pending_text is not None else None
+                if found is not None:
+                    yield self._branch('store', dict(found)), None
+                else:
+                    yield result, pending_text
+            waiting = []
+
+    def _pipe(self, items: Iterator[Tuple[str, int]], batch_size: int, n_process: int) -> Iterator:
+        """nlp.pipe over (text, index) items, loading the model only when the first item arrives."""
+        first = next(items, None)
+        if first is None:
+            return
+        yield from self.nlp.pipe(chain([first], items), as_tuples=True, batch_size=batch_size, n_process=n_process)
+
+    def iter_extract(self, texts: Iterable[str], batch_size: int = 256,
+                     n_process: int = 1, budget: Optional[float] = None) -> Iterator[Dict[str, Optional[str]]]:
+        """
+        Extract city and state information from a stream of texts.
+        
+        Results are yielded in input order and are identical to calling
+        ``extract`` on each text.
+        
+        Args:
+            texts (Iterable[str]): Input texts, consumed lazily
+            batch_size (int): Number of texts per spaCy batch
+            n_process (int): Number of processes used by spaCy
+            budget (Optional[float]): Seconds per item (see iter_resolve)
+            
+        Yields:
+            Dict[str, Optional[str]]: Dictionary with 'city' and 'state' keys (see extract)
+        """
+        for result in self.iter_resolve(texts, batch_size=batch_size, n_process=n_process, budget=budget):
+            yield extract_result(result)
+
+    def extract_batch(self, texts: Iterable[str], batch_size: int = 256,
+                      n_process: int = 1, budget: Optional[float] = None) -> List[Dict[str, Optional[str]]]:
+        """
+        Extract city and state information from many texts at once.
+        
+        Args:
+            texts (Iterable[str]): Input texts
+            batch_size (int): Number of texts per spaCy batch
+            n_process (int): Number of processes used by spaCy
+            budget (Optional[float]): Seconds per item (see iter_resolve)
+            
+        Returns:
+            List[Dict[str, Optional[str]]]: One result per input, in input order
+        """
+        return list(self.iter_extract(texts, batch_size=batch_size, n_process=n_process, budget=budget))
+
+    def extract_columns(self, texts: Iterable[str], batch_size: int = 256,
+                        n_process: int = 1) -> ExtractionColumns:
+        """
+        Extract many texts into two compact arrays instead of one dict per text.
+        
+        Args:
+            texts (Iterable[str]): Input texts
+            batch_size (int): Number of texts per spaCy batch
+            n_process (int): Number of processes used by spaCy
+            
+        Returns:
+            ExtractionColumns: IBGE municipality codes (int32) and state codes (uint8),
+            0 where extract_canonical would give None
+        """
+        columns = ExtractionColumns(array('i'), array('B'))
+        # Poucos pares (cidade, UF) distintos se repetem em muitas linhas
+        codes = LRUCache(COLUMN_CODES_CACHE_SIZE)
+        snapshot = self._snapshot
+        for result in self._iter_resolve(snapshot, texts, batch_size, n_process, None):
+            key = (result['city'], result['state'])
+            row = codes.get(key)
+            if row is None:
+                municipality, state_code = self._codes(snapshot, *key)
+                row = (municipality.code if municipality else 0, state_code or 0)
+                codes.put(key, row)
+            columns.city_code.append(row[0])
+            columns.state_code.append(row[1])
+        return columns
@@ -0,0 +1,134 @@
+"""
+Índice de n-gramas para busca aproximada de nomes de cidades.
+
+Substitui a varredura de difflib.get_close_matches sobre o gazetteer inteiro:
+o índice invertido de bigramas de caracteres escolhe poucos candidatos e só eles são
+comparados com SequenceMatcher. Os n-gramas mais raros da consulta são lidos
+primeiro e, passadas MAX_POSTINGS postagens, os comuns só pontuam os
+candidatos já achados, então o número de candidatos ordenados não cresce com
+o tamanho do gazetteer. As listas de postagem são separadas por estado para
+que o filtro de estado reduza a busca.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Bigramas recuperam melhor que trigramas os nomes curtos com erro de digitação
+NGRAM_SIZE = 2
+# Quantos candidatos, no máximo, são comparados com SequenceMatcher por busca
+MAX_CANDIDATES = 32
+# Quantas postagens uma busca lê antes que os n-gramas comuns deixem de criar candidatos
+MAX_POSTINGS = 256
+# N-gramas lidos por inteiro mesmo acima de MAX_POSTINGS: cada letra trocada,
+# faltando ou sobrando cria até dois n-gramas raros que o nome certo não tem
+MIN_SCANNED_GRAMS = 4
+
+
+def ngrams(text: str, size: int = NGRAM_SIZE) -> Set[str]:
+    """Character n-grams of text, padded so that the first and last letters count."""
+    padded = " " * (size - 1) + text + " "
+    return {padded[index:index + size] for index in range(len(padded) - size + 1)}
+
+
+class FuzzyIndex:
+    """Character n-gram inverted index over names, partitioned by state."""
+
+    def __init__(self, names: Iterable[Tuple[str, str]], normalize: Callable[[str], str] = str.lower):
+        """
+        Build the index.
+
+        Args:
+            names (Iterable[Tuple[str, str]]): (name, state) pairs; the name is what searches return
+            normalize (Callable[[str], str]): Normalization applied to names and queries
+        """
+        self.normalize = normalize
+        self.names: List[str] = []
+        self.normalized: List[str] = []
+        self.gram_counts: List[int] = []
+        # estado (ou None para todos) -> n-grama -> ids dos nomes
+        self._postings: Dict[Optional[str], Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+
+        for name, state in names:
+            name_id = len(self.names)
+            normalized = normalize(name)
+            grams = ngrams(normalized)
+            self.names.append(name)
+            self.normalized.append(normalized)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings[None][gram].append(name_id)
+                self._postings[state][gram].append(name_id)
+
+        self._postings = {state: dict(postings) for state, postings in self._postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getstate__(self):
+        # normalize costuma ser um método do extrator; quem carrega o índice o recoloca
+        return dict(self.__dict__, normalize=None)
+
+    def search(self, query: str, state: Optional[str] = None, limit: int = 5, cutoff: float = 0.6,
+               max_candidates: int = MAX_CANDIDATES, max_postings: int = MAX_POSTINGS) -> List[Tuple[str, float]]:
+        """
+        Find the names most similar to query.
+
+        Args:
+            query (str): Name to look up (normalized by the index)
+            state (Optional[str]): Only search names of this state
+            limit (int): Maximum number of matches returned
+            cutoff (float): Minimum similarity score, between 0 and 1
+            max_candidates (int): How many n-gram candidates are scored with SequenceMatcher
+            max_postings (int): How many posting entries may add candidates; past it (and
+                past the MIN_SCANNED_GRAMS rarest n-grams), common n-grams only score the
+                candidates already found
+
+        Returns:
+            List[Tuple[str, float]]: (name, score) pairs, best first. The score is the same
+            ratio used by difflib.get_close_matches.
+        """
+        normalized_query = self.normalize(query)
+        postings = self._postings.get(state) if state else self._postings.get(None)
+        if not postings or not normalized_query:
+            return []
+
+        query_grams = ngrams(normalized_query)
+        # Os n-gramas raros escolhem os candidatos; os comuns ("a ", " s") só
+        # somam pontos a quem já foi escolhido
+        grams = sorted(query_grams, key=lambda gram: len(postings.get(gram, ())))
+        shared = Counter()
+        scanned = 0
+        for position, gram in enumerate(grams):
+            posting = postings.get(gram, ())
+            if position >= MIN_SCANNED_GRAMS and scanned + len(posting) > max_postings:
+                break
+            shared.update(posting)
+            scanned += len(posting)
+        else:
+            position = len(grams)
+        for gram in grams[position:]:
+            shared.update(filter(shared.__contains__, postings.get(gram, ())))
+
+        # Coeficiente de Dice sobre os n-gramas escolhe os candidatos
+        query_size = len(query_grams)
+        gram_counts = self.gram_counts
+        candidates = heapq.nsmallest(
+            max_candidates, shared,
+            key=lambda name_id: (-shared[name_id] / (query_size + gram_counts[name_id]), name_id)
+        )
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(normalized_query)
+        scored = []
+        for name_id in candidates:
+            matcher.set_seq1(self.normalized[name_id])
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                score = matcher.ratio()
+                if score >= cutoff:
+                    scored.append((score, self.normalized[name_id], name_id))
+
+        # Empates resolvidos como em get_close_matches: maior nome primeiro
+        best = heapq.nlargest(limit, scored)
+        return [(self.names[name_id], score) for score, _, name_id in best]
@@ -0,0 +1,579 @@
+"""
+Gazetteer compacto em formato binário, carregado via mmap.
+
+O arquivo é gerado a partir dos CSVs em data/ (estados, municípios do IBGE e
+bairros) e pode ser mapeado em memória em poucos milissegundos. Como as páginas
+do mmap são compartilhadas entre processos, a memória não cresce com o número
+de workers.
+
+Layout (little-endian):
+    header      MAGIC, versão do formato, SHA-1 das fontes e tabela de seções
+    seções      arrays de registros de tamanho fixo, alinhados em 4 bytes:
+        STRING_OFFSETS      uint32[n + 1], início de cada string no blob
+        STRING_DATA         blob UTF-8
+        STATES              (código IBGE, sigla, nome)
+        MUNICIPALITIES      (código IBGE, nome, estado, flags)
+        NEIGHBORHOODS       (nome, município)
+        STATE_KEYS          permutação dos estados ordenada pela sigla
+        CITY_KEYS           (chave, estado) na ordem de inserção
+        CITY_KEYS_SORTED    permutação de CITY_KEYS ordenada pela chave
+        NEIGHBORHOOD_KEYS   (chave, município) na ordem de inserção
+        NEIGHBORHOOD_KEYS_SORTED
+        MUNICIPALITY_COORDINATES    float32 (latitude, longitude) por município
+        NEIGHBORHOOD_COORDINATES    float32 (latitude, longitude) por NEIGHBORHOOD_KEYS
+
+Coordenadas desconhecidas são NaN.
+
+Strings são referenciadas por id (posição na tabela de strings). As chaves são
+os nomes em minúsculas; as buscas fazem busca binária sobre as permutações
+ordenadas, sem montar dicionários em memória.
+
+Uso:
+    python gazetteer.py build [--data-dir data] [--output data/gazetteer.bin]
+"""
+
+import argparse
+import csv
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import ItemsView, Mapping, Sequence
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+MAGIC = b'BRGZ'
+FORMAT_VERSION = 3
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_PATH = os.path.join(DATA_DIR, 'gazetteer.bin')
+SOURCE_FILES = ('estados.csv', 'municipios.csv', 'bairros.csv')
+
+(STRING_OFFSETS, STRING_DATA, STATES, MUNICIPALITIES, NEIGHBORHOODS, STATE_KEYS,
+ CITY_KEYS, CITY_KEYS_SORTED, NEIGHBORHOOD_KEYS, NEIGHBORHOOD_KEYS_SORTED,
+ MUNICIPALITY_COORDINATES, NEIGHBORHOOD_COORDINATES) = range(12)
+SECTION_COUNT = 12
+
+HEADER = struct.Struct('<4sHH20s')
+SECTION = struct.Struct('<II')
+UINT32 = struct.Struct('<I')
+STATE_RECORD = struct.Struct('<III')
+MUNICIPALITY_RECORD = struct.Struct('<iIBB2x')
+NEIGHBORHOOD_RECORD = struct.Struct('<Ii')
+CITY_KEY_RECORD = struct.Struct('<II')
+NEIGHBORHOOD_KEY_RECORD = struct.Struct('<Ii')
+COORDINATES = struct.Struct('<ff')
+# float32 guarda as 5 casas decimais das fontes; arredondar devolve o valor do CSV
+COORDINATE_DIGITS = 5
+
+# Flags dos municípios
+MAJOR = 1
+
+# Prioridade das chaves de CITY_TO_STATE quando o mesmo nome aparece mais de uma vez
+# (menor vence; em caso de empate vale a primeira linha). Um bairro conhecido vence
+# um município pequeno homônimo: "Ipanema" é o bairro do Rio, não a cidade de Minas
+STATE_NAME_RANK = 0
+MAJOR_CITY_RANK = 1
+NEIGHBORHOOD_RANK = 2
+CITY_RANK = 3
+
+
+class Municipality(NamedTuple):
+    code: int
+    name: str
+    state: str
+    major: bool
+    latitude: float  # NaN quando desconhecida
+    longitude: float
+
+
+def source_hash(data_dir: str = DATA_DIR) -> bytes:
+    """SHA-1 of the CSV sources and the format version."""
+    digest = hashlib.sha1(struct.pack('<H', FORMAT_VERSION))
+    for name in SOURCE_FILES:
+        with open(os.path.join(data_dir, name), 'rb') as source:
+            digest.update(source.read())
+    return digest.digest()
+
+
+def _read_csv(path: str) -> List[Dict[str, str]]:
+    with open(path, newline='', encoding='utf-8') as source:
+        return list(csv.DictReader(source))
+
+
+def _coordinates(row: Dict[str, str]) -> bytes:
+    """Packed (latitude, longitude) of a CSV row; NaN for empty or missing columns."""
+    return COORDINATES.pack(float(row.get('latitude') or 'nan'), float(row.get('longitude') or 'nan'))
+
+
+def build_gazetteer(data_dir: str = DATA_DIR) -> bytes:
+    """
+    Build the binary gazetteer from the CSV sources.
+
+    Args:
+        data_dir (str): Directory with estados.csv, municipios.csv and bairros.csv
+
+    Returns:
+        bytes: The packed gazetteer
+    """
+    strings: List[bytes] = []
+    string_ids: Dict[str, int] = {}
+
+    def sid(text: str) -> int:
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text.encode('utf-8'))
+        return string_ids[text]
+
+    states = _read_csv(os.path.join(data_dir, 'estados.csv'))
+    municipalities = _read_csv(os.path.join(data_dir, 'municipios.csv'))
+    neighborhoods = _read_csv(os.path.join(data_dir, 'bairros.csv'))
+
+    state_index = {row['sigla']: index for index, row in enumerate(states)}
+    municipality_index = {int(row['ibge_code']): index for index, row in enumerate(municipalities)}
+
+    state_records = [STATE_RECORD.pack(int(row['ibge_code']), sid(row['sigla']), sid(row['name']))
+                     for row in states]
+    municipality_records = [
+        MUNICIPALITY_RECORD.pack(int(row['ibge_code']), sid(row['name']), state_index[row['state']],
+                                 MAJOR if row['major'] == '1' else 0)
+        for row in municipalities
+    ]
+    neighborhood_records = [
+        NEIGHBORHOOD_RECORD.pack(sid(row['name']), municipality_index[int(row['municipality_code'])])
+        for row in neighborhoods
+    ]
+
+    # Chaves de CITY_TO_STATE: municípios, nomes de estados e bairros
+    # Como num dicionário, a chave fica na posição da primeira inserção e o
+    # valor é o da entrada de maior prioridade
+    city_keys: Dict[str, Tuple[int, int, int]] = {}
+
+    def add_city_key(name: str, state: int, rank: int, order: int):
+        key = name.lower()
+        if key not in city_keys or (rank, order) < city_keys[key][:2]:
+            city_keys[key] = (rank, order, state)
+
+    for order, row in enumerate(municipalities):
+        if row['major'] == '1':
+            add_city_key(row['name'], state_index[row['state']], MAJOR_CITY_RANK, order)
+    for order, row in enumerate(states):
+        add_city_key(row['name'], order, STATE_NAME_RANK, order)
+    for order, row in enumerate(neighborhoods):
+        municipality = municipalities[municipality_index[int(row['municipality_code'])]]
+        add_city_key(row['name'], state_index[municipality['state']], NEIGHBORHOOD_RANK, order)
+    for order, row in enumerate(municipalities):
+        if row['major'] != '1':
+            add_city_key(row['name'], state_index[row['state']], CITY_RANK, order)
+
+    # Ordem de inserção: cidades principais, estados e bairros (como o antigo
+    # dicionário) e só depois os demais municípios, que a varredura de texto
+    # livre e o índice por primeira palavra consultam por último
+    city_key_list = list(city_keys.items())
+    city_key_records = [CITY_KEY_RECORD.pack(sid(key), state) for key, (_, _, state) in city_key_list]
+
+    neighborhood_keys: Dict[str, Tuple[int, bytes]] = {}
+    for row in neighborhoods:
+        neighborhood_keys.setdefault(
+            row['name'].lower(), (municipality_index[int(row['municipality_code'])], _coordinates(row))
+        )
+    neighborhood_key_list = list(neighborhood_keys.items())
+    neighborhood_key_records = [NEIGHBORHOOD_KEY_RECORD.pack(sid(key), municipality)
+                                for key, (municipality, _) in neighborhood_key_list]
+
+    def sorted_permutation(keys: List[str]) -> bytes:
+        order = sorted(range(len(keys)), key=lambda index: keys[index].encode('utf-8'))
+        return b''.join(UINT32.pack(index) for index in order)
+
+    offsets = [0]
+    for encoded in strings:
+        offsets.append(offsets[-1] + len(encoded))
+
+    sections = [
+        (b''.join(UINT32.pack(offset) for offset in offsets), len(offsets)),
+        (b''.join(strings), offsets[-1]),
+        (b''.join(state_records), len(state_records)),
+        (b''.join(municipality_records), len(municipality_records)),
+        (b''.join(neighborhood_records), len(neighborhood_records)),
+        (sorted_permutation([row['sigla'] for row in states]), len(states)),
+        (b''.join(city_key_records), len(city_key_records)),
+        (sorted_permutation([key for key, _ in city_key_list]), len(city_key_list)),
+        (b''.join(neighborhood_key_records), len(neighborhood_key_records)),
+        (sorted_permutation([key for key, _ in neighborhood_key_list]), len(neighborhood_key_list)),
+        (b''.join(_coordinates(row) for row in municipalities), len(municipalities)),
+        (b''.join(coordinates for _, (_, coordinates) in neighborhood_key_list), len(neighborhood_key_list)),
+    ]
+
+    header_size = HEADER.size + SECTION.size * SECTION_COUNT
+    body = bytearray()
+    table = []
+    for payload, count in sections:
+        body.extend(b'\0' * (-(header_size + len(body)) % 4))
+        table.append(SECTION.pack(header_size + len(body), count))
+        body.extend(payload)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, SECTION_COUNT, source_hash(data_dir))
+    return header + b''.join(table) + bytes(body)
+
+
+def write_atomic(path: str, *chunks: bytes):
+    """
+    Write chunks to path atomically: readers see either the old file or the new one.
+
+    The file gets the permissions of a plain open() under the current umask.
+
+    Raises:
+        OSError: when the file can't be written (e.g. read-only install)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        # mkstemp cria o arquivo só para o dono; o arquivo final segue a umask, como um open() comum
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_path, 0o644 & ~umask)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def write_gazetteer(output_path: str = DEFAULT_PATH, data_dir: str = DATA_DIR) -> str:
+    """Build the gazetteer and write it atomically to output_path."""
+    write_atomic(output_path, build_gazetteer(data_dir))
+    return output_path
+
+
+class Gazetteer:
+    """Read-only view over a packed gazetteer (memory-mapped file or bytes)."""
+
+    def __init__(self, buffer):
+        """
+        Args:
+            buffer: The packed gazetteer (an mmap, bytes or any buffer)
+        """
+        magic, version, section_count, digest = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a gazetteer file or unsupported format version")
+        self._buffer = buffer
+        self.source_hash = digest
+        self._sections = [SECTION.unpack_from(buffer, HEADER.size + SECTION.size * index)
+                          for index in range(section_count)]
+        self._offsets = self._uint32_array(STRING_OFFSETS)
+        self._data_start = self._sections[STRING_DATA][0]
+        self._permutations = {}
+        self._siglas: Optional[List[str]] = None
+        self._state_codes: Optional[Dict[str, int]] = None
+
+        self.states = StatesView(self)
+        self.municipalities = MunicipalitiesView(self)
+        self.city_to_state = CityToStateView(self)
+        self.neighborhood_to_city = NeighborhoodToCityView(self)
+        self.major_cities = MajorCitiesView(self)
+        self.neighborhoods = NeighborhoodsView(self)
+
+    @classmethod
+    def open(cls, path: str) -> 'Gazetteer':
+        """Memory-map a gazetteer file."""
+        with open(path, 'rb') as source:
+            return cls(mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _uint32_array(self, section: int):
+        """A uint32 section as an indexable array, without copying when possible."""
+        offset, count = self._sections[section]
+        view = memoryview(self._buffer)[offset:offset + UINT32.size * count]
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        return [value for (value,) in UINT32.iter_unpack(view)]
+
+    def _coordinate_array(self, section: int):
+        """A coordinates section as a flat float32 array (latitude, longitude, ...)."""
+        offset, count = self._sections[section]
+        view = memoryview(self._buffer)[offset:offset + COORDINATES.size * count]
+        if sys.byteorder == 'little':
+            return view.cast('f')
+        return array('f', [value for pair in COORDINATES.iter_unpack(view) for value in pair])
+
+    @property
+    def municipality_coordinates(self):
+        """
+        Latitude and longitude of every municipality, flattened in source order,
+        as float32 (NaN when unknown). Zero-copy for numpy.frombuffer.
+        """
+        return self._coordinate_array(MUNICIPALITY_COORDINATES)
+
+    def neighborhood_coordinates(self, key: str) -> Optional[Tuple[float, float]]:
+        """(latitude, longitude) of a lowercase neighborhood name, or None when unknown."""
+        index = self.find(key, NEIGHBORHOOD_KEYS, NEIGHBORHOOD_KEYS_SORTED, NEIGHBORHOOD_KEY_RECORD)
+        if index < 0:
+            return None
+        latitude, longitude = self.record(NEIGHBORHOOD_COORDINATES, COORDINATES, index)
+        if math.isnan(latitude):
+            return None
+        return round(latitude, COORDINATE_DIGITS), round(longitude, COORDINATE_DIGITS)
+
+    def count(self, section: int) -> int:
+        return self._sections[section][1]
+
+    def string(self, string_id: int) -> str:
+        start, end = self._string_bounds(string_id)
+        return str(self._buffer[start:end], 'utf-8')
+
+    def _string_bounds(self, string_id: int) -> Tuple[int, int]:
+        return self._data_start + self._offsets[string_id], self._data_start + self._offsets[string_id + 1]
+
+    def record(self, section: int, layout: struct.Struct, index: int) -> tuple:
+        return layout.unpack_from(self._buffer, self._sections[section][0] + layout.size * index)
+
+    def find(self, key: str, keys_section: int, sorted_section: int, layout: struct.Struct,
+             key_field: int = 0) -> int:
+        """Binary search for key; returns the record index in keys_section or -1."""
+        encoded = key.encode('utf-8')
+        buffer = self._buffer
+        permutation = self._permutations.get(sorted_section)
+        if permutation is None:
+            permutation = self._permutations[sorted_section] = self._uint32_array(sorted_section)
+        records = self._sections[keys_section][0]
+        low, high = 0, len(permutation)
+        while low < high:
+            middle = (low + high) // 2
+            index = permutation[middle]
+            string_id = layout.unpack_from(buffer, records + layout.size * index)[key_field]
+            start, end = self._string_bounds(string_id)
+            candidate = buffer[start:end]
+            if candidate < encoded:
+                low = middle + 1
+            elif candidate > encoded:
+                high = middle
+            else:
+                return index
+        return -1
+
+    def state_sigla(self, state_index: int) -> str:
+        if self._siglas is None:
+            self._siglas = [self.string(self.record(STATES, STATE_RECORD, index)[1])
+                            for index in range(self.count(STATES))]
+        return self._siglas[state_index]
+
+    def state_code(self, sigla: str) -> Optional[int]:
+        """IBGE code of a state (e.g. 35 for SP), or None for an unknown sigla."""
+        if self._state_codes is None:
+            self._state_codes = {}
+            for index in range(self.count(STATES)):
+                code, sigla_id, _ = self.record(STATES, STATE_RECORD, index)
+                self._state_codes[self.string(sigla_id)] = code
+        return self._state_codes.get(sigla)
+
+    def municipality(self, index: int) -> Municipality:
+        code, name, state, flags = self.record(MUNICIPALITIES, MUNICIPALITY_RECORD, index)
+        latitude, longitude = self.record(MUNICIPALITY_COORDINATES, COORDINATES, index)
+        return Municipality(code, self.string(name), self.state_sigla(state), bool(flags & MAJOR),
+                            round(latitude, COORDINATE_DIGITS), round(longitude, COORDINATE_DIGITS))
+
+
+class _RecordItemsView(ItemsView):
+    """items() that walks the records once instead of looking up every key."""
+
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+class StatesView(Mapping):
+    """sigla -> state name, like the old STATES dict."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+
+    def __getitem__(self, sigla: str) -> str:
+        if not isinstance(sigla, str):
+            raise KeyError(sigla)
+        index = self._gazetteer.find(sigla, STATES, STATE_KEYS, STATE_RECORD, key_field=1)
+        if index < 0:
+            raise KeyError(sigla)
+        return self._gazetteer.string(self._gazetteer.record(STATES, STATE_RECORD, index)[2])
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self._gazetteer.state_sigla(index)
+
+    def __len__(self) -> int:
+        return self._gazetteer.count(STATES)
+
+
+class MunicipalitiesView(Sequence):
+    """Every municipality, in source order."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+
+    def __getitem__(self, index: int) -> Municipality:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return self._gazetteer.municipality(index % len(self))
+
+    def __len__(self) -> int:
+        return self._gazetteer.count(MUNICIPALITIES)
+
+
+class CityToStateView(Mapping):
+    """Lowercase city, state or neighborhood name -> state sigla, like the old CITY_TO_STATE."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+
+    def __getitem__(self, key: str) -> str:
+        if not isinstance(key, str):
+            raise KeyError(key)
+        index = self._gazetteer.find(key, CITY_KEYS, CITY_KEYS_SORTED, CITY_KEY_RECORD)
+        if index < 0:
+            raise KeyError(key)
+        return self._gazetteer.state_sigla(self._gazetteer.record(CITY_KEYS, CITY_KEY_RECORD, index)[1])
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self._gazetteer.string(self._gazetteer.record(CITY_KEYS, CITY_KEY_RECORD, index)[0])
+
+    def __len__(self) -> int:
+        return self._gazetteer.count(CITY_KEYS)
+
+    def items(self) -> ItemsView:
+        return _RecordItemsView(self)
+
+    def _iter_items(self) -> Iterator[Tuple[str, str]]:
+        gazetteer = self._gazetteer
+        for index in range(len(self)):
+            key, state = gazetteer.record(CITY_KEYS, CITY_KEY_RECORD, index)
+            yield gazetteer.string(key), gazetteer.state_sigla(state)
+
+
+class NeighborhoodToCityView(Mapping):
+    """Lowercase neighborhood name -> lowercase city name, like the old NEIGHBORHOOD_TO_CITY."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+
+    def __getitem__(self, key: str) -> str:
+        if not isinstance(key, str):
+            raise KeyError(key)
+        index = self._gazetteer.find(key, NEIGHBORHOOD_KEYS, NEIGHBORHOOD_KEYS_SORTED, NEIGHBORHOOD_KEY_RECORD)
+        if index < 0:
+            raise KeyError(key)
+        municipality = self._gazetteer.record(NEIGHBORHOOD_KEYS, NEIGHBORHOOD_KEY_RECORD, index)[1]
+        return self._gazetteer.municipality(municipality).name.lower()
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self._gazetteer.string(
+                self._gazetteer.record(NEIGHBORHOOD_KEYS, NEIGHBORHOOD_KEY_RECORD, index)[0])
+
+    def __len__(self) -> int:
+        return self._gazetteer.count(NEIGHBORHOOD_KEYS)
+
+    def items(self) -> ItemsView:
+        return _RecordItemsView(self)
+
+    def _iter_items(self) -> Iterator[Tuple[str, str]]:
+        gazetteer = self._gazetteer
+        for index in range(len(self)):
+            key, municipality = gazetteer.record(NEIGHBORHOOD_KEYS, NEIGHBORHOOD_KEY_RECORD, index)
+            yield gazetteer.string(key), gazetteer.municipality(municipality).name.lower()
+
+
+class MajorCitiesView(Mapping):
+    """state sigla -> names of the major cities of that state, like the old MAJOR_CITIES."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+        self._cities: Optional[Dict[str, List[str]]] = None
+
+    def _by_state(self) -> Dict[str, List[str]]:
+        # Montado na primeira consulta e reaproveitado: o arquivo não muda
+        if self._cities is None:
+            cities: Dict[str, List[str]] = {}
+            for municipality in self._gazetteer.municipalities:
+                if municipality.major:
+                    cities.setdefault(municipality.state, []).append(municipality.name)
+            self._cities = cities
+        return self._cities
+
+    def __getitem__(self, state: str) -> List[str]:
+        return self._by_state()[state]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_state())
+
+    def __len__(self) -> int:
+        return len(self._by_state())
+
+
+class NeighborhoodsView(Mapping):
+    """Lowercase city name -> lowercase neighborhood names, like the old NEIGHBORHOODS."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+        self._neighborhoods: Optional[Dict[str, List[str]]] = None
+
+    def _by_city(self) -> Dict[str, List[str]]:
+        if self._neighborhoods is None:
+            gazetteer = self._gazetteer
+            neighborhoods: Dict[str, List[str]] = {}
+            for index in range(gazetteer.count(NEIGHBORHOODS)):
+                name, municipality = gazetteer.record(NEIGHBORHOODS, NEIGHBORHOOD_RECORD, index)
+                city = gazetteer.municipality(municipality).name.lower()
+                neighborhoods.setdefault(city, []).append(gazetteer.string(name).lower())
+            self._neighborhoods = neighborhoods
+        return self._neighborhoods
+
+    def __getitem__(self, city: str) -> List[str]:
+        return self._by_city()[city]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_city())
+
+    def __len__(self) -> int:
+        return len(self._by_city())
+
+
+def load_gazetteer(path: str = DEFAULT_PATH, data_dir: str = DATA_DIR) -> Gazetteer:
+    """
+    Open the packed gazetteer, rebuilding it first when it is missing or older
+    than the CSV sources. If the file can't be written (read-only install), the
+    gazetteer is built in memory instead.
+    """
+    expected = source_hash(data_dir)
+    try:
+        gazetteer: Optional[Gazetteer] = Gazetteer.open(path)
+    except (OSError, ValueError):
+        gazetteer = None
+    if gazetteer is not None and gazetteer.source_hash == expected:
+        return gazetteer
+
+    try:
+        write_gazetteer(path, data_dir)
+    except OSError:
+        return Gazetteer(build_gazetteer(data_dir))
+    return Gazetteer.open(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gazetteer binário de cidades brasileiras")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Gera o arquivo binário a partir dos CSVs")
+    build.add_argument("--data-dir", default=DATA_DIR)
+    build.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    path = write_gazetteer(args.output, args.data_dir)
+    gazetteer = Gazetteer.open(path)
+    print(f"{path}: {len(gazetteer.municipalities)} municípios, "
+          f"{len(gazetteer.neighborhood_to_city)} bairros, {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
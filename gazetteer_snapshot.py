@@ -0,0 +1,86 @@
+"""
+Versões imutáveis do gazetteer e dos índices derivados dele.
+
+O CityExtractor lê tudo que vem do gazetteer (mapeamentos de estados, cidades e
+bairros, índices de prefixo e de similaridade, autômato de nomes) de um único
+GazetteerSnapshot. Recarregar o gazetteer monta um snapshot novo ao lado do
+atual e troca uma única referência: toda consulta vê um snapshot completo,
+nenhuma extração espera pela recarga e resultados calculados com a versão
+anterior não entram no cache.
+"""
+
+import copy
+import os
+from typing import FrozenSet
+
+from gazetteer import Gazetteer, build_gazetteer
+
+
+class GazetteerSnapshot:
+    """
+    One version of the gazetteer plus every index derived from it.
+
+    The source mappings are set here; CityExtractor._build_indexes adds the
+    derived indexes before the snapshot is published. After that it is never
+    changed: updates build a new snapshot (see replace).
+
+    Attributes:
+        version (int): Increases by one with every rebuild or reload
+        gazetteer (Gazetteer): The packed gazetteer the mappings come from
+        edited (bool): Whether a source mapping was replaced, so the data no
+            longer matches the gazetteer's files
+        ignore_words (FrozenSet[str]): Words never read as a place name
+    """
+
+    def __init__(self, gazetteer: Gazetteer, version: int = 0, ignore_words: FrozenSet[str] = frozenset()):
+        self.version = version
+        self.gazetteer = gazetteer
+        self.edited = False
+        self.state_mapping = gazetteer.states
+        self.reverse_state_mapping = {name.lower(): sigla for sigla, name in gazetteer.states.items()}
+        self.city_to_state = gazetteer.city_to_state
+        self.neighborhoods = gazetteer.neighborhoods
+        self.neighborhood_to_city = gazetteer.neighborhood_to_city
+        self.ignore_words = ignore_words
+
+    def __repr__(self) -> str:
+        return f"GazetteerSnapshot(version={self.version})"
+
+    def replace(self, **changes) -> 'GazetteerSnapshot':
+        """Shallow copy with some attributes replaced; the original is left untouched."""
+        snapshot = copy.copy(self)
+        snapshot.__dict__.update(changes)
+        return snapshot
+
+
+def open_gazetteer(path: str) -> Gazetteer:
+    """
+    Open a gazetteer for a reload.
+
+    Args:
+        path (str): A packed file written by ``python gazetteer.py build``
+            (memory-mapped), or a directory with the source CSVs (built in memory)
+
+    Returns:
+        Gazetteer: The opened gazetteer
+    """
+    if os.path.isdir(path):
+        return Gazetteer(build_gazetteer(path))
+    return Gazetteer.open(path)
+
+
+def snapshot_attribute(name: str, settable: bool = False) -> property:
+    """
+    Property that reads `name` from the extractor's current snapshot.
+
+    Setting a settable attribute swaps in a copy of the snapshot with the new
+    value; the derived indexes only follow after refresh_gazetteer().
+    """
+    def getter(self):
+        return getattr(self._snapshot, name)
+
+    def setter(self, value):
+        self._snapshot = self._snapshot.replace(edited=True, **{name: value})
+
+    return property(getter, setter if settable else None, doc=f"{name} of the current gazetteer snapshot")
+
@@ -0,0 +1,107 @@
+"""
+Cache em disco dos índices que o CityExtractor deriva do gazetteer.
+
+Montar os índices (autômato de nomes, índices de bigramas e de prefixos,
+mapeamentos normalizados) custa várias centenas de milissegundos em laços
+Python, pagos em cada processo e em cada fixture de teste. O arquivo guarda
+todos eles serializados, precedidos de uma chave que resume o gazetteer
+(SHA-1 das fontes) e as tabelas do código que entram na montagem. A construção
+lê o arquivo de uma vez; se a chave não confere, monta os índices de novo e
+regrava o arquivo.
+
+O arquivo é um pickle: só carregue caches gerados pela própria instalação.
+
+Uso:
+    python index_cache.py build [--output data/indexes.cache]
+"""
+
+import argparse
+import gc
+import hashlib
+import os
+import pickle
+from typing import Dict, Optional
+
+from gazetteer import DATA_DIR, write_atomic
+
+MAGIC = b'BRIX'
+# Mude quando o formato dos índices ou a forma de montá-los mudar
+FORMAT_VERSION = 3
+
+DEFAULT_PATH = os.path.join(DATA_DIR, 'indexes.cache')
+
+
+def cache_key(source_hash: bytes, *inputs: object) -> bytes:
+    """
+    SHA-1 identifying one set of indexes.
+
+    Args:
+        source_hash (bytes): Gazetteer.source_hash of the gazetteer the indexes come from
+        *inputs: Anything else the indexes depend on; must have a stable repr
+
+    Returns:
+        bytes: The 20-byte key
+    """
+    digest = hashlib.sha1(MAGIC + FORMAT_VERSION.to_bytes(2, 'little') + source_hash)
+    for value in inputs:
+        digest.update(repr(value).encode('utf-8'))
+    return digest.digest()
+
+
+def load_indexes(path: str, key: bytes) -> Optional[Dict[str, object]]:
+    """
+    Read cached indexes with one read of the file.
+
+    Returns:
+        Optional[Dict[str, object]]: The indexes by attribute name, or None when the
+        file is missing, unreadable or was written for another key
+    """
+    try:
+        with open(path, 'rb') as source:
+            payload = source.read()
+    except OSError:
+        return None
+    header = MAGIC + key
+    if not payload.startswith(header):
+        return None
+
+    # Desserializar cria centenas de milhares de contêineres; sem o coletor de
+    # lixo rodando no meio, a carga é bem mais rápida
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(memoryview(payload)[len(header):])
+    except Exception:
+        return None
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def save_indexes(path: str, key: bytes, indexes: Dict[str, object]):
+    """
+    Write the indexes atomically to path.
+
+    Raises:
+        OSError: when the file can't be written (e.g. read-only install)
+    """
+    payload = pickle.dumps(indexes, protocol=pickle.HIGHEST_PROTOCOL)
+    write_atomic(path, MAGIC + key, payload)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache dos índices derivados do gazetteer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Monta os índices e grava o cache")
+    build.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    from city_extractor import CityExtractor
+    # Remove o cache antigo para forçar a montagem
+    if os.path.exists(args.output):
+        os.unlink(args.output)
+    CityExtractor(index_cache=args.output)
+    print(f"{args.output}: {os.path.getsize(args.output)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Instrumentação opcional do CityExtractor: tempo por etapa e contagem de qual
+caminho produziu a resposta.
+
+Desligada por padrão; CityExtractor(instrument=True) cria um Stats. Com ela
+desligada, cada etapa custa só a entrada e saída de um contexto vazio.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+# Etapas medidas. Os tempos são inclusivos: 'resolve' contém as demais, e
+# 'cheap_tiers' contém 'extract_state'. Em lote (iter_resolve) não há 'resolve';
+# 'spacy' mede só o nlp.pipe, sem as camadas baratas dos textos que ele leu.
+STAGES = (
+    'resolve',
+    'normalize',
+    'cheap_tiers',
+    'extract_state',
+    'spacy',
+    'find_location_entities',
+    'neighborhood_fallback',
+    'find_matching_city',
+    'fuzzy_search',
+)
+
+# Caminhos que produzem a resposta: 'cache', uma das camadas baratas
+# (RESOLUTION_TIERS menos 'nlp'), 'partial' quando o orçamento de tempo acabou
+# ou, depois do spaCy, um destes
+CITY_BRANCHES = (
+    'city_entity',
+    'known_neighborhood',
+    'inferred_neighborhood',
+    'fuzzy_partial',
+    'whole_text_capital',
+    'none',
+)
+
+
+class _NullTimer:
+    """Context manager that does nothing; used when instrumentation is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('_stats', '_stage', '_started')
+
+    def __init__(self, stats: 'Stats', stage: str):
+        self._stats = stats
+        self._stage = stage
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stats.record(self._stage, time.perf_counter() - self._started)
+        return False
+
+
+class Stats:
+    """
+    Cumulative per-stage timers and answer-branch counters. Safe to share between threads.
+
+    Callbacks receive every measurement as it happens, as (metric, value):
+    ('stage.<name>', seconds) for timers and ('branch.<name>', 1) for counters,
+    which maps directly onto statsd-style timing/increment calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+        self.branches: Counter = Counter()
+        self._callbacks: List[Callable[[str, float], None]] = []
+
+    def timer(self, stage: str) -> _StageTimer:
+        """Context manager that adds its elapsed time to stage."""
+        return _StageTimer(self, stage)
+
+    def record(self, stage: str, seconds: float):
+        """Add one call of `seconds` to stage."""
+        with self._lock:
+            totals = self._stages.get(stage)
+            if totals is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                totals[0] += 1
+                totals[1] += seconds
+                if seconds > totals[2]:
+                    totals[2] = seconds
+        for callback in self._callbacks:
+            callback(f'stage.{stage}', seconds)
+
+    def count(self, branch: str):
+        """Count one answer produced by branch."""
+        with self._lock:
+            self.branches[branch] += 1
+        for callback in self._callbacks:
+            callback(f'branch.{branch}', 1)
+
+    def add_callback(self, callback: Callable[[str, float], None]):
+        """Call callback(metric, value) for every timing and branch count from now on."""
+        self._callbacks = self._callbacks + [callback]
+
+    def remove_callback(self, callback: Callable[[str, float], None]):
+        self._callbacks = [registered for registered in self._callbacks if registered is not callback]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Copy of the current counters.
+
+        Returns:
+            Dict[str, Dict]: {'stages': {stage: {'calls', 'total_s', 'mean_s', 'max_s'}},
+            'branches': {branch: count}}
+        """
+        with self._lock:
+            stages = {
+                stage: {'calls': calls, 'total_s': total, 'mean_s': total / calls, 'max_s': maximum}
+                for stage, (calls, total, maximum) in self._stages.items()
+            }
+            return {'stages': stages, 'branches': dict(self.branches)}
+
+    def reset(self):
+        """Zero every counter. Callbacks are kept."""
+        with self._lock:
+            self._stages.clear()
+            self.branches.clear()
@@ -1,9 +1,33 @@
-from city_extractor import CityExtractor
+"""
+Linha de comando do CityExtractor.
+
+Lê CSV ou JSONL de um arquivo ou da entrada padrão, extrai cidade e estado da
+coluna (ou campo) de texto e escreve as linhas enriquecidas na saída padrão,
+em blocos, para que a memória não cresça com o tamanho da entrada.
+
+Uso:
+    python main.py anuncios.csv --column descricao > saida.csv
+    cat anuncios.jsonl | python main.py --format jsonl --column texto --workers 8
+    python main.py anuncios.csv --column descricao --result-store resultados.sqlite > saida.csv
+    python main.py --demo
+"""
 
-extractor = CityExtractor()
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from city_extractor import CityExtractor
+from pool import ExtractorPool, default_processes
 
-# Test some examples
-examples = [
+# Exemplos mostrados por --demo (e quando não há entrada)
+DEMO_EXAMPLES = [
     "Mogi das Cruzes - SP",
     "EU QUERO ALUGAR EM SÃO PAULO, GUARULHOS",
     "Procuro imóvel no Rio de Janeiro, Copacabana",
@@ -35,7 +59,186 @@ examples = [
     "Alagoas",
 ]
 
-for example in examples:
-    result = extractor.extract(example)
-    print(f"Input: {example}")
-    print(f"Result: {result}\n")
\ No newline at end of file
+# Extensões reconhecidas como JSONL; o resto é lido como CSV
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+def run_demo():
+    """Print the results for the bundled examples."""
+    extractor = CityExtractor()
+    for example in DEMO_EXAMPLES:
+        result = extractor.extract(example)
+        print(f"Input: {example}")
+        print(f"Result: {result}\n")
+
+
+def iter_chunks(rows: Iterable[dict], column: str, chunk_size: int) -> Iterator[Tuple[List[dict], List[str]]]:
+    """
+    Group rows into chunks, pairing each chunk with the texts to extract.
+
+    Args:
+        rows (Iterable[dict]): Input rows
+        column (str): Column or field holding the free text
+        chunk_size (int): Rows per chunk
+
+    Yields:
+        Tuple[List[dict], List[str]]: (rows, texts) for each chunk
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        texts = []
+        for row in chunk:
+            text = row.get(column)
+            texts.append(text if isinstance(text, str) else "" if text is None else str(text))
+        yield chunk, texts
+
+
+def iter_results(chunks: Iterable[Tuple[List[dict], List[str]]], workers: int = 1, batch_size: int = 256,
+                 result_store: Optional[str] = None) -> Iterator[Tuple[List[dict], List[Dict[str, Optional[str]]]]]:
+    """
+    Extract every chunk, in order, with at most a few chunks in flight per worker.
+
+    Args:
+        chunks (Iterable[Tuple[List[dict], List[str]]]): Output of iter_chunks
+        workers (int): Number of processes; 1 runs in the current process
+        batch_size (int): Number of texts per spaCy batch
+        result_store (Optional[str]): SQLite file with results kept from earlier runs (see result_store.py)
+
+    Yields:
+        Tuple[List[dict], List[Dict[str, Optional[str]]]]: (rows, results) for each chunk
+    """
+    # Só os textos vão para os processos; as linhas ficam aqui até o resultado voltar
+    pending = deque()
+
+    def texts_of_chunks():
+        for rows, texts in chunks:
+            pending.append(rows)
+            yield texts
+
+    # O modelo é carregado uma vez aqui e compartilhado com os workers no fork
+    extractor = CityExtractor(result_store=result_store)
+    with ExtractorPool(extractor, processes=workers, batch_size=batch_size) as pool:
+        for results in pool.imap_chunks(texts_of_chunks()):
+            yield pending.popleft(), results
+
+
+class Progress:
+    """Rows processed and rows/sec, rewritten in place on stderr."""
+
+    def __init__(self, stream: Optional[TextIO] = None, interval: float = 1.0, enabled: bool = True):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.enabled = enabled
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, rows: int):
+        self.rows += rows
+        now = time.perf_counter()
+        if self.enabled and now - self._last_report >= self.interval:
+            self._last_report = now
+            self.stream.write(f"\r{self.rows} rows, {self.rows / (now - self.started):.0f} rows/s")
+            self.stream.flush()
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        if self.enabled:
+            rate = self.rows / elapsed if elapsed else 0.0
+            self.stream.write(f"\r{self.rows} rows in {elapsed:.1f}s ({rate:.0f} rows/s)\n")
+            self.stream.flush()
+
+
+def process_csv(source: TextIO, output: TextIO, args, progress: Progress):
+    reader = csv.DictReader(source, delimiter=args.delimiter)
+    if reader.fieldnames is None:
+        return
+    if args.column not in reader.fieldnames:
+        raise SystemExit(f"error: column {args.column!r} not found in CSV header {reader.fieldnames}")
+
+    fieldnames = list(reader.fieldnames)
+    fieldnames += [field for field in (args.city_field, args.state_field) if field not in fieldnames]
+    writer = csv.DictWriter(output, fieldnames=fieldnames, delimiter=args.delimiter, lineterminator="\n")
+    writer.writeheader()
+
+    chunks = iter_chunks(reader, args.column, args.chunk_size)
+    for rows, results in iter_results(chunks, args.workers, args.batch_size, args.result_store):
+        for row, result in zip(rows, results):
+            row[args.city_field] = result['city'] or ""
+            row[args.state_field] = result['state'] or ""
+        writer.writerows(rows)
+        output.flush()
+        progress.update(len(rows))
+
+
+def process_jsonl(source: TextIO, output: TextIO, args, progress: Progress):
+    records = (json.loads(line) for line in source if line.strip())
+    chunks = iter_chunks(records, args.column, args.chunk_size)
+    for rows, results in iter_results(chunks, args.workers, args.batch_size, args.result_store):
+        for row, result in zip(rows, results):
+            row[args.city_field] = result['city']
+            row[args.state_field] = result['state']
+            output.write(json.dumps(row, ensure_ascii=False) + "\n")
+        output.flush()
+        progress.update(len(rows))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Extrai cidade e estado de textos em CSV ou JSONL, em fluxo contínuo"
+    )
+    parser.add_argument("input", nargs="?", help="Arquivo de entrada (padrão: entrada padrão)")
+    parser.add_argument("--column", "-c", default="text", help="Coluna ou campo com o texto (padrão: text)")
+    parser.add_argument("--format", "-f", choices=["csv", "jsonl"],
+                        help="Formato da entrada (padrão: pela extensão do arquivo, senão csv)")
+    parser.add_argument("--delimiter", default=",", help="Separador do CSV (padrão: ,)")
+    parser.add_argument("--workers", "-w", type=int, default=default_processes(),
+                        help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Linhas enviadas por vez a cada processo")
+    parser.add_argument("--batch-size", type=int, default=256, help="Textos por lote do spaCy")
+    parser.add_argument("--result-store", metavar="PATH",
+                        help="Arquivo SQLite com os resultados do spaCy, reaproveitados entre execuções")
+    parser.add_argument("--city-field", default="city", help="Nome da coluna de saída da cidade")
+    parser.add_argument("--state-field", default="state", help="Nome da coluna de saída do estado")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Não mostra o progresso no stderr")
+    parser.add_argument("--demo", action="store_true", help="Mostra os resultados dos exemplos embutidos")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.demo or (args.input is None and sys.stdin.isatty()):
+        run_demo()
+        return
+    if args.chunk_size <= 0 or args.batch_size <= 0:
+        parser.error("--chunk-size and --batch-size must be positive")
+
+    input_format = args.format
+    if input_format is None:
+        input_format = "jsonl" if args.input and args.input.lower().endswith(JSONL_EXTENSIONS) else "csv"
+
+    if args.input:
+        source = open(args.input, encoding="utf-8-sig", newline="")
+    else:
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    progress = Progress(enabled=not args.quiet)
+
+    try:
+        with source:
+            if input_format == "jsonl":
+                process_jsonl(source, sys.stdout, args, progress)
+            else:
+                process_csv(source, sys.stdout, args, progress)
+    except BrokenPipeError:
+        # A saída foi fechada (ex.: "| head"); evita o erro ao descarregar stdout na saída
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    progress.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Relatório de memória do CityExtractor e verificação de orçamento.
+
+Mostra quanto cada índice derivado do gazetteer ocupa (tamanho profundo dos
+objetos, contando uma vez só o que é compartilhado), quanto o modelo spaCy
+aloca ao carregar e quanto cada chamada aloca e retém (tracemalloc). Com
+orçamentos, falha quando algum número passa do limite, para segurar a memória
+enquanto o gazetteer cresce.
+
+Uso:
+    python memory_report.py
+    python memory_report.py --budget indexes_mb=48 --budget churn.extract.p99_peak_kb=256
+    python memory_report.py --load-model --size 1000
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+import types
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from city_extractor import DERIVED_INDEXES, CityExtractor
+from synthetic_corpus import generate_corpus
+
+MB = 2**20
+KB = 2**10
+
+# Funções medidas em churn; as que não passam pelo spaCy valem mesmo sem o modelo
+CHURN_FUNCTIONS = ('extract', 'extract_all', 'extract_state', 'find_matching_city')
+MODEL_FREE_FUNCTIONS = ('extract_state', 'find_matching_city')
+# Funções que recebem um nome parcial de cidade em vez do texto inteiro
+PARTIAL_NAME_FUNCTIONS = ('find_matching_city', 'autocomplete')
+
+# Objetos que não pertencem ao componente que os referencia: classes, módulos
+# e funções (um normalize ligado ao extrator levaria ao extrator inteiro)
+_SKIPPED_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType, types.CodeType,
+)
+
+
+def deep_sizeof(obj: object, seen: Optional[Set[int]] = None) -> int:
+    """
+    Bytes held by obj and everything it references, skipping ids already in seen.
+
+    Passing the same seen set to several calls counts shared objects (e.g. the
+    same name string in two indexes) only for the first one.
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIPPED_TYPES):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        stack.extend(gc.get_referents(item))
+    return size
+
+
+def process_memory(pid: int) -> Optional[Dict[str, float]]:
+    """
+    RSS, PSS and private memory of a process, in MB, from /proc (Linux only).
+
+    PSS divides each shared page among the processes that map it, so the sum of
+    the PSS of a parent and its forked workers is their real combined footprint.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            lines = smaps.readlines()
+    except OSError:
+        return None
+    fields = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and parts[2] == 'kB':
+            fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mb': fields.get('Rss', 0.0),
+        'pss_mb': fields.get('Pss', 0.0),
+        'private_mb': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+    }
+
+
+def component_sizes(extractor: CityExtractor) -> Dict[str, int]:
+    """
+    Deep size in bytes of each part of the extractor, excluding the spaCy model
+    and the memory-mapped gazetteer file.
+
+    Components are measured in order and share one seen set, so an object
+    referenced by several indexes counts for the first one only.
+    """
+    seen: Set[int] = set()
+    # O gazetteer mapeado e o modelo não entram: não são objetos Python comuns
+    seen.add(id(extractor.gazetteer))
+    if extractor._nlp is not None:
+        seen.add(id(extractor._nlp))
+
+    sizes = {name: deep_sizeof(getattr(extractor, name), seen) for name in DERIVED_INDEXES}
+    sizes['state_mappings'] = deep_sizeof(
+        [extractor.reverse_state_mapping, extractor.state_capitals], seen
+    )
+    sizes['word_lists'] = deep_sizeof(
+        [extractor.location_indicators, extractor.ignore_words,
+         extractor.neighborhood_indicators, extractor.neighborhood_suffixes], seen
+    )
+    sizes['result_cache'] = deep_sizeof(extractor._cache, seen) if extractor._cache is not None else 0
+    return sizes
+
+
+def measure_model(extractor: CityExtractor) -> Optional[float]:
+    """MB allocated while loading the spaCy model, or None when it was already loaded."""
+    if extractor._nlp is not None:
+        return None
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        extractor.nlp
+        return (tracemalloc.get_traced_memory()[0] - before) / MB
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def measure_churn(function: Callable[[str], object], texts: Sequence[str], warmup: int = 20) -> Dict[str, float]:
+    """
+    Allocation churn of function over texts.
+
+    Returns:
+        Dict[str, float]: 'calls'; 'mean_peak_kb' and 'p99_peak_kb', the most memory
+        a call had allocated at once; 'mean_allocated_kb', what a call left allocated
+        when it returned (results included); and 'retained_kb', what is still
+        allocated after every result was dropped (growth such as caches or leaks)
+    """
+    for text in texts[:warmup]:
+        function(text)
+    gc.collect()
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        peaks = []
+        allocated = []
+        results = []
+        start = tracemalloc.get_traced_memory()[0]
+        for text in texts:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            results.append(function(text))
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            allocated.append(current - before)
+        del results
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    peaks.sort()
+    return {
+        'calls': len(texts),
+        'mean_peak_kb': statistics.fmean(peaks) / KB if peaks else 0.0,
+        'p99_peak_kb': peaks[min(len(peaks) - 1, int(len(peaks) * 0.99))] / KB if peaks else 0.0,
+        'mean_allocated_kb': statistics.fmean(allocated) / KB if allocated else 0.0,
+        'retained_kb': retained / KB,
+    }
+
+
+def memory_report(extractor: Optional[CityExtractor] = None, size: int = 500,
+                  functions: Optional[Iterable[str]] = None, load_model: bool = False) -> Dict[str, object]:
+    """
+    Memory used by an extractor, by component, plus per-call churn.
+
+    Args:
+        extractor (Optional[CityExtractor]): Extractor to measure (default: a new one,
+            whose construction is also measured)
+        size (int): Synthetic corpus inputs per churn measurement
+        functions (Optional[Iterable[str]]): Extractor methods measured for churn (default:
+            CHURN_FUNCTIONS with the model, MODEL_FREE_FUNCTIONS without it)
+        load_model (bool): Load the spaCy model and measure it (requires the model)
+
+    Returns:
+        Dict[str, object]: 'components_mb', 'indexes_mb', 'gazetteer_mapped_mb',
+        'construct_mb', 'model_mb', 'process' (RSS/PSS on Linux) and 'churn'
+    """
+    construct_mb = None
+    if extractor is None:
+        tracemalloc.start()
+        try:
+            extractor = CityExtractor()
+            construct_mb = tracemalloc.get_traced_memory()[0] / MB
+        finally:
+            tracemalloc.stop()
+    model_mb = measure_model(extractor) if load_model else None
+    if functions is None:
+        functions = CHURN_FUNCTIONS if extractor._nlp is not None else MODEL_FREE_FUNCTIONS
+
+    corpus = generate_corpus(size, 0)
+    texts = [sample.text for sample in corpus]
+    partial_names = [sample.city[:max(4, len(sample.city) // 2)] for sample in corpus]
+    sizes = component_sizes(extractor)
+    gazetteer_buffer = extractor.gazetteer._buffer
+    return {
+        'components_mb': {name: size / MB for name, size in sorted(sizes.items())},
+        'indexes_mb': sum(sizes[name] for name in DERIVED_INDEXES) / MB,
+        'gazetteer_mapped_mb': len(gazetteer_buffer) / MB,
+        'construct_mb': construct_mb,
+        'model_mb': model_mb,
+        'process': process_memory(os.getpid()),
+        'churn': {
+            name: measure_churn(getattr(extractor, name), partial_names if name in PARTIAL_NAME_FUNCTIONS else texts)
+            for name in functions
+        },
+    }
+
+
+def lookup(report: Dict[str, object], path: str) -> Optional[float]:
+    """Value at a dotted path of the report ('churn.extract.p99_peak_kb'), or None."""
+    value: object = report
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, (int, float)) else None
+
+
+def check_budget(report: Dict[str, object], budgets: Dict[str, float]) -> List[str]:
+    """
+    Compare report values against budgets.
+
+    Args:
+        report (Dict[str, object]): Output of memory_report
+        budgets (Dict[str, float]): Maximum allowed value by dotted path (see lookup)
+
+    Returns:
+        List[str]: One message per exceeded or missing value; empty when within budget
+    """
+    failures = []
+    for path, limit in sorted(budgets.items()):
+        value = lookup(report, path)
+        if value is None:
+            failures.append(f"{path}: not in the report")
+        elif value > limit:
+            failures.append(f"{path}: {value:.2f} > {limit:.2f}")
+    return failures
+
+
+def _parse_budget(text: str):
+    path, separator, limit = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected PATH=LIMIT, got {text!r}")
+    return path, float(limit)
+
+
+def _rounded(value: object) -> object:
+    if isinstance(value, dict):
+        return {key: _rounded(item) for key, item in value.items()}
+    return round(value, 3) if isinstance(value, float) else value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Relatório de memória do CityExtractor")
+    parser.add_argument("--budget", type=_parse_budget, action="append", default=[],
+                        metavar="PATH=LIMIT", help="Limite para um valor do relatório (ex.: indexes_mb=48)")
+    parser.add_argument("--size", type=int, default=500, help="Textos do corpus sintético para o churn")
+    parser.add_argument("--functions", nargs="+", help="Funções medidas (padrão: depende de --load-model)")
+    parser.add_argument("--load-model", action="store_true", help="Carrega e mede o modelo spaCy")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    report = _rounded(memory_report(size=args.size, functions=args.functions, load_model=args.load_model))
+    failures = check_budget(report, dict(args.budget))
+    report['budget_failures'] = failures
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as destination:
+            destination.write(output + "\n")
+    else:
+        print(output)
+    for failure in failures:
+        print(f"over budget: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Integração com pandas: extração vetorizada sobre colunas de texto.
+
+Colunas reais repetem muito os mesmos valores ("São Paulo - SP" aparece
+milhares de vezes), então a coluna é fatorada e só os valores únicos, depois
+de normalizados, passam pelo extrator. O resultado volta para todas as linhas
+como colunas categóricas.
+
+Importar este módulo registra o accessor ``.br_location`` em ``pd.Series``:
+
+    import pandas_accessor  # noqa: F401
+    df[["city", "state"]] = df["local"].br_location.extract()
+"""
+
+import weakref
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from city_extractor import CityExtractor
+
+# Última extração de city()/state(), para que as duas chamadas seguidas sobre a
+# mesma série rodem o extrator uma vez só. O pandas cria um accessor novo a cada
+# acesso, então ela fica aqui, com a série guardada só por referência fraca
+_last_extraction = None
+
+
+def _categorical(values, codes: np.ndarray, index: pd.Index) -> pd.Series:
+    """Broadcast one value per unique text back to every row as a categorical."""
+    value_codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    row_codes = np.where(codes >= 0, value_codes[np.maximum(codes, 0)], -1) if len(values) else codes
+    return pd.Series(pd.Categorical.from_codes(row_codes, categories=categories), index=index)
+
+
+def extract_series(series: pd.Series, extractor: Optional[CityExtractor] = None,
+                   batch_size: int = 256, n_process: int = 1) -> pd.DataFrame:
+    """
+    Extract city and state for every row of a text column.
+
+    Only one text per distinct normalized value is extracted; texts that differ
+    only in accents or casing share the result of the first one seen.
+
+    Args:
+        series (pd.Series): Column with free text; missing values give no city/state
+        extractor (Optional[CityExtractor]): Extractor to use (default: CityExtractor.shared())
+        batch_size (int): Number of texts per spaCy batch
+        n_process (int): Number of processes used by spaCy
+
+    Returns:
+        pd.DataFrame: Categorical 'city' and 'state' columns, with the series index
+    """
+    extractor = extractor or CityExtractor.shared()
+
+    # Primeiro os valores brutos, depois os normalizados, para normalizar cada valor uma vez só
+    raw_codes, raw_uniques = pd.factorize(series, use_na_sentinel=True)
+    normalized = [extractor.normalize_text(str(value)) for value in raw_uniques]
+    group_of_raw, _ = pd.factorize(pd.Series(normalized, dtype=object))
+
+    # Um texto representante (o primeiro visto) por valor normalizado
+    representatives = {}
+    for raw_index, group in enumerate(group_of_raw):
+        representatives.setdefault(group, str(raw_uniques[raw_index]))
+    texts = [representatives[group] for group in range(len(representatives))]
+    results = extractor.extract_batch(texts, batch_size=batch_size, n_process=n_process)
+
+    codes = np.where(raw_codes >= 0, group_of_raw[np.maximum(raw_codes, 0)], -1) if len(raw_uniques) else raw_codes
+    return pd.DataFrame({
+        'city': _categorical([result['city'] for result in results], codes, series.index),
+        'state': _categorical([result['state'] for result in results], codes, series.index),
+    }, index=series.index)
+
+
+def _forget_extraction(series: weakref.ref):
+    """Drop the last extraction once its series is gone."""
+    global _last_extraction
+    if _last_extraction is not None and _last_extraction[0] is series:
+        _last_extraction = None
+
+
+@pd.api.extensions.register_series_accessor("br_location")
+class BrazilLocationAccessor:
+    """``series.br_location``: city and state extraction over a text column."""
+
+    def __init__(self, series: pd.Series):
+        self._series = series
+
+    def extract(self, extractor: Optional[CityExtractor] = None, batch_size: int = 256,
+                n_process: int = 1) -> pd.DataFrame:
+        """Same as ``extract_series(series, ...)``."""
+        return extract_series(self._series, extractor=extractor, batch_size=batch_size, n_process=n_process)
+
+    def _extracted(self, extractor: Optional[CityExtractor]) -> pd.DataFrame:
+        """extract() with the default options, reused while the series, extractor and gazetteer are the same."""
+        global _last_extraction
+        extractor = extractor or CityExtractor.shared()
+        values = pd.util.hash_pandas_object(self._series, index=False).to_numpy()
+        if _last_extraction is not None:
+            series, last_extractor, version, last_values, frame = _last_extraction
+            if (series() is self._series and last_extractor is extractor
+                    and version == extractor.gazetteer_version and np.array_equal(last_values, values)):
+                return frame
+        frame = self.extract(extractor)
+        series = weakref.ref(self._series, _forget_extraction)
+        _last_extraction = (series, extractor, extractor.gazetteer_version, values, frame)
+        return frame
+
+    def city(self, extractor: Optional[CityExtractor] = None) -> pd.Series:
+        """Categorical city column."""
+        return self._extracted(extractor)['city']
+
+    def state(self, extractor: Optional[CityExtractor] = None) -> pd.Series:
+        """Categorical state column."""
+        return self._extracted(extractor)['state']
@@ -0,0 +1,178 @@
+"""
+Pool de processos que compartilha um CityExtractor já carregado.
+
+O processo pai carrega o modelo spaCy e monta os índices uma única vez; os
+workers nascem por fork e herdam tudo isso em páginas copy-on-write, sem
+``spacy.load`` nem ``_build_indexes`` por worker. O gazetteer já é um mmap e
+também é compartilhado. Antes do fork os objetos do pai são congelados
+(``gc.freeze``) para que o coletor de lixo dos workers não os visite e não
+suje as páginas compartilhadas.
+
+Onde fork não existe (Windows) cada worker cria o próprio extrator, como antes.
+
+Uso:
+    with ExtractorPool(processes=8) as pool:
+        for result in pool.imap(texts):
+            ...
+"""
+
+import gc
+import multiprocessing
+import os
+from array import array
+from collections import deque
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from city_extractor import CityExtractor, ExtractionColumns
+from result_store import ResultStore
+
+# Extratores herdados pelos workers no fork, por pool (cada pool usa a sua chave)
+_extractors: Dict[int, CityExtractor] = {}
+
+
+def default_processes() -> int:
+    """CPUs this process may run on (respects container and taskset limits)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_spawned_worker(key: int, model: str, pipeline_profile: str, result_store: Optional[ResultStore]):
+    extractor = CityExtractor(model, pipeline_profile, result_store=result_store)
+    extractor.nlp
+    _extractors[key] = extractor
+
+
+def _extract_chunk(key: int, method: str, texts: List[str], batch_size: int):
+    return getattr(_extractors[key], method)(texts, batch_size=batch_size)
+
+
+class ExtractorPool:
+    """Worker processes that run one parent CityExtractor over chunks of texts, in order."""
+
+    def __init__(self, extractor: Optional[CityExtractor] = None, processes: Optional[int] = None,
+                 chunk_size: int = 1000, batch_size: int = 256, start_method: Optional[str] = None):
+        """
+        Args:
+            extractor (Optional[CityExtractor]): Extractor shared with the workers (default: a new one).
+                Its model is loaded here, before the workers start.
+            processes (Optional[int]): Number of worker processes (default: the usable CPUs);
+                1 runs everything in the current process
+            chunk_size (int): Texts sent to a worker at a time
+            batch_size (int): Number of texts per spaCy batch inside a worker
+            start_method (Optional[str]): 'fork' (default where available) or 'spawn'.
+                With 'spawn' each worker builds its own CityExtractor from the same model, profile
+                and result store.
+        """
+        if chunk_size <= 0 or batch_size <= 0:
+            raise ValueError("chunk_size and batch_size must be positive")
+        self.extractor = extractor or CityExtractor()
+        self.processes = processes or default_processes()
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        if start_method is None:
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.start_method = start_method
+        self._key = id(self)
+        self._pool = None
+
+        if self.processes <= 1:
+            return
+
+        context = multiprocessing.get_context(start_method)
+        if start_method == 'fork':
+            # Tudo que os workers vão usar precisa existir antes do fork
+            self.extractor.nlp
+            _extractors[self._key] = self.extractor
+            gc.collect()
+            gc.freeze()
+            try:
+                self._pool = context.Pool(self.processes)
+            finally:
+                gc.unfreeze()
+        else:
+            self._pool = context.Pool(
+                self.processes, initializer=_init_spawned_worker,
+                initargs=(self._key, self.extractor.model, self.extractor.pipeline_profile,
+                          self.extractor.result_store)
+            )
+
+    def __enter__(self) -> 'ExtractorPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def imap_chunks(self, chunks: Iterable[List[str]]) -> Iterator[List[Dict[str, Optional[str]]]]:
+        """
+        Extract each chunk of texts, yielding the results chunk by chunk in input order.
+
+        Chunks are read lazily, with at most two chunks in flight per worker, so
+        the input may be a stream of any length.
+
+        Args:
+            chunks (Iterable[List[str]]): Chunks of input texts
+
+        Yields:
+            List[Dict[str, Optional[str]]]: Results of one chunk, with 'city' and 'state' keys
+        """
+        return self._imap_method('extract_batch', chunks)
+
+    def _imap_method(self, method: str, chunks: Iterable[List[str]]) -> Iterator:
+        """Run one CityExtractor batch method on each chunk, yielding the results in order."""
+        if self._pool is None:
+            for texts in chunks:
+                yield getattr(self.extractor, method)(texts, batch_size=self.batch_size)
+            return
+
+        in_flight = deque()
+        for texts in chunks:
+            in_flight.append(self._pool.apply_async(_extract_chunk, (self._key, method, texts, self.batch_size)))
+            if len(in_flight) >= self.processes * 2:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
+
+    def imap(self, texts: Iterable[str], chunk_size: Optional[int] = None) -> Iterator[Dict[str, Optional[str]]]:
+        """
+        Extract every text, yielding results in input order.
+
+        Args:
+            texts (Iterable[str]): Input texts
+            chunk_size (Optional[int]): Texts sent to a worker at a time (default: the pool's)
+
+        Yields:
+            Dict[str, Optional[str]]: Same result as CityExtractor.extract for each text
+        """
+        chunk_size = chunk_size or self.chunk_size
+        texts = iter(texts)
+        chunks = iter(lambda: list(islice(texts, chunk_size)), [])
+        return chain.from_iterable(self.imap_chunks(chunks))
+
+    def map(self, texts: Iterable[str], chunk_size: Optional[int] = None) -> List[Dict[str, Optional[str]]]:
+        """Same as imap, collected into a list."""
+        return list(self.imap(texts, chunk_size))
+
+    def map_columns(self, texts: Iterable[str], chunk_size: Optional[int] = None) -> ExtractionColumns:
+        """
+        Same as CityExtractor.extract_columns, spread across the workers.
+
+        Each worker sends back two arrays per chunk instead of one dict per text.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        texts = iter(texts)
+        chunks = iter(lambda: list(islice(texts, chunk_size)), [])
+        columns = ExtractionColumns(array('i'), array('B'))
+        for chunk in self._imap_method('extract_columns', chunks):
+            columns.city_code.extend(chunk.city_code)
+            columns.state_code.extend(chunk.state_code)
+        return columns
+
+    def close(self):
+        """Wait for the queued chunks, then stop the workers."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        _extractors.pop(self._key, None)
@@ -0,0 +1,106 @@
+"""
+Índice de prefixos para autocompletar nomes de cidades e bairros.
+
+Os nomes normalizados ficam em listas ordenadas (uma para o país inteiro e uma
+por estado); um prefixo vira um intervalo contíguo encontrado com bisect, e só
+esse intervalo é ranqueado.
+"""
+
+import heapq
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Maior caractere possível: fecha o intervalo de nomes que começam com o prefixo
+_HIGHEST = '\U0010ffff'
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over normalized names, partitioned by state."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[str], Any, tuple]],
+                 normalize: Callable[[str], str] = str.lower,
+                 abbreviations: Optional[Dict[str, str]] = None):
+        """
+        Build the index.
+
+        Args:
+            entries (Iterable[Tuple[str, Optional[str], Any, tuple]]): (name, state, payload, rank)
+                tuples; lower ranks come first among names sharing a prefix
+            normalize (Callable[[str], str]): Normalization applied to names and prefixes
+            abbreviations (Optional[Dict[str, str]]): Abbreviation -> full word, expanded in
+                prefixes when followed by a dot or a space (ex.: "sta." -> "santa")
+        """
+        self.normalize = normalize
+        self.abbreviations = {
+            normalize(abbreviation): normalize(full) for abbreviation, full in (abbreviations or {}).items()
+        }
+        self._abbreviation_pattern = None
+        if self.abbreviations:
+            alternatives = '|'.join(re.escape(abbreviation) for abbreviation in
+                                    sorted(self.abbreviations, key=len, reverse=True))
+            self._abbreviation_pattern = re.compile(rf'(?<!\w)({alternatives})(?:\.\s*|\s+)')
+
+        # Posição no ranking global; comparar inteiros é mais barato que tuplas
+        ranked = sorted(entries, key=lambda entry: entry[3])
+        self.payloads: List[Any] = [payload for _, _, payload, _ in ranked]
+
+        partitions: Dict[Optional[str], List[Tuple[str, int]]] = {None: []}
+        for position, (name, state, _, _) in enumerate(ranked):
+            key = self._normalize_key(name)
+            partitions[None].append((key, position))
+            partitions.setdefault(state, []).append((key, position))
+
+        self._keys: Dict[Optional[str], List[str]] = {}
+        self._positions: Dict[Optional[str], List[int]] = {}
+        for state, items in partitions.items():
+            items.sort()
+            self._keys[state] = [key for key, _ in items]
+            self._positions[state] = [position for _, position in items]
+
+    def __getstate__(self):
+        # normalize costuma ser um método do extrator; quem carrega o índice o recoloca
+        return dict(self.__dict__, normalize=None)
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def _normalize_key(self, text: str) -> str:
+        return " ".join(self.normalize(text).split())
+
+    def expand(self, prefix: str) -> str:
+        """Normalize a prefix and expand its abbreviations ("S. Jo" -> "sao jo")."""
+        normalized = self.normalize(prefix)
+        if self._abbreviation_pattern is not None:
+            normalized = self._abbreviation_pattern.sub(
+                lambda match: self.abbreviations[match.group(1)] + ' ', normalized
+            )
+        return " ".join(normalized.split())
+
+    def search(self, prefix: str, state: Optional[str] = None, limit: int = 10) -> List[Any]:
+        """
+        Find the names starting with prefix.
+
+        Args:
+            prefix (str): What was typed so far
+            state (Optional[str]): Only return names of this state
+            limit (int): Maximum number of payloads returned
+
+        Returns:
+            List[Any]: Payloads of the matching names. Exact matches come first, then
+            the rest by rank.
+        """
+        query = self.expand(prefix)
+        keys = self._keys.get(state) if state else self._keys[None]
+        if not query or not keys or limit <= 0:
+            return []
+        positions = self._positions[state] if state else self._positions[None]
+
+        start = bisect_left(keys, query)
+        exact_end = bisect_right(keys, query, start)
+        end = bisect_left(keys, query + _HIGHEST, exact_end)
+
+        best = sorted(positions[start:exact_end])[:limit]
+        if len(best) < limit and exact_end < end:
+            best += heapq.nsmallest(limit - len(best), positions[exact_end:end])
+        return [self.payloads[position] for position in best]
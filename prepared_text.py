@@ -0,0 +1,82 @@
+"""
+Texto de entrada preparado uma única vez e compartilhado pelas etapas da extração.
+
+Cada etapa precisava do texto sem acentos e em minúsculas e chamava unidecode
+de novo sobre o texto inteiro. PreparedText guarda essa normalização, a versão
+com espaços colapsados e o mapa de posições entre o texto normalizado e o
+original (este só quando pedido).
+"""
+
+from typing import List, Optional, Tuple
+
+from unidecode import unidecode
+
+
+def normalize(text: str) -> str:
+    """Remove accents and lowercase, like CityExtractor.normalize_text."""
+    return unidecode(text.lower().strip())
+
+
+class PreparedText:
+    """
+    An input text with its normalized forms, computed once.
+
+    Attributes:
+        text (str): The original text
+        normalized (str): unidecode(text.lower().strip())
+    """
+
+    __slots__ = ('text', 'normalized', '_collapsed', '_upper', '_offsets')
+
+    def __init__(self, text: str, normalized: Optional[str] = None):
+        self.text = text
+        self.normalized = normalize(text) if normalized is None else normalized
+        self._collapsed: Optional[str] = None
+        self._upper: Optional[str] = None
+        self._offsets: Optional[List[int]] = None
+
+    def __repr__(self) -> str:
+        return f"PreparedText({self.text!r})"
+
+    @property
+    def collapsed(self) -> str:
+        """Normalized text with runs of whitespace collapsed to one space."""
+        if self._collapsed is None:
+            self._collapsed = " ".join(self.normalized.split())
+        return self._collapsed
+
+    @property
+    def upper(self) -> str:
+        """Original text in uppercase (accents kept), for the state sigla scan."""
+        if self._upper is None:
+            self._upper = self.text.upper()
+        return self._upper
+
+    @property
+    def offsets(self) -> List[int]:
+        """
+        Position in the original text of each character of normalized, plus one
+        final entry for the end of the text.
+
+        unidecode may turn one character into several ("æ" -> "ae") or into
+        none, so the map is built per character when the text is not ASCII.
+        """
+        if self._offsets is None:
+            stripped = self.text.strip()
+            start = len(self.text) - len(self.text.lstrip())
+            if stripped.isascii():
+                offsets = list(range(start, start + len(stripped)))
+            else:
+                offsets = []
+                for index, char in enumerate(stripped, start):
+                    offsets.extend([index] * len(unidecode(char.lower())))
+            offsets.append(start + len(stripped))
+            self._offsets = offsets
+        return self._offsets
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a [start, end) span of normalized back to a span of the original text."""
+        offsets = self.offsets
+        if end <= start:
+            return offsets[start], offsets[start]
+        return offsets[start], offsets[end - 1] + 1
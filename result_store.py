@@ -0,0 +1,221 @@
+"""
+Armazenamento em disco (SQLite) dos resultados que precisaram do spaCy.
+
+Os jobs diários veem os mesmos textos de localização de novo e de novo. O cache
+LRU em memória morre com cada processo; este arquivo sobrevive entre execuções
+e é compartilhado pelos workers de um pool. Cada resultado é guardado pelo
+texto já limpo que iria para o spaCy e por uma impressão digital do gazetteer,
+das tabelas do código e do modelo spaCy que o produziram: trocar qualquer um deles faz os
+resultados antigos deixarem de ser encontrados (e saírem na próxima remoção).
+
+O banco usa WAL, então leitores não bloqueiam o escritor nem uns aos outros;
+escritas de processos diferentes esperam a vez (busy_timeout). Consultas e
+inserções são feitas em lotes. Passado o limite de entradas, as mais antigas
+são removidas.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Mude quando o esquema ou o formato dos valores mudar
+SCHEMA_VERSION = 1
+
+# Limite de variáveis por comando do SQLite (999 nas versões antigas)
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    city TEXT,
+    state TEXT,
+    tier TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, key)
+)
+"""
+
+
+class ResultStore:
+    """
+    Extraction results in a SQLite file, shared by threads, processes and runs.
+
+    Connections are opened per thread and per process, so a store created
+    before a fork keeps working in the forked workers.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000, timeout: float = 30.0):
+        """
+        Args:
+            path (str): SQLite file, created if missing
+            max_entries (int): Entries kept; past it the oldest ones are removed
+            timeout (float): Seconds a writer waits for another process's write
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        # Conta as entradas só de tempos em tempos: count(*) percorre a tabela
+        self.check_every = max(1, min(1024, max_entries // 100))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._written = 0
+        self._connect()
+
+    def __getstate__(self):
+        # Só a configuração: o processo que recebe o store abre as próprias conexões
+        return {'path': self.path, 'max_entries': self.max_entries, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the calling thread, opened again after a fork."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        # isolation_level=None: as transações são abertas explicitamente
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with _transaction(connection):
+                if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    connection.execute("DROP TABLE IF EXISTS results")
+                    connection.execute(_SCHEMA)
+                    connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def get_many(self, fingerprint: str, keys: Sequence[str]) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Look up many keys at once.
+
+        Args:
+            fingerprint (str): Identifies the gazetteer and model the results must come from
+            keys (Sequence[str]): Keys of the inputs (for the extractor, the cleaned text sent to spaCy)
+
+        Returns:
+            Dict[str, Dict[str, Optional[str]]]: Stored result ('city', 'state', 'tier') by key,
+            for the keys that were found
+        """
+        connection = self._connect()
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), _LOOKUP_CHUNK):
+            chunk = unique[start:start + _LOOKUP_CHUNK]
+            rows = connection.execute(
+                f"SELECT key, city, state, tier FROM results "
+                f"WHERE fingerprint = ? AND key IN ({','.join('?' * len(chunk))})",
+                [fingerprint, *chunk]
+            )
+            for key, city, state, tier in rows:
+                found[key] = {'city': city, 'state': state, 'tier': tier}
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def get(self, fingerprint: str, key: str) -> Optional[Dict[str, Optional[str]]]:
+        """Stored result for one key, or None."""
+        return self.get_many(fingerprint, [key]).get(key)
+
+    def put_many(self, fingerprint: str, items: Iterable[Tuple[str, Dict[str, Optional[str]]]]):
+        """
+        Store many results in one transaction, removing the oldest entries when full.
+
+        Args:
+            fingerprint (str): Identifies the gazetteer and model the results come from
+            items (Iterable[Tuple[str, Dict[str, Optional[str]]]]): (key, result) pairs
+        """
+        rows = [(fingerprint, key, result['city'], result['state'], result['tier']) for key, result in items]
+        if not rows:
+            return
+        connection = self._connect()
+        with _transaction(connection):
+            # REPLACE apaga e reinsere: a linha ganha um rowid novo e vai para o fim da fila
+            connection.executemany(
+                "INSERT OR REPLACE INTO results (fingerprint, key, city, state, tier) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        with self._lock:
+            self._written += len(rows)
+            check = self._written >= self.check_every
+            if check:
+                self._written = 0
+        if check:
+            self.evict()
+
+    def put(self, fingerprint: str, key: str, result: Dict[str, Optional[str]]):
+        """Store one result."""
+        self.put_many(fingerprint, [(key, result)])
+
+    def evict(self) -> int:
+        """
+        Remove the oldest entries when there are more than max_entries.
+
+        Goes down to 90% of the limit, so the next removal is a while away.
+
+        Returns:
+            int: Number of entries removed
+        """
+        connection = self._connect()
+        with _transaction(connection):
+            count = connection.execute("SELECT count(*) FROM results").fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            excess = count - self.max_entries * 9 // 10
+            connection.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY rowid LIMIT ?)",
+                (excess,)
+            )
+        with self._lock:
+            self.evictions += excess
+        return excess
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT count(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        """Drop every stored result. Counters are kept."""
+        connection = self._connect()
+        with _transaction(connection):
+            connection.execute("DELETE FROM results")
+
+    def info(self) -> Dict[str, int]:
+        """Hit, miss and eviction counters of this process, plus the entries in the file."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self),
+            'max_entries': self.max_entries,
+        }
+
+    def close(self):
+        """Close the calling thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+
+@contextmanager
+def _transaction(connection: sqlite3.Connection):
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error."""
+    # IMMEDIATE pega a trava de escrita já no começo, sem deadlock entre leitura e escrita
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
@@ -0,0 +1,329 @@
+"""
+Servidor HTTP local do CityExtractor, para rodar como sidecar.
+
+O extrator (e o modelo spaCy) é carregado uma vez; requisições concorrentes
+são juntadas em lotes e resolvidas com um único ``nlp.pipe``. O extrator não é
+thread-safe: um lote roda por vez, e --workers só sobrepõe a montagem do lote
+seguinte (e a entrega dos resultados) à execução do atual.
+
+Endpoints:
+    GET  /health                      -> {"status": "ok"}
+    GET  /stats                       -> contadores do servidor e do extrator
+    GET  /extract?text=...            -> {"city": ..., "state": ...}
+    POST /extract {"text": "..."}     -> {"city": ..., "state": ...}
+    POST /extract {"texts": [...]}    -> {"results": [{"city": ..., "state": ...}, ...]}
+
+Com --budget, um texto que estoura o tempo volta com o que já se sabia, mais
+"partial": true e "stage" (a etapa que ficou de fora).
+
+Uso:
+    python server.py --port 8080 --workers 2 --cache-size 100000
+    python server.py --budget 0.05
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from city_extractor import CityExtractor, extract_result
+
+# Maior corpo de requisição aceito, em bytes
+MAX_BODY_BYTES = 8 * 2**20
+# Maior número de textos num POST em lote
+MAX_BULK_TEXTS = 10000
+
+
+class QueueFull(Exception):
+    """The coalescer queue stayed full for longer than the caller was willing to wait."""
+
+
+class BatchCoalescer:
+    """
+    Thread-based micro-batching in front of one CityExtractor.
+
+    Callers from any thread submit texts; worker threads take whatever is queued
+    (waiting up to max_wait for more) and resolve it with one iter_resolve call.
+    The extractor is not thread-safe, so only one batch runs at a time; extra
+    workers only gather the next batch while the current one runs.
+    """
+
+    def __init__(self, extractor: CityExtractor, workers: int = 1, max_batch_size: int = 64,
+                 max_wait: float = 0.002, max_queue: int = 4096):
+        """
+        Args:
+            extractor (CityExtractor): Extractor shared by every worker
+            workers (int): Number of threads gathering batches (one batch runs at a time)
+            max_batch_size (int): Maximum number of texts per batch
+            max_wait (float): Seconds to wait for more texts before running a batch that is not full
+            max_queue (int): Maximum number of queued texts
+        """
+        self.extractor = extractor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._extractor_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"coalescer-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, texts: List[str], timeout: Optional[float] = None) -> List[Future]:
+        """
+        Queue texts for resolution.
+
+        Raises:
+            QueueFull: when the queue has no room within timeout seconds; the texts
+                already queued by this call are cancelled
+        """
+        futures = []
+        for text in texts:
+            future = Future()
+            try:
+                self._queue.put((text, future), timeout=timeout)
+            except queue.Full:
+                # Os textos já enfileirados não rodam: os workers pulam futures canceladas
+                for queued in futures:
+                    queued.cancel()
+                raise QueueFull() from None
+            futures.append(future)
+        return futures
+
+    def resolve_many(self, texts: List[str], timeout: Optional[float] = None) -> List[Dict[str, Optional[str]]]:
+        """Resolve texts through the shared batches and wait for every result."""
+        return [future.result() for future in self.submit(texts, timeout)]
+
+    def _take_batch(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(text, future) for text, future in self._take_batch() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self._extractor_lock:
+                    results = list(self.extractor.iter_resolve([text for text, _ in batch], batch_size=len(batch)))
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler; the ExtractionServer holds the coalescer and the counters."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "BrazilCitiesNLP"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: object):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send_json(status, {"error": message})
+
+    def _extract(self, texts: List[str]) -> Optional[List[Dict[str, Optional[str]]]]:
+        try:
+            results = self.server.coalescer.resolve_many(texts, timeout=self.server.queue_timeout)
+        except QueueFull:
+            self._error(503, "extraction queue is full")
+            return None
+        except Exception as error:
+            self._error(500, f"{type(error).__name__}: {error}")
+            return None
+        self.server.count(requests=1, texts=len(texts))
+        return [extract_result(result) for result in results]
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/stats":
+            self._send_json(200, self.server.stats())
+        elif url.path == "/extract":
+            texts = parse_qs(url.query).get("text")
+            if not texts:
+                self._error(400, "missing 'text' query parameter")
+                return
+            results = self._extract(texts[:1])
+            if results is not None:
+                self._send_json(200, results[0])
+        else:
+            self._error(404, "not found")
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/extract":
+            # O corpo não foi lido; a conexão não pode ser reaproveitada
+            self.close_connection = True
+            self._error(404, "not found")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Sem um tamanho válido não dá para saber onde o corpo termina
+            self._error(400, "invalid Content-Length")
+            self.close_connection = True
+            return
+        if length > MAX_BODY_BYTES:
+            self._error(413, "request body too large")
+            self.close_connection = True
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            self._error(400, "body must be JSON")
+            return
+
+        if isinstance(payload, dict) and isinstance(payload.get("text"), str):
+            results = self._extract([payload["text"]])
+            if results is not None:
+                self._send_json(200, results[0])
+        elif isinstance(payload, dict) and isinstance(payload.get("texts"), list):
+            texts = payload["texts"]
+            if len(texts) > MAX_BULK_TEXTS:
+                self._error(413, f"at most {MAX_BULK_TEXTS} texts per request")
+            elif not all(isinstance(text, str) for text in texts):
+                self._error(400, "'texts' must be a list of strings")
+            else:
+                results = self._extract(texts)
+                if results is not None:
+                    self._send_json(200, {"results": results})
+        else:
+            self._error(400, "expected {\"text\": str} or {\"texts\": [str, ...]}")
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    """Threading HTTP server that owns one extractor and its batch coalescer."""
+
+    daemon_threads = True
+    # Fila de conexões ainda não aceitas; o padrão (5) derruba rajadas de clientes
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], coalescer: BatchCoalescer,
+                 queue_timeout: float = 5.0, verbose: bool = False):
+        super().__init__(address, ExtractionHandler)
+        self.coalescer = coalescer
+        self.queue_timeout = queue_timeout
+        self.verbose = verbose
+        self.started = time.time()
+        self._counters_lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+
+    def count(self, requests: int, texts: int):
+        with self._counters_lock:
+            self.requests += requests
+            self.texts += texts
+
+    def stats(self) -> Dict[str, object]:
+        extractor = self.coalescer.extractor
+        batches = self.coalescer.batches
+        return {
+            'uptime_s': round(time.time() - self.started, 3),
+            'requests': self.requests,
+            'texts': self.texts,
+            'batches': batches,
+            'mean_batch_size': round(self.coalescer.items / batches, 2) if batches else 0.0,
+            'queue_depth': self.coalescer.queue_depth,
+            'tiers': dict(extractor.tier_counts),
+            'cache': extractor.cache_info(),
+            'instrumentation': extractor.stats_snapshot(),
+        }
+
+
+def make_server(extractor: Optional[CityExtractor] = None, host: str = "127.0.0.1", port: int = 8080,
+                workers: int = 1, max_batch_size: int = 64, max_wait: float = 0.002,
+                max_queue: int = 4096, queue_timeout: float = 5.0, verbose: bool = False) -> ExtractionServer:
+    """
+    Build a server bound to (host, port); call serve_forever() to run it.
+
+    Args:
+        extractor (Optional[CityExtractor]): Extractor to serve (default: a new one)
+        host (str): Address to bind
+        port (int): Port to bind; 0 picks a free port (see server.server_address)
+        workers (int): Number of threads gathering batches (one batch runs at a time)
+        max_batch_size (int): Maximum number of texts per spaCy batch
+        max_wait (float): Seconds to wait for more requests before running a batch that is not full
+        max_queue (int): Maximum number of queued texts
+        queue_timeout (float): Seconds a request waits for queue room before a 503
+        verbose (bool): Log every request to stderr
+
+    Returns:
+        ExtractionServer: The bound server
+    """
+    coalescer = BatchCoalescer(extractor or CityExtractor(), workers=workers, max_batch_size=max_batch_size,
+                               max_wait=max_wait, max_queue=max_queue)
+    return ExtractionServer((host, port), coalescer, queue_timeout=queue_timeout, verbose=verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP de extração de cidades")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="Threads que montam os lotes (um lote roda por vez)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.002, help="Janela de espera por mais requisições (s)")
+    parser.add_argument("--max-queue", type=int, default=4096)
+    parser.add_argument("--cache-size", type=int, default=0)
+    parser.add_argument("--instrument", action="store_true", help="Mede tempo por etapa (aparece em /stats)")
+    parser.add_argument("--budget", type=float, help="Tempo máximo por texto (s); depois dele a resposta sai parcial")
+    parser.add_argument("--verbose", action="store_true", help="Registra cada requisição no stderr")
+    args = parser.parse_args()
+
+    extractor = CityExtractor(cache_size=args.cache_size, instrument=args.instrument, budget=args.budget)
+    # Carrega o modelo antes de aceitar conexões, para a primeira requisição não pagar por isso
+    extractor.nlp
+    server = make_server(extractor, args.host, args.port, workers=args.workers,
+                         max_batch_size=args.max_batch_size, max_wait=args.max_wait,
+                         max_queue=args.max_queue, verbose=args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Índice espacial dos municípios: cidade mais próxima de uma coordenada e
+cidades dentro de um raio.
+
+Os pontos viram vetores unitários em 3D, onde a distância em linha reta
+(corda) cresce junto com a distância na superfície da Terra: comparar cordas
+é comparar distâncias de verdade, sem trigonometria por par de pontos.
+
+Para o ponto mais próximo, a área coberta é dividida numa grade de células de
+latitude/longitude. Cada célula guarda de antemão os poucos pontos que podem
+ser o mais próximo de alguma coordenada dentro dela: se o ponto mais próximo do
+centro da célula está a uma corda d0 e nenhum canto está a mais de h do
+centro, o mais próximo de qualquer coordenada da célula está a no máximo
+d0 + 2h do centro. Uma consulta em lote vira então uma leitura da tabela de
+candidatos e um produto escalar por candidato, tudo em NumPy. Coordenadas
+fora da grade são comparadas com todos os pontos.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Raio médio da Terra (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+# Lado das células da grade, em graus
+CELL_DEGREES = 0.2
+# Quanto a grade passa da caixa dos pontos, em graus
+MARGIN_DEGREES = 4.0
+# Consultas processadas por vez; limita a memória temporária dos lotes grandes
+CHUNK_SIZE = 8192
+
+
+def unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """Points on the unit sphere, shape (n, 3), for coordinates in degrees."""
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_latitude = np.cos(latitudes)
+    return np.stack([cos_latitude * np.cos(longitudes), cos_latitude * np.sin(longitudes), np.sin(latitudes)], axis=-1)
+
+
+def chord_to_km(chord):
+    """Great-circle distance in km for a chord between unit vectors."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def km_to_chord(km):
+    """Chord between unit vectors for a great-circle distance in km."""
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype=np.float64), np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM))
+
+
+class SpatialIndex:
+    """Nearest-point and radius queries over fixed points, by grid buckets."""
+
+    def __init__(self, latitudes, longitudes, cell_degrees: float = CELL_DEGREES,
+                 margin_degrees: float = MARGIN_DEGREES):
+        """
+        Build the index.
+
+        Args:
+            latitudes: Latitudes of the points, in degrees (NaN for points without coordinates)
+            longitudes: Longitudes of the points, in degrees
+            cell_degrees (float): Side of the grid cells, in degrees
+            margin_degrees (float): How far the grid extends beyond the points, in degrees
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        # Pontos sem coordenadas ficam de fora; ids devolvidos são as posições originais
+        self.ids = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        self.points = unit_vectors(latitudes[self.ids], longitudes[self.ids])
+        self.cell_degrees = cell_degrees
+        self.size = len(self.points)
+        if not self.size:
+            self.rows = self.columns = 0
+            return
+
+        # Grade sobre a caixa dos pontos mais uma margem, para que consultas um pouco
+        # fora dela (no mar, num país vizinho) não caiam na comparação com todos
+        margin = np.ceil(margin_degrees / cell_degrees) * cell_degrees
+        self.south = np.floor(latitudes[self.ids].min() / cell_degrees) * cell_degrees - margin
+        self.west = np.floor(longitudes[self.ids].min() / cell_degrees) * cell_degrees - margin
+        self.rows = int(np.ceil((latitudes[self.ids].max() + margin - self.south) / cell_degrees)) + 1
+        self.columns = int(np.ceil((longitudes[self.ids].max() + margin - self.west) / cell_degrees)) + 1
+        self._build_candidates()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _build_candidates(self):
+        """Candidate point positions of every cell, concatenated (offsets and counts per cell)."""
+        row, column = np.divmod(np.arange(self.rows * self.columns), self.columns)
+        south = self.south + row * self.cell_degrees
+        west = self.west + column * self.cell_degrees
+        centers = unit_vectors(south + self.cell_degrees / 2, west + self.cell_degrees / 2)
+        # O canto mais distante do centro limita a distância de qualquer ponto da célula
+        half_diagonal = np.zeros(len(centers))
+        for corner_latitude in (south, south + self.cell_degrees):
+            for corner_longitude in (west, west + self.cell_degrees):
+                corner = unit_vectors(corner_latitude, corner_longitude)
+                half_diagonal = np.maximum(half_diagonal, np.linalg.norm(corner - centers, axis=1))
+        half_diagonal *= 1.01
+
+        cells = []
+        for start in range(0, len(centers), CHUNK_SIZE // 8):
+            block = centers[start:start + CHUNK_SIZE // 8]
+            # Para vetores unitários |p - c|² = 2 - 2 p·c: corda até d equivale a p·c >= 1 - d²/2
+            dots = block @ self.points.T
+            limit = np.sqrt(np.maximum(2 - 2 * dots.max(axis=1), 0.0)) + 2 * half_diagonal[start:start + len(block)]
+            cells.extend(np.flatnonzero(row >= bound) for row, bound in zip(dots, 1 - limit**2 / 2))
+
+        self.counts = np.array([len(cell) for cell in cells], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.candidates = np.concatenate(cells).astype(np.int16 if self.size < 2**15 else np.int32)
+        # Classes de largura (potências de 2): cada grupo de consultas lê só o que precisa
+        self.widths = [1 << power for power in range(int(self.counts.max() - 1).bit_length() + 1)]
+
+    def _cells(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Grid cell of each coordinate, or -1 outside the grid."""
+        row = np.floor((latitudes - self.south) / self.cell_degrees)
+        column = np.floor((longitudes - self.west) / self.cell_degrees)
+        inside = (row >= 0) & (row < self.rows) & (column >= 0) & (column < self.columns)
+        cells = np.where(inside, row * self.columns + column, -1)
+        return cells.astype(np.int64)
+
+    def _nearest_in_cells(self, queries: np.ndarray, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest point (position in self.points) and its dot product, for queries inside the grid."""
+        positions = np.empty(len(queries), dtype=np.int64)
+        best_dots = np.empty(len(queries))
+        counts = self.counts[cells]
+        narrower = 0
+        for width in self.widths:
+            group = np.flatnonzero((counts > narrower) & (counts <= width))
+            narrower = width
+            if not len(group):
+                continue
+            if width == 1:
+                positions[group] = self.candidates[self.offsets[cells[group]]]
+                best_dots[group] = np.einsum('ij,ij->i', self.points[positions[group]], queries[group])
+                continue
+            # Células com menos candidatos que a largura repetem o último: repetir não muda o mínimo
+            steps = np.minimum(np.arange(width), counts[group, None] - 1)
+            candidates = self.candidates[self.offsets[cells[group], None] + steps]
+            # Maior produto escalar = menor distância
+            dots = np.einsum('ijk,ik->ij', self.points[candidates], queries[group])
+            best = dots.argmax(axis=1)
+            rows = np.arange(len(group))
+            positions[group] = candidates[rows, best]
+            best_dots[group] = dots[rows, best]
+        return positions, best_dots
+
+    def nearest(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest point to each coordinate.
+
+        Args:
+            latitudes: Latitudes in degrees (scalar or array)
+            longitudes: Longitudes in degrees, same shape
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Original position of the nearest point (-1 for NaN
+            coordinates or an empty index) and its distance in km (NaN when there is none)
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        shape = np.broadcast_shapes(latitudes.shape, longitudes.shape)
+        latitudes = np.broadcast_to(latitudes, shape).ravel()
+        longitudes = np.broadcast_to(longitudes, shape).ravel()
+        positions = np.full(len(latitudes), -1, dtype=np.int64)
+        dots = np.full(len(latitudes), np.nan)
+
+        for start in range(0, len(latitudes) if self.size else 0, CHUNK_SIZE):
+            chunk_latitudes = latitudes[start:start + CHUNK_SIZE]
+            chunk_longitudes = longitudes[start:start + CHUNK_SIZE]
+            queries = unit_vectors(chunk_latitudes, chunk_longitudes)
+            cells = self._cells(chunk_latitudes, chunk_longitudes)
+            valid = ~np.isnan(queries[:, 0])
+
+            inside = np.flatnonzero(valid & (cells >= 0))
+            if len(inside):
+                positions[start + inside], dots[start + inside] = self._nearest_in_cells(queries[inside], cells[inside])
+
+            outside = np.flatnonzero(valid & (cells < 0))
+            if len(outside):
+                all_dots = queries[outside] @ self.points.T
+                best = all_dots.argmax(axis=1)
+                positions[start + outside] = best
+                dots[start + outside] = all_dots[np.arange(len(outside)), best]
+
+        found = positions >= 0
+        positions[found] = self.ids[positions[found]]
+        return positions.reshape(shape), chord_to_km(np.sqrt(np.maximum(2 - 2 * dots, 0.0))).reshape(shape)
+
+    def within(self, latitude: float, longitude: float, km: float,
+               limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points within km of a coordinate, nearest first.
+
+        Args:
+            latitude (float): Latitude in degrees
+            longitude (float): Longitude in degrees
+            km (float): Radius in km
+            limit (Optional[int]): Maximum number of points returned
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Original positions of the points and their distances in km
+        """
+        if not self.size or np.isnan(latitude) or np.isnan(longitude) or km < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        query = unit_vectors(latitude, longitude)
+        chords = np.linalg.norm(self.points - query, axis=1)
+        inside = np.flatnonzero(chords <= km_to_chord(km))
+        order = inside[np.argsort(chords[inside], kind='stable')][:limit]
+        return self.ids[order], chord_to_km(chords[order])
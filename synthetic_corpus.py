@@ -0,0 +1,159 @@
+"""
+Gerador determinístico de anúncios sintéticos para benchmarks.
+
+Monta entradas parecidas com as reais a partir de MAJOR_CITIES e NEIGHBORHOODS:
+"Cidade - UF", frases de anúncio, erros de digitação, texto em maiúsculas e
+descrições longas. A mesma semente gera sempre o mesmo corpus.
+
+Uso:
+    python synthetic_corpus.py --size 10000 --seed 0 > corpus.jsonl
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import Iterator, List, NamedTuple
+
+from brazil_locations import MAJOR_CITIES, NEIGHBORHOODS, STATES
+
+# Tipos de entrada e seus pesos no corpus
+SAMPLE_KINDS = {
+    'city_uf': 3,
+    'listing': 4,
+    'neighborhood': 2,
+    'typo': 1,
+    'upper': 1,
+    'long': 1,
+}
+
+LISTING_TEMPLATES = [
+    "Apartamento em {city}",
+    "Casa para alugar em {city}",
+    "Procuro imóvel em {city}, {state_name}",
+    "Quero morar em {city}",
+    "Vendo terreno em {city} - {state}",
+    "Kitnet perto do centro de {city}",
+]
+
+NEIGHBORHOOD_TEMPLATES = [
+    "Apartamento em {city}, {neighborhood}",
+    "Procuro imóvel no {neighborhood}, {city}",
+    "Casa no bairro {neighborhood}",
+    "Quero alugar na {neighborhood} em {city}",
+]
+
+CITY_UF_TEMPLATES = [
+    "{city} - {state}",
+    "{city} / {state}",
+    "{city} / {state_name}",
+    "{city}, {state}",
+]
+
+# Frases neutras para encher as descrições longas
+FILLER_SENTENCES = [
+    "Imóvel com dois quartos, sala ampla e cozinha planejada.",
+    "Condomínio com portaria 24 horas, piscina e academia.",
+    "Próximo a escolas, mercados e transporte público.",
+    "Aceita financiamento e FGTS, documentação em dia.",
+    "Vaga de garagem coberta e área de serviço independente.",
+    "Agende sua visita com nosso corretor pelo telefone.",
+    "Prédio com elevador, salão de festas e playground.",
+    "Rua tranquila e arborizada, ótima para famílias.",
+]
+
+
+class Sample(NamedTuple):
+    """A synthetic input and the location it was built from."""
+    text: str
+    kind: str
+    city: str
+    state: str
+
+
+def _cities():
+    return [(city, state) for state, cities in MAJOR_CITIES.items() for city in cities]
+
+
+def add_typo(text: str, rng: random.Random) -> str:
+    """Apply one random deletion, swap, substitution or duplication to a letter of text."""
+    positions = [index for index, char in enumerate(text) if char.isalpha()]
+    if len(positions) < 4:
+        return text
+    index = rng.choice(positions[1:-1])
+    operation = rng.randrange(4)
+    if operation == 0:
+        return text[:index] + text[index + 1:]
+    if operation == 1:
+        return text[:index] + text[index + 1] + text[index] + text[index + 2:]
+    if operation == 2:
+        return text[:index] + rng.choice("aeiourstnm") + text[index + 1:]
+    return text[:index] + text[index] + text[index:]
+
+
+def iter_corpus(size: int, seed: int = 0) -> Iterator[Sample]:
+    """
+    Generate synthetic listing texts.
+
+    Args:
+        size (int): Number of samples
+        seed (int): Random seed; the same seed always gives the same corpus
+
+    Yields:
+        Sample: text, kind (one of SAMPLE_KINDS), and the expected city and state
+    """
+    rng = random.Random(seed)
+    cities = _cities()
+    display_names = {city.lower(): city for city, _ in cities}
+    city_states = {city.lower(): state for city, state in cities}
+    neighborhoods = [
+        (neighborhood.title(), display_names[city], city_states[city])
+        for city, names in NEIGHBORHOODS.items() if city in city_states
+        for neighborhood in names
+    ]
+    kinds = list(SAMPLE_KINDS)
+    weights = list(SAMPLE_KINDS.values())
+
+    for _ in range(size):
+        kind = rng.choices(kinds, weights)[0]
+        city, state = rng.choice(cities)
+        fields = {'city': city, 'state': state, 'state_name': STATES[state]}
+
+        if kind == 'city_uf':
+            text = rng.choice(CITY_UF_TEMPLATES).format(**fields)
+        elif kind == 'listing':
+            text = rng.choice(LISTING_TEMPLATES).format(**fields)
+        elif kind == 'neighborhood':
+            neighborhood, city, state = rng.choice(neighborhoods)
+            text = rng.choice(NEIGHBORHOOD_TEMPLATES).format(neighborhood=neighborhood, city=city)
+        elif kind == 'typo':
+            text = rng.choice(CITY_UF_TEMPLATES + LISTING_TEMPLATES).format(
+                **dict(fields, city=add_typo(city, rng))
+            )
+        elif kind == 'upper':
+            text = rng.choice(LISTING_TEMPLATES).format(**fields).upper()
+        else:
+            sentences = rng.sample(FILLER_SENTENCES, rng.randint(3, len(FILLER_SENTENCES)))
+            sentences.insert(rng.randrange(len(sentences) + 1), rng.choice(LISTING_TEMPLATES).format(**fields) + ".")
+            text = " ".join(sentences)
+
+        yield Sample(text, kind, city, state)
+
+
+def generate_corpus(size: int, seed: int = 0) -> List[Sample]:
+    """Same as iter_corpus, as a list."""
+    return list(iter_corpus(size, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um corpus sintético de anúncios em JSONL")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for sample in iter_corpus(args.size, args.seed):
+        sys.stdout.write(json.dumps(sample._asdict(), ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from aho_corasick import AhoCorasick
+
+def test_finds_all_patterns_in_one_pass():
+    matcher = AhoCorasick([
+        ("sao paulo", "SP"),
+        ("paulo", "nome"),
+        ("rio de janeiro", "RJ"),
+        ("rio", "rio"),
+    ])
+    
+    hits = sorted(matcher.find_all("de sao paulo para o rio de janeiro"))
+    
+    assert hits == [
+        (3, 12, "SP"),
+        (7, 12, "nome"),
+        (20, 23, "rio"),
+        (20, 34, "RJ"),
+    ]
+
+def test_word_boundaries():
+    matcher = AhoCorasick([("lapa", "bairro"), ("serra", "bairro")])
+    
+    assert list(matcher.find_all("lapada na serrania")) == []
+    assert list(matcher.find_all("lapa, serra")) == [(0, 4, "bairro"), (6, 11, "bairro")]
+    assert len(list(matcher.find_all("lapada", word_boundary=False))) == 1
+
+def test_duplicate_patterns_keep_every_payload():
+    matcher = AhoCorasick([("sao paulo", 1), ("sao paulo", 2)])
+    
+    assert [payload for _, _, payload in matcher.find_all("sao paulo")] == [1, 2]
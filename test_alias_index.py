@@ -0,0 +1,19 @@
+from alias_index import AliasIndex
+
+def test_abbreviations_are_expanded_word_by_word():
+    index = AliasIndex([("sampa", "São Paulo", "SP"), ("s. j. dos campos", "São José dos Campos", "SP")],
+                       {"s": "sao", "j": "jose", "sto": "santo"})
+    
+    test_cases = [
+        ("sampa", ("São Paulo", "SP")),
+        ("s. j. dos campos", ("São José dos Campos", "SP")),
+        ("s.j. dos  campos", ("São José dos Campos", "SP")),
+        ("sao jose dos campos", ("São José dos Campos", "SP")),
+        ("sto. andre", None),
+        ("", None),
+    ]
+    
+    for input_text, expected in test_cases:
+        assert index.get(input_text) == expected, f"Failed for input: {input_text}"
+    assert index.expand("sto. andre") == "santo andre"
+    assert len(index) == 2
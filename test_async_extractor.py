@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from async_extractor import AsyncCityExtractor
+from city_extractor import CityExtractor
+
+TEXTS = ["Mogi das Cruzes - SP", "Rio de Janeiro / RJ", "Bahia", "Apartamento em Belo Horizonte, Savassi"]
+
+def test_concurrent_calls_are_batched_and_match_extract():
+    extractor = CityExtractor()
+    expected = [extractor.extract(text) for text in TEXTS]
+    
+    async def run():
+        async with AsyncCityExtractor(CityExtractor(), max_batch_size=16, max_wait=0.01) as service:
+            results = await service.extract_many(TEXTS * 5)
+            return results, service.batches
+    
+    results, batches = asyncio.run(run())
+    
+    assert results == expected * 5
+    assert batches < len(TEXTS) * 5
+
+def test_queue_is_bounded():
+    async def run():
+        service = AsyncCityExtractor(CityExtractor(), max_batch_size=2, max_queue=3, max_wait=0)
+        tasks = [asyncio.create_task(service.extract("Bahia")) for _ in range(20)]
+        await asyncio.sleep(0)
+        queued = service._queue.qsize()
+        results = await asyncio.gather(*tasks)
+        await service.aclose()
+        return queued, results
+    
+    queued, results = asyncio.run(run())
+    
+    assert queued <= 3
+    assert results == [{"city": None, "state": "BA"}] * 20
+
+def test_closed_extractor_rejects_calls():
+    async def run():
+        service = AsyncCityExtractor(CityExtractor())
+        await service.aclose()
+        await service.extract("Bahia")
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
@@ -0,0 +1,14 @@
+from benchmark import summarize_latencies
+
+def test_latency_summary_is_in_milliseconds():
+    summary = summarize_latencies([index / 1000 for index in range(1, 101)])
+    
+    assert summary["calls"] == 100
+    assert summary["max_ms"] == 100.0
+    assert summary["mean_ms"] == 50.5
+    assert summary["p50_ms"] == 50.5
+    assert 90 <= summary["p90_ms"] <= 91
+    assert 99 <= summary["p99_ms"] <= 100
+
+def test_latency_summary_of_one_call():
+    assert summarize_latencies([0.002])["p99_ms"] == 2.0
@@ -1,5 +1,6 @@
 import pytest
-from city_extractor import CityExtractor
+from city_extractor import PIPE_FLUSH_INTERVAL, CityExtractor
+from synthetic_corpus import generate_corpus
 
 @pytest.fixture
 def extractor():
@@ -108,4 +109,378 @@ def test_compound_names(extractor):
     
     for input_text, expected in test_cases:
         result = extractor.extract(input_text)
-        assert result == expected, f"Failed for input: {input_text}" 
\ No newline at end of file
+        assert result == expected, f"Failed for input: {input_text}" 
+
+def test_batch_extraction_matches_extract(extractor):
+    texts = [
+        "Mogi das Cruzes - SP",
+        "São Paulo",
+        "EU QUERO ALUGAR EM SÃO PAULO, GUARULHOS",
+        "",
+        "RJ",
+        "Procuro imóvel no Rio de Janeiro, Copacabana",
+        "Belo Horizonte - MG",
+    ]
+    
+    expected = [extractor.extract(text) for text in texts]
+    
+    assert extractor.extract_batch(texts, batch_size=2) == expected
+    assert list(extractor.iter_extract(iter(texts))) == expected
+
+def test_iter_extract_consumes_input_lazily():
+    extractor = CityExtractor()
+    consumed = []
+    
+    def texts():
+        for index in range(20000):
+            consumed.append(index)
+            yield "São Paulo" if index % 2 else "Mogi das Cruzes - SP"
+    
+    results = extractor.iter_extract(texts(), batch_size=100)
+    
+    assert next(results) == {"city": "Mogi das Cruzes", "state": "SP"}
+    assert len(consumed) <= 100
+    assert sum(1 for _ in results) == 19999
+    assert extractor._nlp is None
+
+def test_iter_extract_bounds_read_ahead_with_nlp(extractor):
+    consumed = []
+    
+    def texts():
+        for index in range(5000):
+            consumed.append(index)
+            yield "Apartamento em Belo Horizonte, Savassi" if index % 1000 == 0 else "São Paulo"
+    
+    results = extractor.iter_extract(texts(), batch_size=8)
+    
+    assert next(results) == {"city": "Belo Horizonte", "state": "MG"}
+    assert len(consumed) <= 2 * 8 * PIPE_FLUSH_INTERVAL
+    assert sum(1 for _ in results) == 4999
+
+def test_state_extraction_ignores_accents_and_partial_words(extractor):
+    test_cases = [
+        ("Apartamento em Niterói", "RJ"),
+        ("apartamento em niteroi", "RJ"),
+        ("Casa em Jundiai", "SP"),
+        ("Apartamento para alugar em Copacabana", "RJ"),
+        ("Casa na lapada", None),
+    ]
+    
+    for input_text, expected in test_cases:
+        result = extractor.extract_state(input_text)
+        assert result == expected, f"Failed for input: {input_text}"
+
+def test_resolution_tiers(extractor):
+    test_cases = [
+        ("São Paulo", {"city": "São Paulo", "state": "SP", "tier": "capital"}),
+        ("Mogi das Cruzes - SP", {"city": "Mogi das Cruzes", "state": "SP", "tier": "format"}),
+        ("Ribeirão Preto / São Paulo", {"city": "Ribeirão Preto", "state": "SP", "tier": "format"}),
+        ("Minas Gerais", {"city": None, "state": "MG", "tier": "gazetteer"}),
+        ("BA", {"city": None, "state": "BA", "tier": "gazetteer"}),
+        ("Niterói - rj", {"city": "Niterói", "state": "RJ", "tier": "format"}),
+        ("Niterói", {"city": "Niterói", "state": "RJ", "tier": "gazetteer"}),
+        ("Sampa", {"city": "São Paulo", "state": "SP", "tier": "alias"}),
+        ("Apartamento em Belo Horizonte, Savassi", {"city": "Belo Horizonte", "state": "MG", "tier": "nlp"}),
+    ]
+    
+    for input_text, expected in test_cases:
+        result = extractor.resolve(input_text)
+        assert result == expected, f"Failed for input: {input_text}"
+    
+    assert extractor.tier_counts["format"] == 3
+    
+    # Fora do formato "Cidade - UF", sigla em minúsculas é uma palavra comum
+    for input_text in ["se", "to", "pa"]:
+        assert extractor._resolve_structured(extractor._snapshot, extractor.prepare(input_text)) is None, f"Failed for input: {input_text}"
+
+def test_state_name_before_separator_is_not_a_city(extractor):
+    test_cases = [
+        ("Bahia - BA", {"city": None, "state": "BA", "tier": "format"}),
+        ("Minas Gerais - MG", {"city": None, "state": "MG", "tier": "format"}),
+        ("Acre / AC", {"city": None, "state": "AC", "tier": "format"}),
+        ("Espírito Santo - ES", {"city": None, "state": "ES", "tier": "format"}),
+        # Municípios com nome de estado continuam sendo cidades
+        ("Goiás - GO", {"city": "Goiás", "state": "GO", "tier": "format"}),
+        ("Espírito Santo - RN", {"city": "Espírito Santo", "state": "RN", "tier": "format"}),
+        ("Rio de Janeiro / RJ", {"city": "Rio de Janeiro", "state": "RJ", "tier": "format"}),
+    ]
+
+    for input_text, expected in test_cases:
+        result = extractor.resolve(input_text)
+        assert result == expected, f"Failed for input: {input_text}"
+
+def test_aliases_and_abbreviations(extractor):
+    test_cases = [
+        ("BH", {"city": "Belo Horizonte", "state": "MG", "tier": "alias"}),
+        ("POA", {"city": "Porto Alegre", "state": "RS", "tier": "alias"}),
+        ("Poá", {"city": "Poá", "state": "SP", "tier": "gazetteer"}),
+        ("Poá - SP", {"city": "Poá", "state": "SP", "tier": "format"}),
+        ("SJC", {"city": "São José dos Campos", "state": "SP", "tier": "alias"}),
+        ("S. J. dos Campos", {"city": "São José dos Campos", "state": "SP", "tier": "alias"}),
+        ("Sto. André", {"city": "Santo André", "state": "SP", "tier": "alias"}),
+        ("Rib. Preto", {"city": "Ribeirão Preto", "state": "SP", "tier": "alias"}),
+        ("Sta. Maria - RS", {"city": "Santa Maria", "state": "RS", "tier": "format"}),
+        ("Gov. Valadares - MG", {"city": "Governador Valadares", "state": "MG", "tier": "format"}),
+        ("Cidade Maravilhosa", {"city": "Rio de Janeiro", "state": "RJ", "tier": "alias"}),
+    ]
+    
+    for input_text, expected in test_cases:
+        result = extractor.resolve(input_text)
+        assert result == expected, f"Failed for input: {input_text}"
+
+def test_neighborhoods_rank_ahead_of_small_homonyms(extractor):
+    test_cases = [
+        ("Apartamento em Ipanema", "RJ"),
+        ("Casa em Moema", "SP"),
+        ("Apartamento em Pinheiros", "SP"),
+        ("Feliz Natal para todos", None),
+    ]
+    
+    for input_text, expected in test_cases:
+        result = extractor.extract_state(input_text)
+        assert result == expected, f"Failed for input: {input_text}"
+    
+    assert extractor.resolve("Ipanema") == {"city": "Ipanema", "state": "RJ", "tier": "gazetteer"}
+    assert extractor.resolve("Ipanema - MG") == {"city": "Ipanema", "state": "MG", "tier": "format"}
+    assert extractor.resolve("Feliz Natal - MT") == {"city": "Feliz Natal", "state": "MT", "tier": "format"}
+    assert extractor.find_matching_city("Rio") == "rio de janeiro"
+    assert extractor.find_matching_city("São", "SP") == "são paulo"
+    assert extractor.find_matching_city("Floresta", "PE") == "floresta"
+
+def test_custom_aliases():
+    extractor = CityExtractor(aliases={"Mogi": "Mogi das Cruzes", "Sampa": "Santo André - SP"})
+    
+    assert extractor.resolve("mogi") == {"city": "Mogi das Cruzes", "state": "SP", "tier": "alias"}
+    assert extractor.resolve("Sampa") == {"city": "Santo André", "state": "SP", "tier": "alias"}
+    
+    with pytest.raises(ValueError):
+        CityExtractor(aliases={"Atlântida": "Atlântida"})
+    with pytest.raises(ValueError):
+        CityExtractor(aliases={"Mogi": "Mogi das Cruzes - RJ"})
+
+def test_pipeline_profiles_agree():
+    fast = CityExtractor(pipeline_profile="fast")
+    full = CityExtractor(pipeline_profile="full")
+    texts = [sample.text for sample in generate_corpus(300, seed=4)] + [
+        "EU QUERO ALUGAR EM SÃO PAULO, GUARULHOS",
+        "Procuro imóvel no Rio de Janeiro, Copacabana",
+        "Apartamento em Belo Horizonte, Savassi",
+        "Casa em Curitiba no bairro Batel",
+    ]
+    
+    # Só as entradas que chegam ao spaCy dizem algo sobre os perfis
+    assert any(result["tier"] == "nlp" for result in fast.iter_resolve(texts))
+    assert fast.extract_batch(texts) == full.extract_batch(texts)
+
+def test_result_cache():
+    extractor = CityExtractor(cache_size=2)
+    uncached = CityExtractor()
+    
+    for input_text in ["Mogi das Cruzes - SP", "mogi das cruzes - sp", "Mogi das Cruzes - SP", "Niterói", "Bahia"]:
+        assert extractor.extract(input_text) == uncached.extract(input_text), f"Failed for input: {input_text}"
+    
+    info = extractor.cache_info()
+    assert info["hits"] == 1
+    assert info["evictions"] == 2
+    assert info["size"] == 2
+    
+    test_cases = ["SÃO PAULO", "são paulo", "Sao Paulo", "SÃO PAULO"]
+    for input_text in test_cases:
+        assert extractor.resolve(input_text)["city"] == input_text, f"Failed for input: {input_text}"
+    
+    # Mudanças no gazetteer invalidam o cache
+    extractor.city_to_state = dict(extractor.city_to_state, **{"cidade nova do norte": "AM"})
+    extractor.refresh_gazetteer()
+    assert extractor.extract("Cidade Nova do Norte") == {"city": "Cidade Nova do Norte", "state": "AM"}
+    assert extractor.cache_info()["size"] == 1
+    
+    extractor.clear_cache()
+    assert extractor.cache_info()["size"] == 0
+    assert CityExtractor().cache_info() is None
+
+def test_budget_returns_partial_results():
+    extractor = CityExtractor(cache_size=10, budget=0)
+    
+    # As camadas baratas respondem mesmo sem orçamento
+    assert extractor.resolve("Mogi das Cruzes - SP")["tier"] == "format"
+    assert extractor.extract("Bahia") == {"city": None, "state": "BA"}
+    
+    test_cases = [
+        ("Apartamento com vista para o mar, SP", {"city": None, "state": "SP", "tier": "partial", "stage": "spacy"}),
+        ("Casa ampla com quintal", {"city": None, "state": None, "tier": "partial", "stage": "spacy"}),
+    ]
+    for input_text, expected in test_cases:
+        assert extractor.resolve(input_text) == expected, f"Failed for input: {input_text}"
+    assert extractor.extract("Apartamento com vista para o mar, SP") == {
+        "city": None, "state": "SP", "partial": True, "stage": "spacy"
+    }
+    assert extractor.tier_counts["partial"] == 3
+    # Resultados parciais não entram no cache, e o modelo nem foi carregado
+    assert extractor.cache_info()["size"] == 2
+    assert extractor._nlp is None
+
+def test_budget_per_batch_item(extractor):
+    texts = ["Mogi das Cruzes - SP", "Apartamento em Belo Horizonte, Savassi", "Aluguel na Vila Xyzabc, PR"]
+    full = extractor.extract_batch(texts)
+    partial = extractor.extract_batch(texts, budget=0)
+    
+    assert partial[0] == full[0]
+    for input_text, result, expected in zip(texts, partial, full):
+        # Sem orçamento, só as etapas de depois do spaCy ficam de fora
+        if result.get("partial"):
+            assert result["stage"] in ("neighborhood_fallback", "find_matching_city"), f"Failed for input: {input_text}"
+            assert result["city"] is None, f"Failed for input: {input_text}"
+        else:
+            assert result == expected, f"Failed for input: {input_text}"
+    assert extractor.extract_batch(texts, budget=10) == full
+
+def test_reload_gazetteer(tmp_path):
+    import shutil
+    data_dir = tmp_path / "data"
+    shutil.copytree("data", data_dir)
+    with open(data_dir / "municipios.csv", "a", encoding="utf-8") as municipalities:
+        municipalities.write("1399999,Cidade Nova do Norte,AM,0\n")
+    
+    extractor = CityExtractor(cache_size=10)
+    old_snapshot = extractor._snapshot
+    assert "cidade nova do norte" not in extractor.city_to_state
+    extractor.extract("Bahia")
+    extractor.extract("Minas Gerais")
+    
+    version = extractor.reload_gazetteer(str(data_dir)).result(timeout=60)
+    
+    assert version == extractor.gazetteer_version == 1
+    assert extractor._snapshot is not old_snapshot and old_snapshot.version == 0
+    assert extractor.resolve("Cidade Nova do Norte") == {"city": "Cidade Nova do Norte", "state": "AM", "tier": "gazetteer"}
+    assert extractor.autocomplete("cidade nova do n")[0]["state"] == "AM"
+    assert extractor.cache_info()["size"] == 1
+    
+    # Uma recarga que falha mantém o snapshot atual
+    with pytest.raises(OSError):
+        extractor.reload_gazetteer(str(tmp_path / "missing.bin")).result(timeout=60)
+    assert extractor.gazetteer_version == 1
+
+def test_find_municipality(extractor):
+    test_cases = [
+        ("Mogi das Cruzes", "SP", (3530607, "Mogi das Cruzes", "SP")),
+        ("SAO PAULO", None, (3550308, "São Paulo", "SP")),
+        ("niteroi", "RJ", (3303302, "Niterói", "RJ")),
+        ("sao joao del rei", None, (3162500, "São João del Rei", "MG")),
+        ("Niterói", "SP", None),
+        ("Bom Jesus", None, None),
+        ("Copacabana", "RJ", None),
+    ]
+    for city, state, expected in test_cases:
+        municipality = extractor.find_municipality(city, state)
+        result = (municipality.code, municipality.name, municipality.state) if municipality else None
+        assert result == expected, f"Failed for input: {city}, {state}"
+
+def test_canonical_and_columnar_results(extractor):
+    test_cases = [
+        ("Mogi das Cruzes - SP", {"city": "Mogi das Cruzes", "state": "SP", "city_code": 3530607, "state_code": 35}),
+        ("BELO HORIZONTE - MG", {"city": "Belo Horizonte", "state": "MG", "city_code": 3106200, "state_code": 31}),
+        ("são paulo", {"city": "São Paulo", "state": "SP", "city_code": 3550308, "state_code": 35}),
+        ("Copacabana - RJ", {"city": "Rio de Janeiro", "state": "RJ", "city_code": 3304557, "state_code": 33}),
+        ("SAO CARLOS - SP", {"city": "São Carlos", "state": "SP", "city_code": 3548906, "state_code": 35}),
+        ("mogi guacu / sp", {"city": "Mogi Guaçu", "state": "SP", "city_code": 3530706, "state_code": 35}),
+        ("Bahia", {"city": None, "state": "BA", "city_code": None, "state_code": 29}),
+        ("", {"city": None, "state": None, "city_code": None, "state_code": None}),
+    ]
+    for input_text, expected in test_cases:
+        assert extractor.extract_canonical(input_text) == expected, f"Failed for input: {input_text}"
+    
+    texts = [input_text for input_text, _ in test_cases] * 3
+    columns = extractor.extract_columns(texts)
+    assert columns.city_code.itemsize == 4 and columns.state_code.itemsize == 1
+    assert list(columns.city_code) == [expected["city_code"] or 0 for _, expected in test_cases] * 3
+    assert list(columns.state_code) == [expected["state_code"] or 0 for _, expected in test_cases] * 3
+
+def test_nearest_city_and_cities_within(extractor):
+    test_cases = [
+        ((-23.5505, -46.6333), ("São Paulo", "SP", 3550308, 35)),
+        ((-19.9167, -43.9345), ("Belo Horizonte", "MG", 3106200, 31)),
+        ((-22.9056, -47.0608), ("Campinas", "SP", 3509502, 35)),
+    ]
+    for (latitude, longitude), expected in test_cases:
+        result = extractor.nearest_city(latitude, longitude)
+        assert (result["city"], result["state"], result["city_code"], result["state_code"]) == expected, \
+            f"Failed for input: {latitude}, {longitude}"
+        assert result["distance_km"] < 5, f"Failed for input: {latitude}, {longitude}"
+    assert extractor.nearest_city(float("nan"), -46.6) is None
+    
+    codes, distances = extractor.nearest_cities([-23.5505, -19.9167, float("nan")], [-46.6333, -43.9345, 0.0])
+    assert codes.tolist() == [3550308, 3106200, 0]
+    assert distances[2] != distances[2]  # NaN
+    
+    nearby = extractor.cities_within("Campinas", 20, "SP")
+    assert [city["city"] for city in nearby[:2]] == ["Campinas", "Valinhos"]
+    assert nearby[0]["distance_km"] == 0
+    assert all(city["distance_km"] <= 20 for city in nearby)
+    assert [city["distance_km"] for city in nearby] == sorted(city["distance_km"] for city in nearby)
+    assert len(extractor.cities_within("Campinas", 20, "SP", limit=2)) == 2
+    assert {"Rio de Janeiro", "Niterói"} <= {city["city"] for city in extractor.cities_within("Copacabana", 20)}
+    assert extractor.cities_within("Cidade Inexistente", 20) == []
+
+def test_autocomplete(extractor):
+    test_cases = [
+        ("belo hor", None, ("Belo Horizonte", "MG")),
+        ("SAO JOSE DOS C", None, ("São José dos Campos", "SP")),
+        ("S. José dos C", None, ("São José dos Campos", "SP")),
+        ("Sta. Maria", "RS", ("Santa Maria", "RS")),
+        ("sto andre", None, ("Santo André", "SP")),
+        ("copacab", None, ("Copacabana", "RJ")),
+    ]
+    
+    for prefix, state, expected in test_cases:
+        suggestions = extractor.autocomplete(prefix, state=state, limit=3)
+        result = (suggestions[0]["name"], suggestions[0]["state"]) if suggestions else None
+        assert result == expected, f"Failed for input: {prefix}"
+    
+    assert extractor.autocomplete("copacab")[0]["city"] == "Rio de Janeiro"
+    assert extractor.autocomplete("zzz") == []
+    assert len(extractor.autocomplete("s", limit=5)) == 5
+    assert extractor.find_matching_city("Sta. Maria", "RS") == "santa maria"
+
+def test_extract_all(extractor):
+    text = "apartamento em Copacabana, perto de Niterói, aceito Petrópolis"
+    mentions = extractor.extract_all(text)
+    
+    assert [(m["text"], m["type"], m["city"], m["state"]) for m in mentions] == [
+        ("Copacabana", "neighborhood", "Rio de Janeiro", "RJ"),
+        ("Niterói", "city", "Niterói", "RJ"),
+        ("Petrópolis", "city", "Petrópolis", "RJ"),
+    ]
+    for mention in mentions:
+        assert text[mention["start"]:mention["end"]] == mention["text"]
+    
+    test_cases = [
+        ("Mogi das Cruzes / São Paulo", [("Mogi das Cruzes", "city", "SP"), ("São Paulo", "state", "SP")]),
+        ("EU QUERO ALUGAR EM SÃO PAULO, GUARULHOS", [("SÃO PAULO", "city", "SP"), ("GUARULHOS", "city", "SP")]),
+        ("Curitiba/PR", [("Curitiba", "city", "PR"), ("PR", "state", "PR")]),
+        ("Vendo casa em Ipanema, Rio de Janeiro - RJ",
+         [("Ipanema", "neighborhood", "RJ"), ("Rio de Janeiro", "city", "RJ"), ("RJ", "state", "RJ")]),
+        ("Casa em Ipanema - MG", [("Ipanema", "city", "MG"), ("MG", "state", "MG")]),
+        ("", []),
+    ]
+    
+    for input_text, expected in test_cases:
+        result = [(m["text"], m["type"], m["state"]) for m in extractor.extract_all(input_text)]
+        assert result == expected, f"Failed for input: {input_text}"
+    
+    assert extractor.extract_all("Vendo casa em Ipanema, Rio de Janeiro - RJ")[0]["city"] == "Rio de Janeiro"
+
+def test_instrumentation():
+    extractor = CityExtractor(instrument=True, cache_size=10)
+    metrics = []
+    extractor.stats.add_callback(lambda metric, value: metrics.append(metric))
+    
+    extractor.extract("Mogi das Cruzes - SP")
+    extractor.extract("Mogi das Cruzes - SP")
+    extractor.extract("Minas Gerais")
+    
+    snapshot = extractor.stats_snapshot()
+    assert snapshot["branches"] == {"format": 1, "cache": 1, "gazetteer": 1}
+    assert snapshot["stages"]["resolve"]["calls"] == 3
+    assert snapshot["stages"]["cheap_tiers"]["calls"] == 2
+    assert "branch.format" in metrics and "stage.resolve" in metrics
+    assert CityExtractor().stats_snapshot() is None
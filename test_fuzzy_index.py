@@ -0,0 +1,43 @@
+from difflib import get_close_matches
+from fuzzy_index import FuzzyIndex
+
+NAMES = [
+    ("Campinas", "SP"), ("Campina Grande", "PB"), ("Cascavel", "PR"),
+    ("Cascavel", "CE"), ("Ivaí", "PR"), ("Ingaí", "MG"), ("Curitiba", "PR"),
+]
+
+def normalize(text):
+    return text.lower().replace("í", "i")
+
+def test_ranks_matches_by_similarity():
+    index = FuzzyIndex(NAMES, normalize=normalize)
+    matches = index.search("campinaz", limit=3)
+    
+    assert [name for name, _ in matches] == ["Campinas", "Campina Grande"]
+    assert matches[0][1] > matches[1][1]
+    assert index.search("campinaz", cutoff=0.95) == []
+
+def test_state_partition_restricts_search():
+    index = FuzzyIndex(NAMES, normalize=normalize)
+    
+    assert index.search("curitba", state="PR", limit=1)[0][0] == "Curitiba"
+    assert index.search("curitba", state="SP") == []
+    assert index.search("curitba", state="XX") == []
+
+def test_best_match_agrees_with_difflib():
+    index = FuzzyIndex(NAMES, normalize=normalize)
+    choices = [normalize(name) for name, _ in NAMES]
+    
+    for query in ["invalid", "cascavell", "campina grand", "ingai"]:
+        expected = get_close_matches(query, choices, n=1, cutoff=0.6)
+        result = [normalize(name) for name, _ in index.search(query, limit=1)]
+        assert result == expected, f"Failed for input: {query}"
+
+def test_common_grams_do_not_add_candidates_past_the_cap():
+    filler = [(f"Vila {number}", "SP") for number in range(300)]
+    index = FuzzyIndex(NAMES + filler, normalize=normalize)
+    
+    for query in ["cascavell", "campina grand", "curitba"]:
+        expected = index.search(query, limit=1, max_postings=len(index) * 20)
+        result = index.search(query, limit=1, max_postings=0)
+        assert result == expected, f"Failed for input: {query}"
@@ -0,0 +1,90 @@
+import os
+import stat
+import pytest
+from gazetteer import Gazetteer, build_gazetteer, load_gazetteer, write_atomic, write_gazetteer
+
+def write_sources(directory, neighborhoods="name,municipality_code\nCopacabana,3304557\nCentro,3550308\nCentro,3304557\n"):
+    (directory / "estados.csv").write_text(
+        "ibge_code,sigla,name\n33,RJ,Rio de Janeiro\n35,SP,São Paulo\n41,PR,Paraná\n", encoding="utf-8")
+    (directory / "municipios.csv").write_text(
+        "ibge_code,name,state,major\n"
+        "3304557,Rio de Janeiro,RJ,1\n"
+        "3513009,Cascavel,SP,0\n"
+        "3550308,São Paulo,SP,1\n"
+        "4104808,Cascavel,PR,1\n", encoding="utf-8")
+    (directory / "bairros.csv").write_text(neighborhoods, encoding="utf-8")
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    write_sources(tmp_path)
+    return Gazetteer(build_gazetteer(str(tmp_path)))
+
+def test_views_behave_like_the_old_dicts(gazetteer):
+    assert dict(gazetteer.states) == {"RJ": "Rio de Janeiro", "SP": "São Paulo", "PR": "Paraná"}
+    assert gazetteer.city_to_state["copacabana"] == "RJ"
+    assert gazetteer.city_to_state["são paulo"] == "SP"
+    assert "curitiba" not in gazetteer.city_to_state
+    # Cidades principais, estados e bairros antes dos demais municípios
+    assert list(gazetteer.city_to_state) == ["rio de janeiro", "são paulo", "cascavel", "paraná",
+                                             "copacabana", "centro"]
+    assert gazetteer.city_to_state["cascavel"] == "PR"
+    assert dict(gazetteer.neighborhood_to_city) == {"copacabana": "rio de janeiro", "centro": "são paulo"}
+    assert dict(gazetteer.neighborhoods) == {"rio de janeiro": ["copacabana", "centro"], "são paulo": ["centro"]}
+    assert dict(gazetteer.major_cities) == {"RJ": ["Rio de Janeiro"], "SP": ["São Paulo"], "PR": ["Cascavel"]}
+    assert gazetteer.municipalities[-1][:4] == (4104808, "Cascavel", "PR", True)
+    # Montados uma vez por view, não a cada consulta
+    assert gazetteer.neighborhoods["são paulo"] is gazetteer.neighborhoods["são paulo"]
+    assert gazetteer.major_cities["RJ"] is gazetteer.major_cities["RJ"]
+
+def test_coordinates(tmp_path):
+    write_sources(tmp_path, neighborhoods="name,municipality_code,latitude,longitude\n"
+                                          "Copacabana,3304557,-22.96898,-43.18563\nCentro,3550308,,\n")
+    (tmp_path / "municipios.csv").write_text(
+        "ibge_code,name,state,major,latitude,longitude\n"
+        "3304557,Rio de Janeiro,RJ,1,-22.90642,-43.18223\n"
+        "3550308,São Paulo,SP,1,,\n", encoding="utf-8")
+    gazetteer = Gazetteer(build_gazetteer(str(tmp_path)))
+    
+    rio, sao_paulo = gazetteer.municipalities
+    assert (round(rio.latitude, 4), round(rio.longitude, 4)) == (-22.9064, -43.1822)
+    assert sao_paulo.latitude != sao_paulo.latitude  # NaN
+    assert [round(value, 4) for value in gazetteer.municipality_coordinates[:2]] == [-22.9064, -43.1822]
+    assert [round(value, 4) for value in gazetteer.neighborhood_coordinates("copacabana")] == [-22.969, -43.1856]
+    assert gazetteer.neighborhood_coordinates("centro") is None
+    assert gazetteer.neighborhood_coordinates("leblon") is None
+
+def test_major_cities_win_homonyms(gazetteer):
+    assert gazetteer.city_to_state["cascavel"] == "PR"
+
+def test_load_rebuilds_when_sources_change(tmp_path):
+    write_sources(tmp_path)
+    path = str(tmp_path / "gazetteer.bin")
+    write_gazetteer(path, str(tmp_path))
+    assert "leblon" not in load_gazetteer(path, str(tmp_path)).city_to_state
+    
+    write_sources(tmp_path, neighborhoods="name,municipality_code\nLeblon,3304557\n")
+    
+    assert load_gazetteer(path, str(tmp_path)).city_to_state["leblon"] == "RJ"
+    assert os.path.exists(path)
+
+def test_write_atomic_follows_umask(tmp_path):
+    path = tmp_path / "gazetteer.bin"
+    path.write_bytes(b"old")
+    umask = os.umask(0o022)
+    try:
+        write_atomic(str(path), b"new ", b"content")
+    finally:
+        os.umask(umask)
+    
+    assert path.read_bytes() == b"new content"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert [entry.name for entry in tmp_path.iterdir()] == ["gazetteer.bin"]
+
+def test_bundled_gazetteer_has_every_municipality():
+    gazetteer = load_gazetteer()
+    
+    assert len(gazetteer.municipalities) == 5570
+    assert len(gazetteer.states) == 27
+    assert gazetteer.city_to_state["mogi das cruzes"] == "SP"
+    assert gazetteer.state_code("SP") == 35
+    assert gazetteer.state_code("XX") is None
@@ -0,0 +1,40 @@
+from city_extractor import CityExtractor, DERIVED_INDEXES
+from index_cache import cache_key, load_indexes, save_indexes
+
+def test_round_trip_and_key_check(tmp_path):
+    path = str(tmp_path / "indexes.cache")
+    key = cache_key(b"\0" * 20, ["a", "b"])
+    indexes = {"cities": ["rio de janeiro", "niterói"], "by_state": {"RJ": [0, 1]}}
+    
+    assert load_indexes(path, key) is None
+    save_indexes(path, key, indexes)
+    assert load_indexes(path, key) == indexes
+    # Fontes diferentes, chave diferente
+    assert load_indexes(path, cache_key(b"\1" * 20, ["a", "b"])) is None
+    assert load_indexes(path, cache_key(b"\0" * 20, ["a", "c"])) is None
+
+def test_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "indexes.cache"
+    key = cache_key(b"\0" * 20)
+    save_indexes(str(path), key, {"x": 1})
+    path.write_bytes(path.read_bytes()[:-3])
+    
+    assert load_indexes(str(path), key) is None
+
+def test_extractor_uses_the_cache(tmp_path):
+    path = tmp_path / "indexes.cache"
+    built = CityExtractor(index_cache=str(path))
+    assert path.exists()
+    loaded = CityExtractor(index_cache=str(path))
+    uncached = CityExtractor(index_cache=None)
+    
+    for name in DERIVED_INDEXES:
+        assert name in loaded._snapshot.__dict__, f"Failed for index: {name}"
+    
+    test_cases = ["campnas", "Sta. Maria", "belo horiz", "sao jose dos c"]
+    for partial_name in test_cases:
+        expected = uncached.find_matching_city(partial_name)
+        assert built.find_matching_city(partial_name) == expected, f"Failed for input: {partial_name}"
+        assert loaded.find_matching_city(partial_name) == expected, f"Failed for input: {partial_name}"
+        assert loaded.autocomplete(partial_name) == uncached.autocomplete(partial_name), f"Failed for input: {partial_name}"
+    assert loaded.extract("Mogi das Cruzes - SP") == {"city": "Mogi das Cruzes", "state": "SP"}
@@ -0,0 +1,33 @@
+from instrumentation import NULL_TIMER, Stats
+
+def test_stage_timers_accumulate():
+    stats = Stats()
+    stats.record("spacy", 0.5)
+    stats.record("spacy", 1.5)
+    with stats.timer("normalize"):
+        pass
+    
+    snapshot = stats.snapshot()
+    assert snapshot["stages"]["spacy"] == {"calls": 2, "total_s": 2.0, "mean_s": 1.0, "max_s": 1.5}
+    assert snapshot["stages"]["normalize"]["calls"] == 1
+    
+    stats.reset()
+    assert stats.snapshot() == {"stages": {}, "branches": {}}
+
+def test_callbacks_receive_every_measurement():
+    stats = Stats()
+    events = []
+    callback = lambda metric, value: events.append((metric, value))
+    stats.add_callback(callback)
+    stats.record("spacy", 0.25)
+    stats.count("city_entity")
+    stats.remove_callback(callback)
+    stats.count("none")
+    
+    assert events == [("stage.spacy", 0.25), ("branch.city_entity", 1)]
+    assert stats.snapshot()["branches"] == {"city_entity": 1, "none": 1}
+
+def test_null_timer_is_reusable():
+    with NULL_TIMER:
+        with NULL_TIMER:
+            pass
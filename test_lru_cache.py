@@ -0,0 +1,22 @@
+from lru_cache import LRUCache
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.info() == {"hits": 3, "misses": 0, "evictions": 1, "size": 2, "maxsize": 2}
+
+def test_counts_misses_and_clears():
+    cache = LRUCache(10)
+    assert cache.get("missing") is None
+    cache.put("a", 1)
+    cache.clear()
+    
+    assert len(cache) == 0
+    assert cache.info()["misses"] == 1
@@ -0,0 +1,41 @@
+import json
+import pytest
+import main
+
+TEXTS = ["Mogi das Cruzes - SP", "Rio de Janeiro / RJ", "Bahia", ""]
+
+def test_csv_rows_are_enriched_in_order(tmp_path, capsys):
+    source = tmp_path / "input.csv"
+    lines = ["id,descricao"] + [f'{index},"{text}"' for index, text in enumerate(TEXTS)]
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    
+    main.main([str(source), "--column", "descricao", "--workers", "1", "--chunk-size", "3", "--quiet"])
+    
+    assert capsys.readouterr().out.splitlines() == [
+        "id,descricao,city,state",
+        "0,Mogi das Cruzes - SP,Mogi das Cruzes,SP",
+        "1,Rio de Janeiro / RJ,Rio de Janeiro,RJ",
+        "2,Bahia,,BA",
+        "3,,,",
+    ]
+
+def test_jsonl_records_keep_their_fields(tmp_path, capsys):
+    source = tmp_path / "input.jsonl"
+    source.write_text(
+        "\n".join(json.dumps({"id": index, "texto": text}) for index, text in enumerate(TEXTS)) + "\n",
+        encoding="utf-8"
+    )
+    
+    main.main([str(source), "--column", "texto", "--workers", "1", "--quiet"])
+    
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["id"] for record in records] == [0, 1, 2, 3]
+    assert records[0] == {"id": 0, "texto": "Mogi das Cruzes - SP", "city": "Mogi das Cruzes", "state": "SP"}
+    assert records[3]["city"] is None
+
+def test_missing_column_is_an_error(tmp_path):
+    source = tmp_path / "input.csv"
+    source.write_text("id,descricao\n1,Bahia\n", encoding="utf-8")
+    
+    with pytest.raises(SystemExit, match="texto"):
+        main.main([str(source), "--column", "texto", "--quiet"])
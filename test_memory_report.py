@@ -0,0 +1,46 @@
+from city_extractor import CityExtractor, DERIVED_INDEXES
+from memory_report import check_budget, component_sizes, deep_sizeof, lookup, measure_churn, memory_report
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = ["x" * 1000]
+    seen = set()
+    
+    first = deep_sizeof({"a": shared}, seen)
+    second = deep_sizeof({"b": shared}, seen)
+    assert first > 1000
+    assert second < 1000
+
+def test_check_budget():
+    report = {"indexes_mb": 20.0, "churn": {"extract": {"p99_peak_kb": 12.5}}}
+    
+    assert lookup(report, "churn.extract.p99_peak_kb") == 12.5
+    assert lookup(report, "churn.extract_all.p99_peak_kb") is None
+    assert check_budget(report, {"indexes_mb": 32, "churn.extract.p99_peak_kb": 16}) == []
+    
+    test_cases = [
+        ({"indexes_mb": 16}, "indexes_mb: 20.00 > 16.00"),
+        ({"churn.extract.p99_peak_kb": 8}, "churn.extract.p99_peak_kb: 12.50 > 8.00"),
+        ({"model_mb": 100}, "model_mb: not in the report"),
+    ]
+    for budgets, expected in test_cases:
+        assert check_budget(report, budgets) == [expected], f"Failed for input: {budgets}"
+
+def test_memory_report_without_model():
+    extractor = CityExtractor()
+    sizes = component_sizes(extractor)
+    for name in DERIVED_INDEXES:
+        assert sizes[name] > 0, f"Failed for index: {name}"
+    
+    report = memory_report(extractor, size=50)
+    assert report["indexes_mb"] > 0
+    assert report["model_mb"] is None
+    assert set(report["churn"]) == {"extract_state", "find_matching_city"}
+    assert report["churn"]["extract_state"]["calls"] == 50
+
+def test_measure_churn_reports_retained_memory():
+    kept = []
+    churn = measure_churn(lambda text: kept.append(text * 1000), ["abc"] * 30, warmup=0)
+    
+    assert churn["calls"] == 30
+    assert churn["retained_kb"] > 80
+    assert churn["p99_peak_kb"] >= churn["mean_allocated_kb"] > 0
@@ -0,0 +1,47 @@
+import pandas as pd
+import pandas_accessor  # noqa: F401
+from pandas_accessor import extract_series
+from city_extractor import CityExtractor
+
+def test_extract_series_broadcasts_unique_results():
+    extractor = CityExtractor()
+    series = pd.Series(
+        ["Mogi das Cruzes - SP", "Bahia", None, "MOGI DAS CRUZES - SP", "Rio de Janeiro / RJ", "Bahia"],
+        index=[10, 11, 12, 13, 14, 15]
+    )
+    
+    result = extract_series(series, extractor)
+    
+    assert list(result.index) == [10, 11, 12, 13, 14, 15]
+    assert isinstance(result["city"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["state"].dtype, pd.CategoricalDtype)
+    assert result["city"].astype(object).where(result["city"].notna(), None).tolist() == [
+        "Mogi das Cruzes", None, None, "Mogi das Cruzes", "Rio de Janeiro", None
+    ]
+    assert result["state"].astype(object).where(result["state"].notna(), None).tolist() == [
+        "SP", "BA", None, "SP", "RJ", "BA"
+    ]
+    # Só 3 valores normalizados distintos passaram pelo extrator
+    assert sum(extractor.tier_counts.values()) == 3
+
+def test_accessor_matches_extract_series():
+    extractor = CityExtractor()
+    series = pd.Series(["São Paulo - SP", "Minas Gerais", ""])
+    
+    result = series.br_location.extract(extractor)
+    
+    assert result.equals(extract_series(series, extractor))
+    assert series.br_location.state(extractor).tolist()[:2] == ["SP", "MG"]
+    assert len(extract_series(pd.Series([], dtype=object), extractor)) == 0
+
+def test_city_and_state_share_one_extraction():
+    extractor = CityExtractor()
+    series = pd.Series(["São Paulo - SP", "Minas Gerais", "Niterói"])
+    
+    assert series.br_location.city(extractor).tolist()[::2] == ["São Paulo", "Niterói"]
+    assert series.br_location.state(extractor).tolist() == ["SP", "MG", "RJ"]
+    assert sum(extractor.tier_counts.values()) == 3
+    
+    # Mudanças na série valem na próxima chamada
+    series[1] = "Bahia"
+    assert series.br_location.state(extractor).tolist() == ["SP", "BA", "RJ"]
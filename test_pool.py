@@ -0,0 +1,41 @@
+import pytest
+from city_extractor import CityExtractor
+from pool import ExtractorPool
+
+TEXTS = ["Mogi das Cruzes - SP", "Rio de Janeiro / RJ", "Bahia", "Apartamento em Belo Horizonte, Savassi", ""]
+
+def test_map_matches_extract_batch():
+    extractor = CityExtractor()
+    expected = extractor.extract_batch(TEXTS * 4)
+    
+    for processes in [1, 2]:
+        with ExtractorPool(extractor, processes=processes, chunk_size=3) as pool:
+            assert pool.map(TEXTS * 4) == expected, f"Failed for processes: {processes}"
+
+def test_imap_keeps_order_and_reads_lazily():
+    extractor = CityExtractor()
+    consumed = []
+    
+    def texts():
+        for text in TEXTS * 10:
+            consumed.append(text)
+            yield text
+    
+    with ExtractorPool(extractor, processes=2, chunk_size=2) as pool:
+        results = pool.imap(texts())
+        first = next(results)
+        # No máximo dois blocos por worker em andamento
+        assert len(consumed) <= 2 * 2 * 2
+        assert [first] + list(results) == extractor.extract_batch(TEXTS * 10)
+
+def test_map_columns_matches_extract_columns():
+    extractor = CityExtractor()
+    expected = extractor.extract_columns(TEXTS * 4)
+    
+    for processes in [1, 2]:
+        with ExtractorPool(extractor, processes=processes, chunk_size=3) as pool:
+            assert pool.map_columns(TEXTS * 4) == expected, f"Failed for processes: {processes}"
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        ExtractorPool(CityExtractor(), processes=1, chunk_size=0)
@@ -0,0 +1,39 @@
+from prefix_index import PrefixIndex
+
+ENTRIES = [
+    ("São Paulo", "SP", "sao paulo/SP", (0,)),
+    ("São Paulo do Potengi", "RN", "sao paulo do potengi/RN", (1,)),
+    ("Santa Maria", "RS", "santa maria/RS", (1,)),
+    ("Santa Maria", "RN", "santa maria/RN", (2,)),
+    ("Santos", "SP", "santos/SP", (0,)),
+]
+
+def normalize(text):
+    return text.lower().replace("ã", "a")
+
+def test_exact_matches_come_first_then_rank():
+    index = PrefixIndex(ENTRIES, normalize=normalize)
+    
+    assert index.search("san") == ["santos/SP", "santa maria/RS", "santa maria/RN"]
+    assert index.search("santa maria") == ["santa maria/RS", "santa maria/RN"]
+    assert index.search("sao paulo", limit=1) == ["sao paulo/SP"]
+    assert index.search("x") == []
+
+def test_state_partition():
+    index = PrefixIndex(ENTRIES, normalize=normalize)
+    
+    assert index.search("s", state="RN") == ["sao paulo do potengi/RN", "santa maria/RN"]
+    assert index.search("s", state="XX") == []
+
+def test_abbreviations_are_expanded():
+    index = PrefixIndex(ENTRIES, normalize=normalize, abbreviations={"s": "são", "sta": "santa"})
+    
+    test_cases = [
+        ("S. Pau", ["sao paulo/SP", "sao paulo do potengi/RN"]),
+        ("s.paulo do", ["sao paulo do potengi/RN"]),
+        ("Sta Maria", ["santa maria/RS", "santa maria/RN"]),
+        ("sta", []),
+    ]
+    for prefix, expected in test_cases:
+        result = index.search(prefix)
+        assert result == expected, f"Failed for input: {prefix}"
@@ -0,0 +1,37 @@
+from prepared_text import PreparedText, normalize
+
+
+def test_normalized_forms():
+    test_cases = [
+        ("  São Paulo - SP ", "sao paulo - sp", "sao paulo - sp"),
+        ("Ribeirão   Preto", "ribeirao   preto", "ribeirao preto"),
+        ("", "", ""),
+    ]
+
+    for input_text, expected_normalized, expected_collapsed in test_cases:
+        prepared = PreparedText(input_text)
+        assert prepared.normalized == expected_normalized, f"Failed for input: {input_text}"
+        assert prepared.collapsed == expected_collapsed, f"Failed for input: {input_text}"
+        assert prepared.normalized == normalize(input_text), f"Failed for input: {input_text}"
+
+
+def test_original_span():
+    test_cases = [
+        # (texto, palavra normalizada, trecho esperado no texto original)
+        ("  Casa em Goiânia - GO", "goiania", "Goiânia"),
+        ("Curitiba/PR", "pr", "PR"),
+        ("Præça em São José", "sao jose", "São José"),
+        ("Præça em São José", "praeca", "Præça"),
+    ]
+
+    for input_text, word, expected in test_cases:
+        prepared = PreparedText(input_text)
+        start = prepared.normalized.index(word)
+        span_start, span_end = prepared.original_span(start, start + len(word))
+        assert input_text[span_start:span_end] == expected, f"Failed for input: {input_text}"
+
+
+def test_offsets_cover_normalized_text():
+    for input_text in ["Florianópolis", "  Belo Horizonte  ", "Æ São", ""]:
+        prepared = PreparedText(input_text)
+        assert len(prepared.offsets) == len(prepared.normalized) + 1, f"Failed for input: {input_text}"
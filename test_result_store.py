@@ -0,0 +1,66 @@
+import multiprocessing
+from city_extractor import CityExtractor
+from result_store import ResultStore
+
+RESULT = {"city": "Belo Horizonte", "state": "MG", "tier": "nlp"}
+
+def test_round_trip_by_fingerprint(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    store.put_many("v1", [("apartamento em belo horizonte", RESULT), ("casa na praia", {"city": None, "state": None, "tier": "nlp"})])
+    
+    found = store.get_many("v1", ["apartamento em belo horizonte", "casa na praia", "sem resultado"])
+    assert found == {
+        "apartamento em belo horizonte": RESULT,
+        "casa na praia": {"city": None, "state": None, "tier": "nlp"},
+    }
+    # Outra versão do gazetteer ou do modelo não vê os resultados antigos
+    assert store.get("v2", "apartamento em belo horizonte") is None
+    # Outra instância (outra execução) lê o mesmo arquivo
+    assert ResultStore(store.path).get("v1", "apartamento em belo horizonte") == RESULT
+    assert store.info()["hits"] == 2 and store.info()["misses"] == 2
+
+def test_oldest_entries_are_evicted(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"), max_entries=100)
+    for start in range(0, 300, 10):
+        store.put_many("v1", [(f"texto {index}", RESULT) for index in range(start, start + 10)])
+    
+    assert len(store) <= 100
+    assert store.get("v1", "texto 299") == RESULT
+    assert store.get("v1", "texto 0") is None
+    assert store.info()["evictions"] >= 200
+
+def _write_and_read(store, worker):
+    keys = [f"worker {worker} texto {index}" for index in range(200)]
+    for start in range(0, len(keys), 20):
+        store.put_many("v1", [(key, RESULT) for key in keys[start:start + 20]])
+        store.get_many("v1", keys[:start + 20])
+    return len(store.get_many("v1", keys))
+
+def test_concurrent_processes(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        counts = pool.starmap(_write_and_read, [(store, worker) for worker in range(4)])
+    
+    assert counts == [200] * 4
+    assert len(store) == 800
+
+def test_extractor_skips_spacy_for_stored_results(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    texts = ["Apartamento em Belo Horizonte, Savassi", "Casa em Copacabana", "Mogi das Cruzes - SP"]
+    first = CityExtractor(result_store=path)
+    expected = first.extract_batch(texts)
+    
+    second = CityExtractor(result_store=path)
+    assert second.extract_batch(texts) == expected
+    for text, result in zip(texts, expected):
+        assert second.extract(text) == result, f"Failed for input: {text}"
+    # Nenhum texto precisou do modelo
+    assert second._nlp is None
+
+def test_edited_gazetteer_is_not_stored(tmp_path):
+    extractor = CityExtractor(result_store=str(tmp_path / "results.sqlite"))
+    assert extractor._result_fingerprint(extractor._snapshot) is not None
+    
+    extractor.city_to_state = dict(extractor.city_to_state, **{"cidade nova do norte": "AM"})
+    extractor.refresh_gazetteer()
+    assert extractor._result_fingerprint(extractor._snapshot) is None
@@ -0,0 +1,94 @@
+import json
+import threading
+from http.client import HTTPConnection
+import pytest
+from city_extractor import CityExtractor
+from server import BatchCoalescer, QueueFull, make_server
+
+@pytest.fixture
+def server():
+    server = make_server(CityExtractor(), port=0, max_wait=0.01)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def request(connection, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+def test_endpoints_share_one_keep_alive_connection(server):
+    connection = HTTPConnection(*server.server_address[:2], timeout=10)
+    
+    assert request(connection, "GET", "/health") == (200, {"status": "ok"})
+    assert request(connection, "POST", "/extract", {"text": "Mogi das Cruzes - SP"}) == (
+        200, {"city": "Mogi das Cruzes", "state": "SP"}
+    )
+    assert request(connection, "GET", "/extract?text=Bahia") == (200, {"city": None, "state": "BA"})
+    assert request(connection, "POST", "/extract", {"texts": ["Rio de Janeiro / RJ", "Minas Gerais"]}) == (
+        200, {"results": [{"city": "Rio de Janeiro", "state": "RJ"}, {"city": None, "state": "MG"}]}
+    )
+    
+    status, stats = request(connection, "GET", "/stats")
+    assert status == 200
+    assert stats["requests"] == 3
+    assert stats["texts"] == 4
+    connection.close()
+
+def test_bad_requests(server):
+    connection = HTTPConnection(*server.server_address[:2], timeout=10)
+    
+    assert request(connection, "GET", "/nope")[0] == 404
+    assert request(connection, "POST", "/extract", {"texto": "Bahia"})[0] == 400
+    assert request(connection, "POST", "/extract", {"texts": ["Bahia", 1]})[0] == 400
+    assert request(connection, "GET", "/extract")[0] == 400
+    connection.close()
+    
+    for length in ["-1", "abc"]:
+        connection = HTTPConnection(*server.server_address[:2], timeout=10)
+        connection.putrequest("POST", "/extract")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        assert connection.getresponse().status == 400, f"Failed for input: {length}"
+        connection.close()
+
+def test_rejected_bulk_submission_is_cancelled():
+    class Extractor:
+        def __init__(self):
+            self.texts = []
+        
+        def iter_resolve(self, texts, batch_size):
+            self.texts.extend(texts)
+            return [{"city": None, "state": None, "tier": "rules"} for _ in texts]
+    
+    extractor = Extractor()
+    coalescer = BatchCoalescer(extractor, workers=0, max_queue=2)
+    
+    with pytest.raises(QueueFull):
+        coalescer.submit(["a", "b", "c"], timeout=0.01)
+    threading.Thread(target=coalescer._run, daemon=True).start()
+    
+    assert coalescer.resolve_many(["d"], timeout=1) == [{"city": None, "state": None, "tier": "rules"}]
+    assert extractor.texts == ["d"]
+
+def test_concurrent_requests_are_coalesced(server):
+    texts = ["Mogi das Cruzes - SP", "Bahia", "Rio de Janeiro / RJ", "Minas Gerais"] * 10
+    results = [None] * len(texts)
+    
+    def call(index):
+        connection = HTTPConnection(*server.server_address[:2], timeout=10)
+        results[index] = request(connection, "POST", "/extract", {"text": texts[index]})[1]
+        connection.close()
+    
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    extractor = CityExtractor()
+    assert results == [extractor.extract(text) for text in texts]
+    assert server.coalescer.batches < len(texts)
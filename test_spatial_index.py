@@ -0,0 +1,55 @@
+import math
+import numpy as np
+import pytest
+from spatial_index import SpatialIndex, unit_vectors, chord_to_km
+
+def brute_force(latitudes, longitudes, point_latitudes, point_longitudes):
+    dots = unit_vectors(latitudes, longitudes) @ unit_vectors(point_latitudes, point_longitudes).T
+    dots[np.isnan(dots)] = -np.inf
+    best = dots.argmax(axis=1)
+    return best, chord_to_km(np.sqrt(np.maximum(2 - 2 * dots[np.arange(len(best)), best], 0.0)))
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(0)
+    point_latitudes = rng.uniform(-30, 0, 500)
+    point_longitudes = rng.uniform(-60, -35, 500)
+    point_latitudes[7] = np.nan
+    index = SpatialIndex(point_latitudes, point_longitudes, cell_degrees=0.5, margin_degrees=2)
+    
+    # Dentro da grade, na margem e bem longe dela
+    latitudes = np.concatenate([rng.uniform(-30, 0, 3000), rng.uniform(-33, 3, 1000), rng.uniform(-80, 80, 500)])
+    longitudes = np.concatenate([rng.uniform(-60, -35, 3000), rng.uniform(-63, -32, 1000), rng.uniform(-180, 180, 500)])
+    positions, distances = index.nearest(latitudes, longitudes)
+    expected_positions, expected_distances = brute_force(latitudes, longitudes, point_latitudes, point_longitudes)
+    
+    assert (positions == expected_positions).all()
+    assert np.allclose(distances, expected_distances)
+    assert 7 not in positions
+
+def test_nearest_edge_cases():
+    index = SpatialIndex([-23.5505, -22.9068], [-46.6333, -43.1729])
+    
+    position, distance = index.nearest(-23.5505, -46.6333)
+    assert (position.item(), round(distance.item(), 6)) == (0, 0)
+    positions, distances = index.nearest([[-22.9, math.nan]], [[-43.2, -43.2]])
+    assert positions.tolist() == [[1, -1]]
+    assert math.isnan(distances[0, 1])
+    # São Paulo - Rio de Janeiro: ~357 km
+    assert index.nearest(-23.5505, -46.6333 + 1e-9)[1] < 0.001
+    assert 350 < index.within(-23.5505, -46.6333, 400)[1][1] < 365
+    
+    empty = SpatialIndex([math.nan], [math.nan])
+    assert len(empty) == 0
+    assert empty.nearest([1.0], [2.0])[0].tolist() == [-1]
+    assert len(empty.within(1.0, 2.0, 100)[0]) == 0
+
+def test_within():
+    index = SpatialIndex([-23.5505, -22.9068, -23.9608, math.nan], [-46.6333, -43.1729, -46.3336, -46.6])
+    
+    positions, distances = index.within(-23.5505, -46.6333, 100)
+    assert positions.tolist() == [0, 2]
+    assert distances[0] == pytest.approx(0, abs=1e-6)
+    assert distances[1] == pytest.approx(55, abs=2)
+    assert index.within(-23.5505, -46.6333, 400)[0].tolist() == [0, 2, 1]
+    assert index.within(-23.5505, -46.6333, 400, limit=1)[0].tolist() == [0]
+    assert index.within(math.nan, -46.6333, 400)[0].tolist() == []
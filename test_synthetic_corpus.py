@@ -0,0 +1,26 @@
+import random
+from synthetic_corpus import SAMPLE_KINDS, add_typo, generate_corpus
+from brazil_locations import STATES
+
+def test_same_seed_same_corpus():
+    assert generate_corpus(300, seed=7) == generate_corpus(300, seed=7)
+    assert generate_corpus(300, seed=7) != generate_corpus(300, seed=8)
+
+def test_samples_cover_every_kind_with_known_locations():
+    corpus = generate_corpus(2000, seed=0)
+    
+    assert {sample.kind for sample in corpus} == set(SAMPLE_KINDS)
+    for sample in corpus:
+        assert sample.state in STATES, f"Failed for input: {sample.text}"
+        if sample.kind == "upper":
+            assert sample.text == sample.text.upper(), f"Failed for input: {sample.text}"
+        if sample.kind in ("city_uf", "listing", "long"):
+            assert sample.city in sample.text, f"Failed for input: {sample.text}"
+
+def test_typo_edits_one_letter():
+    rng = random.Random(0)
+    for name in ["Campinas", "Belo Horizonte", "Niterói"]:
+        typo = add_typo(name, rng)
+        assert typo[0] == name[0] and typo[-1] == name[-1], f"Failed for input: {name}"
+        assert abs(len(typo) - len(name)) <= 1, f"Failed for input: {name}"
+    assert add_typo("Ita", rng) == "Ita"